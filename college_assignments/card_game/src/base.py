@@ -3,6 +3,12 @@ Abstract base class for Letters game
 """
 
 from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator, Sequence, Set
+import itertools
+from typing import TYPE_CHECKING, Protocol, overload
+
+if TYPE_CHECKING:
+    from deck import Deck
 
 
 # A card has a set of features, with string names and
@@ -30,6 +36,153 @@ TableauType = list[list[CardType | None]]
 PositionType = tuple[int, int]
 
 
+class Recorder(Protocol):
+    """
+    Where the moves of a game go once it is recorded (see
+    LettersGame.record, and replay.GameRecorder for a recorder that
+    writes them to a file)
+    """
+    def start(self, setup: dict) -> None:
+        """
+        Takes the setup of the game (see LettersGame.setup), before any move
+        """
+
+    def event(self, move: tuple, result: bool | None) -> None:
+        """
+        Takes a move (or ("undo",)) and the result of call_fit if it is a fit
+        """
+
+
+def mask_positions(mask: int, cols: int) -> Iterator[PositionType]:
+    """
+    Yields the positions of the bits set in a mask over the tableau
+    (bit r * cols + c is position (r, c)), in row-major order.
+    """
+    while mask:
+        low = mask & -mask
+        yield divmod(low.bit_length() - 1, cols)
+        mask ^= low
+
+
+class TableauLine(Sequence[CardType | None]):
+    """
+    A read-only row, column or flattened run of the cells of a
+    TableauView. Slicing it returns a list.
+    """
+    def __init__(self, cell: Callable[[int], CardType | None], start: int,
+                 step: int, length: int) -> None:
+        self._cell = cell
+        self._start = start
+        self._step = step
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    @overload
+    def __getitem__(self, i: int) -> "CardType | None": ...
+
+    @overload
+    def __getitem__(self, i: slice) -> "list[CardType | None]": ...
+
+    def __getitem__(self, i: int | slice
+                    ) -> "CardType | None | list[CardType | None]":
+        if isinstance(i, slice):
+            return [self[j] for j in range(self._length)[i]]
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError("tableau index out of range")
+        return self._cell(self._start + i * self._step)
+
+    def __iter__(self) -> Iterator[CardType | None]:
+        cell = self._cell
+        for i in range(self._start, self._start + self._length * self._step,
+                       self._step):
+            yield cell(i)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class TableauView(Sequence[TableauLine]):
+    """
+    A read-only view of a tableau, backed by the storage of the game it
+    comes from: nothing is copied, and the view always shows the current
+    cards. It reads like TableauType (view[r][c], len, iteration and
+    comparison with nested lists), with row(), column() and flat() access
+    on top. to_list() takes a copy.
+    """
+    def __init__(self, cell: Callable[[int], CardType | None], nrows: int,
+                 ncols: int) -> None:
+        """
+        Args:
+            cell: Returns the card (or None) at a flat index r * ncols + c
+            nrows: Number of rows
+            ncols: Number of columns
+        """
+        self._cell = cell
+        self.nrows = nrows
+        self.ncols = ncols
+
+    def __len__(self) -> int:
+        return self.nrows
+
+    @overload
+    def __getitem__(self, r: int) -> TableauLine: ...
+
+    @overload
+    def __getitem__(self, r: slice) -> list[TableauLine]: ...
+
+    def __getitem__(self, r: int | slice
+                    ) -> "TableauLine | list[TableauLine]":
+        if isinstance(r, slice):
+            return [self.row(i) for i in range(self.nrows)[r]]
+        return self.row(r)
+
+    def __iter__(self) -> Iterator[TableauLine]:
+        for r in range(self.nrows):
+            yield TableauLine(self._cell, r * self.ncols, 1, self.ncols)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(other) == self.nrows and all(
+            row == other_row for row, other_row in zip(self, other)
+        )
+
+    def __repr__(self) -> str:
+        return f"TableauView({self.to_list()!r})"
+
+    def row(self, r: int) -> TableauLine:
+        if r < 0:
+            r += self.nrows
+        if not 0 <= r < self.nrows:
+            raise IndexError("row index out of range")
+        return TableauLine(self._cell, r * self.ncols, 1, self.ncols)
+
+    def column(self, c: int) -> TableauLine:
+        if c < 0:
+            c += self.ncols
+        if not 0 <= c < self.ncols:
+            raise IndexError("column index out of range")
+        return TableauLine(self._cell, c, self.ncols, self.nrows)
+
+    def flat(self) -> TableauLine:
+        """
+        All cells in row-major order
+        """
+        return TableauLine(self._cell, 0, 1, self.nrows * self.ncols)
+
+    def to_list(self) -> TableauType:
+        return [list(row) for row in self]
+
+
 class LettersGameBase(ABC):
     """
     Class for representing a Letters game.
@@ -60,7 +213,7 @@ class LettersGameBase(ABC):
 
     def __init__(
         self,
-        cards: list[CardType],
+        cards: "Sequence[CardType] | Deck",
         fit_size: int,
         tableau_size: tuple[int, int],
         num_players: int,
@@ -88,7 +241,7 @@ class LettersGameBase(ABC):
         - There are no duplicate cards
 
         Args:
-            cards: List of cards to use in the game
+            cards: List of cards to use in the game (or a deck.Deck)
             fit_size: Fit size
             tableau_size: Number of rows and columns of cards in the tableau
             num_players: Number of players
@@ -162,22 +315,45 @@ class LettersGameBase(ABC):
 
     @property
     @abstractmethod
-    def tableau(self) -> TableauType:
+    def tableau(self) -> Sequence[Sequence[CardType | None]]:
         """
         Returns the layout of the cards on the board
         as a 2D list of dictionaries (where some positions
-        may be None to indicate the absence of a card)
+        may be None to indicate the absence of a card),
+        or a read-only TableauView of it
         """
         raise NotImplementedError
 
     @property
     @abstractmethod
-    def non_empty_positions(self) -> set[PositionType]:
+    def non_empty_positions(self) -> Set[PositionType]:
         """
         Returns a set of non-empty positions on the tableau
         """
         raise NotImplementedError
 
+    @property
+    def occupied_count(self) -> int:
+        """
+        Returns the number of cards on the tableau (implementations
+        that track it can answer without building non_empty_positions)
+        """
+        return len(self.non_empty_positions)
+
+    @property
+    def empty_count(self) -> int:
+        """
+        Returns the number of empty positions on the tableau
+        """
+        return self.nrows * self.ncols - self.occupied_count
+
+    @property
+    def is_full(self) -> bool:
+        """
+        Returns whether every position on the tableau holds a card
+        """
+        return self.occupied_count == self.nrows * self.ncols
+
     @property
     @abstractmethod
     def done(self) -> bool:
@@ -330,3 +506,36 @@ class LettersGameBase(ABC):
         Returns: None
         """
         raise NotImplementedError
+
+    def find_fits(self) -> list[list[PositionType]]:
+        """
+        Returns every valid fit on the tableau, where a fit is a list
+        of `fit_size` positions such that, for each feature, the cards
+        at those positions are either all the same or all different.
+
+        This default implementation checks every combination of
+        non-empty positions, so child classes are encouraged to
+        override it with something faster.
+
+        Args: None
+
+        Returns: A list of fits, each one a list of positions
+        """
+        fits = []
+        positions = sorted(self.non_empty_positions)
+        for combo in itertools.combinations(positions, self.fit_size):
+            cards = [card for card in map(self.card_at, combo)
+                     if card is not None]
+            if all(
+                len({card[f] for card in cards}) in (1, len(cards))
+                for f in cards[0]
+            ):
+                fits.append(list(combo))
+        return fits
+
+    def has_fit(self) -> bool:
+        """
+        Returns True if there is at least one valid fit on the tableau
+        (see find_fits), False otherwise.
+        """
+        return len(self.find_fits()) > 0
@@ -0,0 +1,327 @@
+"""
+Lockstep simulation of many Letters games at once with NumPy.
+
+Instead of playing one LettersGame at a time, a LettersBatch holds the
+state of N games (tableau codes, deck order, deck cursor, scores, flags)
+in arrays and plays the same turn for every game in a single step. Fits
+are found through a completion table: for every pair of cards on a
+tableau the card that completes it is looked up and checked for, so fit
+existence and greedy moves for all games come from a few array
+operations.
+
+Only the 'random' and 'greedy' strategies of bot.py are supported. The
+games follow the same rules and turn order as bot.play_game, but the
+random choices come from NumPy, so results match simulate() in
+distribution rather than game by game.
+"""
+import numpy as np
+
+from bot import standard_deck
+import completion_tables
+from deck import Deck
+
+BATCH_POLICIES = ("random", "greedy")
+
+# Turns a moonshot lasts before it succeeds (see bot.play_game)
+MOONSHOT_TURNS = 4
+# Attempts each random bot gets in a random vs random game
+RANDOM_ATTEMPTS = 15
+
+
+class LettersBatch:
+    """
+    The state of N two-player Letters games (fit size 3, no lightning)
+    played in lockstep. Card codes are the deck schema codes and -1 marks
+    an empty position.
+    """
+    def __init__(self, deck: Deck, num_games: int, rows: int, cols: int,
+                 rng: np.random.Generator) -> None:
+        """
+        Deal num_games games, each from its own shuffle of 'deck'.
+
+        Raises:
+            ValueError: If the deck's fit size is not 3 or the tableau
+                does not fit the deck
+        """
+        if deck.fit_size != 3:
+            raise ValueError("Batched games need a fit size of 3.")
+        size = rows * cols
+        if not 3 <= size <= len(deck):
+            raise ValueError("Tableau size does not fit the deck.")
+
+        self.rows, self.cols, self.size = rows, cols, size
+        self.rng = rng
+        self.num_cards = len(deck)
+
+        schema = deck.schema
+        codes = np.array([card.code for card in deck], dtype=np.int16)
+        self.completion = completion_table(schema.base, len(schema.features))
+
+        self.deck = rng.permuted(np.tile(codes, (num_games, 1)), axis=1)
+        self.tableau = self.deck[:, :size].copy()
+        self.cursor = np.full(num_games, size)
+        self.scores = np.zeros((num_games, 2), dtype=np.int32)
+        self.done = np.zeros(num_games, dtype=bool)
+        self.moonshot = np.zeros(num_games, dtype=bool)
+        self.moonshot_player = np.zeros(num_games, dtype=np.int8)
+        self.moonshot_turns = np.zeros(num_games, dtype=np.int32)
+
+        first, second = np.triu_indices(size, k=1)
+        self.pairs = (first, second)
+
+    @property
+    def num_games(self) -> int:
+        return len(self.done)
+
+    @property
+    def cards_on_table(self) -> np.ndarray:
+        """Number of cards on the tableau of every game"""
+        return (self.tableau >= 0).sum(axis=1)
+
+    def fit_completions(self) -> np.ndarray:
+        """
+        For every game and every pair of positions (in the row-major order
+        of np.triu_indices), the position of the card completing the pair
+        to a fit, or -1 if it is not on the tableau.
+        """
+        n = self.num_games
+        first, second = self.pairs
+        a = self.tableau[:, first]
+        b = self.tableau[:, second]
+        present = (a >= 0) & (b >= 0)
+        needed = self.completion[np.maximum(a, 0), np.maximum(b, 0)]
+
+        # position_of[g, code] is where 'code' sits in game g (the extra
+        # last column collects the empty positions)
+        position_of = np.full((n, self.num_cards + 1), -1, dtype=np.int16)
+        slots = np.where(self.tableau >= 0, self.tableau, self.num_cards)
+        position_of[np.arange(n)[:, None], slots] = np.arange(self.size)
+
+        third = position_of[np.arange(n)[:, None], needed]
+        return np.where(present, third, -1)
+
+    def has_fit(self) -> np.ndarray:
+        """Whether each game has a fit on its tableau"""
+        return np.asarray((self.fit_completions() >= 0).any(axis=1))
+
+    def greedy_moves(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        The fit GreedyBot would call in every game: the first pair in
+        row-major order that has a completion, plus that completion.
+
+        Returns:
+            (found, moves): whether each game has a fit, and an (N, 3)
+            array of positions (only meaningful where found is True)
+        """
+        third = self.fit_completions()
+        valid = third >= 0
+        found = np.asarray(valid.any(axis=1))
+        best = valid.argmax(axis=1)
+        first, second = self.pairs
+        rows = np.arange(self.num_games)
+        moves = np.stack(
+            [first[best], second[best], third[rows, best]], axis=1
+        )
+        return found, moves
+
+    def random_moves(self) -> np.ndarray:
+        """
+        Three distinct non-empty positions per game, chosen uniformly
+        at random (only meaningful for games with at least 3 cards).
+        """
+        keys = self.rng.random(self.tableau.shape)
+        keys[self.tableau < 0] = 2.0
+        return np.argsort(keys, axis=1)[:, :3]
+
+    def call_fit(self, games: np.ndarray, player: int,
+                 moves: np.ndarray) -> None:
+        """
+        Have 'player' (0 or 1) call the positions in 'moves' in the games
+        selected by the boolean mask 'games', with the same effects as
+        LettersGame.call_fit.
+        """
+        rows = np.arange(self.num_games)[:, None]
+        cards = self.tableau[rows, moves]
+        valid = (cards >= 0).all(axis=1) & (
+            self.completion[np.maximum(cards[:, 0], 0),
+                            np.maximum(cards[:, 1], 0)] == cards[:, 2]
+        )
+
+        countered = games & self.moonshot & valid
+        if countered.any():
+            self._refill(countered, moves, remove=False)
+            self._end_moonshot(countered, succeeded=False)
+
+        normal = games & ~self.moonshot & ~countered
+        self.scores[normal & valid, player] += 3
+        self.scores[normal & ~valid, player] -= 3
+        self._refill(normal & valid, moves, remove=True)
+
+    def moonshot_start(self, games: np.ndarray, player: int) -> None:
+        """Start a moonshot by 'player' in the selected games"""
+        self.moonshot |= games
+        self.moonshot_player[games] = player
+
+    def moonshot_tick(self, games: np.ndarray) -> None:
+        """
+        Count one more turn of the moonshots in the selected games and
+        end those that have lasted MOONSHOT_TURNS turns (see play_game).
+        """
+        in_moonshot = games & self.moonshot
+        self.moonshot_turns[games & ~self.moonshot] = 0
+        self.moonshot_turns[in_moonshot] += 1
+        ending = in_moonshot & (self.moonshot_turns >= MOONSHOT_TURNS)
+        if ending.any():
+            self._end_moonshot(ending, succeeded=True)
+            self.moonshot_turns[ending] = 0
+
+    def results(self) -> tuple[int, int, int]:
+        """
+        Returns:
+            Tuple of (player1_wins, player2_wins, ties) over all games
+        """
+        p1, p2 = self.scores[:, 0], self.scores[:, 1]
+        return (int((p1 > p2).sum()), int((p2 > p1).sum()),
+                int((p1 == p2).sum()))
+
+    def _end_moonshot(self, games: np.ndarray, succeeded: bool) -> None:
+        """
+        End the moonshots in the selected games. A successful moonshot
+        scores the tableau size and redeals the tableau (ending the game
+        if the deck runs out), a countered one costs the tableau size.
+        """
+        players = self.moonshot_player[games]
+        delta = self.size if succeeded else -self.size
+        self.scores[np.flatnonzero(games), players] += delta
+        self.moonshot &= ~games
+
+        if succeeded:
+            self.tableau[games] = -1
+            self._refill(games, np.tile(np.arange(self.size),
+                                        (self.num_games, 1)), remove=True)
+            self.done |= games & (self.cursor >= self.num_cards)
+
+    def _refill(self, games: np.ndarray, positions: np.ndarray,
+                remove: bool) -> None:
+        """
+        Deal a card from the deck to each of 'positions' in the selected
+        games, in order. Once a deck runs out the remaining positions are
+        emptied if 'remove' is set and otherwise keep their card.
+        """
+        rows = np.flatnonzero(games)
+        if not len(rows):
+            return
+        for column in positions[rows].T:
+            has_card = self.cursor[rows] < self.num_cards
+            drawn = self.deck[rows, np.minimum(self.cursor[rows],
+                                               self.num_cards - 1)]
+            current = self.tableau[rows, column]
+            kept = np.full_like(current, -1) if remove else current
+            self.tableau[rows, column] = np.where(has_card, drawn, kept)
+            self.cursor[rows] += has_card
+
+
+def completion_table(base: int, nfeatures: int) -> np.ndarray:
+    """
+    The code of the card completing each pair of codes to a 3-card fit
+    (in every digit the three values are all equal or all different,
+    i.e. they sum to 0 mod 3). The shipped table of the standard deck is
+    used when it matches (see completion_tables).
+    """
+    if base != 3:
+        raise ValueError("Completion tables need 3 values per feature.")
+    table = completion_tables.load_table(base, nfeatures)
+    if table is not None:
+        size = base ** nfeatures
+        return np.frombuffer(table, dtype=np.uint8).reshape(
+            size, size
+        ).astype(np.int16)
+    codes = np.arange(base ** nfeatures)
+    powers = base ** np.arange(nfeatures)
+    digits = (codes[:, None] // powers) % base
+    needed = (-(digits[:, None, :] + digits[None, :, :])) % base
+    return (needed * powers).sum(axis=2).astype(np.int16)
+
+
+def play_batch(batch: LettersBatch, bot1_type: str, bot2_type: str) -> None:
+    """
+    Play every game of 'batch' to the end, following bot.play_game.
+    """
+    policies = [bot1_type, bot2_type]
+    for policy in policies:
+        if policy not in BATCH_POLICIES:
+            raise ValueError(f"Batched games cannot use the {policy} bot.")
+
+    if policies == ["random", "random"]:
+        for turn in range(2 * RANDOM_ATTEMPTS):
+            batch.done |= batch.cards_on_table < 3
+            live = ~batch.done
+            if not live.any():
+                break
+            batch.call_fit(live, turn % 2, batch.random_moves())
+        batch.done[:] = True
+        return
+
+    turn = 0
+    while not batch.done.all():
+        player = turn % 2
+        if player == 0:
+            batch.done |= batch.cards_on_table < 3
+
+        live = ~batch.done
+        batch.moonshot_tick(live)
+        live &= ~batch.done
+        cards = batch.cards_on_table
+
+        if policies[player] == "greedy":
+            found, moves = batch.greedy_moves()
+            batch.call_fit(live & found, player, moves)
+
+            full = cards == batch.size
+            batch.moonshot_start(live & ~found & full & ~batch.moonshot,
+                                 player)
+            batch.done |= live & ~found & ~full
+        else:
+            batch.call_fit(live & (cards >= 3), player, batch.random_moves())
+
+        turn += 1
+
+
+def simulate_batch(num_games: int,
+                   bot1_type: str,
+                   bot2_type: str,
+                   rows: int = 3,
+                   cols: int = 4,
+                   seed: int | None = None,
+                   batch_size: int = 10000) -> tuple[int, int, int]:
+    """
+    Simulate 'num_games' Letters matches between bot1_type and bot2_type
+    ('random' or 'greedy') in batches of up to batch_size lockstep games.
+
+    Args:
+        num_games: Number of games to simulate
+        bot1_type: Strategy for player 1
+        bot2_type: Strategy for player 2
+        rows: Number of rows in the tableau
+        cols: Number of columns in the tableau
+        seed: Seed for the games (random if None)
+        batch_size: Number of games played at once
+
+    Returns:
+        Tuple of (player1_wins, player2_wins, ties)
+    """
+    deck = standard_deck()
+    generators = np.random.SeedSequence(seed).spawn(
+        -(-num_games // batch_size)
+    )
+    p1_wins, p2_wins, ties = 0, 0, 0
+    for start, sequence in zip(range(0, num_games, batch_size), generators):
+        count = min(batch_size, num_games - start)
+        batch = LettersBatch(deck, count, rows, cols,
+                             np.random.default_rng(sequence))
+        play_batch(batch, bot1_type, bot2_type)
+        w1, w2, t = batch.results()
+        p1_wins += w1
+        p2_wins += w2
+        ties += t
+    return p1_wins, p2_wins, ties
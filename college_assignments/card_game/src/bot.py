@@ -1,9 +1,21 @@
 import random
 import itertools
+import math
 import sys
+import time
+from collections import OrderedDict
+from collections.abc import Hashable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+from typing import Any
 import click
+import completion_tables
 from letters import LettersGame
-from base import LettersGameBase
+from deck import Deck
+from base import CardType, LettersGameBase, PositionType
+import instrument
+from solver import (MOON, END, ActionType, EndgameSolver, SearchLimit,
+                    next_player, play_turn, previous_player, turn_actions)
 
 POSSIBLE_COLORS = ['red', 'green', 'blue']
 POSSIBLE_FONTS = ['serif', 'sans-serif', 'monospace']
@@ -28,30 +40,233 @@ def make_deck(colors, fonts, letters, numbers):
                     deck.append(card)
     return deck
 
-def is_fit(card_list):
+
+# Standard deck of the simulations, validated once per process
+_STANDARD_DECK: Deck | None = None
+
+
+def standard_deck() -> Deck:
+    """
+    Return the standard 81-card deck as a validated Deck (built on first
+    use, then shared by every simulated game in the process).
+    """
+    global _STANDARD_DECK
+    if _STANDARD_DECK is None:
+        _STANDARD_DECK = Deck(make_deck(POSSIBLE_COLORS, POSSIBLE_FONTS,
+                                        POSSIBLE_LETTERS, POSSIBLE_NUMBERS), 3)
+    return _STANDARD_DECK
+
+def is_fit(card_list: Sequence[CardType | None]) -> bool:
     """
     Determine whether card_list forms a valid fit.
     A fit requires that for each feature all cards must be either 
     all the same OR all different for that feature.
     """
-    if not card_list or any(card is None for card in card_list):
+    cards = [card for card in card_list if card is not None]
+    if not cards or len(cards) < len(card_list):
         return False
     
-    for key in card_list[0].keys():
-        values = [card[key] for card in card_list]
+    for key in cards[0].keys():
+        values = [card[key] for card in cards]
         distinct_values = set(values)
         if not (len(distinct_values) == 1 or len(distinct_values) == len(card_list)):
             return False
     
     return True
 
+
+def overlap_counts(fits: Sequence[Sequence[PositionType]],
+                   fit_size: int) -> list[int]:
+    """
+    For each fit, count how many other fits share at least one position
+    with it.
+
+    Rather than intersecting every pair of fits, this counts how many fits
+    use each group of positions (an inverted index from positions to fits)
+    and gets the size of the union of the fits through each position by
+    inclusion-exclusion. For fits of three or more cards, fit_size - 1
+    positions determine a fit, so any group of that many positions (or
+    more) belongs to that fit alone and only smaller groups have to be
+    counted. A single position does not determine a fit of two, so those
+    are intersected pairwise instead.
+
+    Args:
+        fits: List of fits (each a sequence of positions)
+        fit_size: Number of positions in a fit
+
+    Returns:
+        List with the overlap count of each fit
+    """
+    if fit_size < 3:
+        sets = [set(fit) for fit in fits]
+        return [sum(1 for j, other in enumerate(sets)
+                    if j != i and fit & other)
+                for i, fit in enumerate(sets)]
+
+    groups = [
+        [frozenset(group)
+         for size in range(1, fit_size + 1)
+         for group in itertools.combinations(fit, size)]
+        for fit in fits
+    ]
+
+    fits_using: dict[frozenset[PositionType], int] = {}
+    for fit_groups in groups:
+        for group in fit_groups:
+            if len(group) < fit_size - 1:
+                fits_using[group] = fits_using.get(group, 0) + 1
+
+    overlaps = []
+    for fit_groups in groups:
+        touching = 0
+        for group in fit_groups:
+            count = fits_using.get(group, 1)
+            touching += count if len(group) % 2 else -count
+        overlaps.append(touching - 1)
+    return overlaps
+
+
+def first_fit_of_three(cards: Sequence[CardType | None]
+                       ) -> tuple[int, int, int] | None:
+    """
+    Find the first 3-card fit in a row-major list of cards (None marks an
+    empty slot), in the order a scan over every first card, every later
+    second card, and then every possible third card would find it.
+
+    The third card of a fit is fully determined by the other two, so
+    rather than scanning for it the search computes it and looks it up.
+    With the four features of the standard deck, the cards are numbered
+    like deck codes and the third card comes from the shipped completion
+    table (see completion_tables).
+
+    Args:
+        cards: Cards (or None) in row-major order
+
+    Returns:
+        The indices of the fit's cards as (first, second, third), or
+        None if there are no fits
+    """
+    present = [(idx, card) for idx, card in enumerate(cards)
+               if card is not None]
+    if len(present) < 3:
+        return None
+
+    features = list(present[0][1].keys())
+    values = [set(card[key] for _, card in present) for key in features]
+    index: dict[tuple[str, ...], int] = {}
+    for idx, card in present:
+        index.setdefault(tuple(card[key] for key in features), idx)
+
+    if any(len(vals) > 3 for vals in values):
+        # The third value of a feature is not unique, so fall back
+        # to checking every possible third card.
+        for i, (idx1, card1) in enumerate(present):
+            for idx2, card2 in present[i + 1:]:
+                for idx3, card3 in present:
+                    if idx3 != idx1 and idx3 != idx2 and \
+                            is_fit([card1, card2, card3]):
+                        return idx1, idx2, idx3
+        return None
+
+    table = completion_tables.load_table(3, len(features))
+    if table is not None:
+        # Number each card by the order in which its values first appear
+        digits: list[dict[str, int]] = [{} for _ in features]
+        codes = []
+        for _, card in present:
+            code = 0
+            for key, seen in zip(features, digits):
+                code = code * 3 + seen.setdefault(card[key], len(seen))
+            codes.append(code)
+        at_code: dict[int, int] = {}
+        for (idx, _), code in zip(present, codes):
+            at_code.setdefault(code, idx)
+        size = 3 ** len(features)
+        for i, (idx1, _) in enumerate(present):
+            row = codes[i] * size
+            for j in range(i + 1, len(present)):
+                third = at_code.get(table[row + codes[j]])
+                if third is not None:
+                    return idx1, present[j][0], third
+        return None
+
+    for i, (idx1, card1) in enumerate(present):
+        for idx2, card2 in present[i + 1:]:
+            needed = []
+            for key, vals in zip(features, values):
+                a, b = card1[key], card2[key]
+                if a == b:
+                    needed.append(a)
+                elif len(vals) == 3:
+                    needed.append(next(v for v in vals if v != a and v != b))
+                else:
+                    break
+            else:
+                third = index.get(tuple(needed))
+                if third is not None:
+                    return idx1, idx2, third
+    return None
+
+
+class LRUCache:
+    """
+    A bounded mapping that forgets its least recently used entries once
+    it holds more than 'maxsize', and counts its hits and misses.
+    """
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the value cached for 'key' (counting a hit), or 'default'
+        (counting a miss).
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# Marks a cache miss, as None is a valid cached decision
+_MISSING = object()
+
+
+def tableau_key(letters: LettersGameBase) -> int | None:
+    """
+    Return the tableau hash of games that keep one (see
+    LettersGame.tableau_hash), or None.
+    """
+    return getattr(letters, "tableau_hash", None)
+
+
 class RandomBot:
     """
     A bot that picks a random set of cards for a 'fit'.
     It never triggers moonshot and never ends the game on its own.
     """
-    def __init__(self, letters: LettersGameBase) -> None:
+    def __init__(self, letters: LettersGameBase,
+                 rng: random.Random | None = None) -> None:
         self.letters = letters
+        self.rng = rng if rng is not None else random.Random()
 
     def suggest_move(self, player_idx=None):
         """
@@ -60,7 +275,7 @@ class RandomBot:
         positions = list(self.letters.non_empty_positions)
         fit_size = self.letters.fit_size
         if len(positions) >= fit_size:
-            return random.sample(positions, fit_size)
+            return self.rng.sample(positions, fit_size)
         return None
 
 class GreedyBot:
@@ -69,9 +284,15 @@ class GreedyBot:
     If no fit is found, checks if the board is full:
     If full, triggers moonshot.
     Otherwise, ends the game.
+    The fit found for a tableau is kept in an LRU cache keyed by the
+    tableau hash, which 'cache_size' bounds (0 for no cache).
     """
-    def __init__(self, letters: LettersGameBase) -> None:
+    def __init__(self, letters: LettersGameBase,
+                 rng: random.Random | None = None,
+                 cache_size: int = 1024) -> None:
         self.letters = letters
+        self.rng = rng if rng is not None else random.Random()
+        self.cache = LRUCache(cache_size) if cache_size else None
 
     def suggest_move(self, player_idx=None):
         """
@@ -79,40 +300,20 @@ class GreedyBot:
         If tableau is full trigger moonshot
         Otherwise: end the game.
         """
-        nrows, ncols = self.letters.nrows, self.letters.ncols
         fit_size = self.letters.fit_size
 
         positions = list(self.letters.non_empty_positions)
-        
-        if fit_size == 3:
-            for r1 in range(nrows):
-                for c1 in range(ncols):
-                    card1 = self.letters.card_at((r1, c1))
-                    if card1 is None:
-                        continue
-                    idx1 = r1 * ncols + c1
-                    for idx2 in range(idx1 + 1, nrows * ncols):
-                        r2 = idx2 // ncols
-                        c2 = idx2 % ncols
-                        card2 = self.letters.card_at((r2, c2))
-                        if card2 is None:
-                            continue
-                        for r3 in range(nrows):
-                            for c3 in range(ncols):
-                                if (r3, c3) in [(r1, c1), (r2, c2)]:
-                                    continue
-                                card3 = self.letters.card_at((r3, c3))
-                                if card3 is None:
-                                    continue
-                                if is_fit([card1, card2, card3]):
-                                    return [(r1, c1), (r2, c2), (r3, c3)]
-        else:
-            for combo in itertools.combinations(positions, fit_size):
-                cards = [self.letters.card_at(pos) for pos in combo]
-                if is_fit(cards):
-                    return list(combo)
 
-        if len(self.letters.non_empty_positions) == nrows * ncols:
+        key = tableau_key(self.letters) if self.cache is not None else None
+        fit = _MISSING if key is None else self.cache.get(key, _MISSING)
+        if fit is _MISSING:
+            fit = self._find_fit(positions)
+            if key is not None:
+                self.cache.put(key, fit)
+        if fit is not None:
+            return list(fit)
+
+        if self.letters.is_full:
             try:
                 if not self.letters._moonshot:
                     player = (player_idx + 1) if player_idx is not None else 1
@@ -133,15 +334,43 @@ class GreedyBot:
                     pass
             return None
 
+    def _find_fit(self, positions: list[PositionType]
+                  ) -> tuple[PositionType, ...] | None:
+        """
+        Return the first fit on the tableau as a tuple of positions, or
+        None if there is none.
+        """
+        ncols = self.letters.ncols
+        fit_size = self.letters.fit_size
+        if fit_size == 3:
+            cards = [self.letters.card_at((r, c))
+                     for r in range(self.letters.nrows) for c in range(ncols)]
+            fit = first_fit_of_three(cards)
+            if fit is not None:
+                return tuple(divmod(idx, ncols) for idx in fit)
+        else:
+            for combo in itertools.combinations(positions, fit_size):
+                cards = [self.letters.card_at(pos) for pos in combo]
+                if is_fit(cards):
+                    return combo
+        return None
+
 class SmartBot:
     """
     A bot that finds all fits and picks the one
     overlapping with the most other fits. If no fit is found:
     If tableau is full, trigger moonshot.
     Else end the game.
+    The fits found for a tableau and their ranking are kept in an LRU
+    cache keyed by the tableau hash, which 'cache_size' bounds (0 for no
+    cache). Only the final random pick among the best fits is redone.
     """
-    def __init__(self, letters: LettersGameBase) -> None:
+    def __init__(self, letters: LettersGameBase,
+                 rng: random.Random | None = None,
+                 cache_size: int = 1024) -> None:
         self.letters = letters
+        self.rng = rng if rng is not None else random.Random()
+        self.cache = LRUCache(cache_size) if cache_size else None
 
     def suggest_move(self, player_idx=None):
         """
@@ -160,12 +389,13 @@ class SmartBot:
                     pass
             return None
 
-        combos = itertools.combinations(all_positions, fsize)
-        valid_fits = []
-        for combo in combos:
-            cards = [self.letters.card_at(pos) for pos in combo]
-            if is_fit(cards):
-                valid_fits.append(set(combo))
+        key = tableau_key(self.letters) if self.cache is not None else None
+        ranked = _MISSING if key is None else self.cache.get(key, _MISSING)
+        if ranked is _MISSING:
+            ranked = self._rank_fits(all_positions)
+            if key is not None:
+                self.cache.put(key, ranked)
+        valid_fits, best_indices = ranked
 
         if not valid_fits:
             if len(all_positions) == self.letters.nrows * self.letters.ncols:
@@ -189,181 +419,921 @@ class SmartBot:
                         pass
                 return None
 
-        overlaps = []
-        for i, fit1 in enumerate(valid_fits):
-            overlap_count = sum(
-                1 for j, fit2 in enumerate(valid_fits)
-                if j != i and fit1 & fit2
-            )
-            overlaps.append(overlap_count)
+        chosen_index = self.rng.choice(best_indices)
+        return list(valid_fits[chosen_index])
 
+    def _rank_fits(self, all_positions: list[PositionType]
+                   ) -> tuple[list[set[PositionType]], list[int]]:
+        """
+        Return the fits on the tableau (as sets of positions) and the
+        indices of those overlapping with the most other fits.
+        """
+        # Keep the fits in the order itertools.combinations would visit
+        # them over all_positions, so that random.choice picks the same
+        # fit as an exhaustive scan would for the same seed
+        order = {pos: i for i, pos in enumerate(all_positions)}
+        combos = [
+            sorted(fit, key=order.__getitem__)
+            for fit in self.letters.find_fits()
+        ]
+        combos.sort(key=lambda combo: [order[pos] for pos in combo])
+        valid_fits = [set(combo) for combo in combos]
+        if not valid_fits:
+            return valid_fits, []
+
+        overlaps = overlap_counts(combos, self.letters.fit_size)
         max_overlap = max(overlaps)
         best_indices = [
             i for i, count in enumerate(overlaps) if count == max_overlap
         ]
-        chosen_index = random.choice(best_indices)
-        return list(valid_fits[chosen_index])
+        return valid_fits, best_indices
+
+
+# Process pools shared by every MCTSBot, keyed by number of workers
+_MCTS_POOLS: dict[int, ProcessPoolExecutor] = {}
+
+
+class MCTSNode:
+    """
+    A node of the MCTSBot search tree (a game state reached by playing
+    'action' as 'player'; the root has no action).
+    """
+    def __init__(self, parent: "MCTSNode | None",
+                 action: ActionType | None, player: int, key: tuple,
+                 actions: list[ActionType]) -> None:
+        self.parent = parent
+        self.action = action
+        self.player = player
+        self.key = key
+        self.untried = actions
+        self.children: dict[ActionType, MCTSNode] = {}
+        self.visits = 0
+        self.wins = 0.0
+
+    def best_child(self,
+                   exploration: float) -> tuple[ActionType, "MCTSNode"]:
+        """
+        Return the child with the highest UCT score, with its action.
+        """
+        log_visits = math.log(self.visits)
+        return max(
+            self.children.items(),
+            key=lambda item: item[1].wins / item[1].visits + exploration
+            * math.sqrt(log_visits / item[1].visits)
+        )
+
+
+def reward(letters: LettersGame, player: int) -> float:
+    """
+    Return 1 if 'player' has the highest score, 0.5 if tied, 0 otherwise.
+    """
+    scores = letters.scores
+    best = max(scores.values())
+    if scores[player] < best:
+        return 0.0
+    if sum(1 for score in scores.values() if score == best) > 1:
+        return 0.5
+    return 1.0
+
+
+def mcts_search(root: MCTSNode, letters: LettersGame, rng: random.Random,
+                rollouts: int | None, time_limit: float | None,
+                exploration: float = math.sqrt(2)) -> None:
+    """
+    Run Monte Carlo Tree Search from 'root', whose state is 'letters',
+    until the rollout or time budget runs out. The game is walked in place
+    with apply/undo and left as it was found.
+    """
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    done = 0
+    while True:
+        if rollouts is not None and done >= rollouts:
+            break
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        done += 1
+
+        node = root
+        applied = 0
+        player = next_player(letters, root.player)
+
+        # Selection
+        while not node.untried and node.children:
+            action, node = node.best_child(exploration)
+            applied += play_turn(letters, node.player, action)
+            player = next_player(letters, node.player)
+
+        # Expansion
+        if node.untried:
+            action = node.untried.pop(rng.randrange(len(node.untried)))
+            applied += play_turn(letters, player, action)
+            child = MCTSNode(node, action, player, letters.state_key(),
+                             turn_actions(letters))
+            node.children[action] = child
+            node = child
+            player = next_player(letters, player)
+
+        # Rollout
+        while not letters.done:
+            actions = turn_actions(letters)
+            applied += play_turn(letters, player, rng.choice(actions))
+            player = next_player(letters, player)
+
+        # Backpropagation
+        results = {p: reward(letters, p) for p in letters.scores}
+        visited: MCTSNode | None = node
+        while visited is not None:
+            visited.visits += 1
+            visited.wins += results.get(visited.player, 0.0)
+            visited = visited.parent
+
+        for _ in range(applied):
+            letters.undo()
+
+
+def mcts_visits(letters: LettersGame, player: int, rollouts: int | None,
+                time_limit: float | None,
+                seed: int) -> dict[ActionType, int]:
+    """
+    Run a fresh search for 'player' on a copy of 'letters' and return the
+    number of visits of each root action (used by the worker processes of
+    a root-parallel search).
+    """
+    game = letters.clone()
+    root = MCTSNode(None, None, previous_player(game, player),
+                    game.state_key(), turn_actions(game))
+    mcts_search(root, game, random.Random(seed), rollouts, time_limit)
+    return {action: child.visits for action, child in root.children.items()}
+
+
+class MCTSBot:
+    """
+    A bot that picks fits with Monte Carlo Tree Search. Each call to
+    suggest_move runs random playouts until its budget (a number of
+    rollouts and/or a number of seconds) runs out, and the tree is kept
+    between turns so the part below the moves actually played is reused.
+    With more than one worker, every worker process searches its own tree
+    from the current state and their root visit counts are added up.
+    If no fit is found, shoots the moon when the tableau is full and
+    ends the game otherwise (like GreedyBot and SmartBot).
+    """
+    def __init__(self, letters: LettersGame,
+                 rng: random.Random | None = None, rollouts: int | None = 200,
+                 time_limit: float | None = None, workers: int = 1) -> None:
+        if rollouts is None and time_limit is None:
+            raise ValueError("MCTSBot needs a rollout or time budget")
+        self.letters = letters
+        self.rollouts = rollouts
+        self.time_limit = time_limit
+        self.workers = workers
+        self.rng = rng if rng is not None else random.Random()
+        self._root: MCTSNode | None = None
+
+    def suggest_move(self,
+                     player_idx: int | None = None
+                     ) -> list[PositionType] | None:
+        """
+        Return the fit chosen by the search, or None after shooting
+        the moon or ending the game.
+        """
+        letters = self.letters
+        player = (player_idx + 1) if player_idx is not None else 1
+        if letters.done:
+            return None
+
+        if letters.moonshot:
+            # Counter someone else's moonshot if we can, never our own
+            if letters.moonshot_player == player:
+                return None
+            fits = letters.find_fits()
+            return list(self.rng.choice(fits)) if fits else None
+
+        actions = turn_actions(letters)
+        if len(actions) == 1:
+            action = actions[0]
+        elif self.workers > 1:
+            action = self._parallel_search(player)
+        else:
+            action = self._search(player, actions)
+
+        if not isinstance(action, str):
+            return list(action)
+        if action == MOON:
+            try:
+                letters.moonshot_start(player)
+            except ValueError:
+                pass
+        elif action == END:
+            try:
+                letters.end_game()
+            except ValueError:
+                pass
+        return None
+
+    def _search(self, player: int, actions: list[ActionType]) -> ActionType:
+        """
+        Search from the current state (reusing the subtree kept from the
+        previous turn when it matches) and return the most visited action.
+        """
+        game = self.letters.clone()
+        key = game.state_key()
+        root = self._reuse_root(key)
+        if root is None or root.player != previous_player(game, player):
+            root = MCTSNode(None, None, previous_player(game, player), key,
+                            actions)
+        root.parent = None
+
+        mcts_search(root, game, self.rng, self.rollouts, self.time_limit)
+        action, best = max(root.children.items(),
+                           key=lambda item: item[1].visits)
+        self._root = best
+        return action
+
+    def _reuse_root(self, key: tuple) -> MCTSNode | None:
+        """
+        Return the node of the kept tree whose state matches 'key' (the
+        state after the other players replied to our last move), if any.
+        """
+        if self._root is None:
+            return None
+        if self._root.key == key:
+            return self._root
+        for child in self._root.children.values():
+            if child.key == key:
+                return child
+        return None
+
+    def _parallel_search(self, player: int) -> ActionType:
+        """
+        Run one search per worker process and return the action with the
+        most visits across all of them.
+        """
+        pool = _MCTS_POOLS.get(self.workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=self.workers)
+            _MCTS_POOLS[self.workers] = pool
+
+        game = self.letters.clone()
+        futures = [
+            pool.submit(instrument.run_timed, instrument.worker_bots(BOTS),
+                        mcts_visits, game, player, self.rollouts,
+                        self.time_limit, self.rng.getrandbits(64))
+            for _ in range(self.workers)
+        ]
+        totals: dict[ActionType, int] = {}
+        for future in futures:
+            visit_counts, timings = future.result()
+            # The engine calls of the workers were made for this bot
+            instrument.merge(timings, instrument.caller())
+            for action, visits in visit_counts.items():
+                totals[action] = totals.get(action, 0) + visits
+        self._root = None
+        return max(totals, key=totals.__getitem__)
+
+
+class PerfectBot:
+    """
+    A bot that plays perfectly once the game is nearly over. When at most
+    'solve_below' cards are left in the deck it solves the rest of the
+    game exactly (see solver.py), which relies on the order of the deck.
+    Before that, or when the search would take more than 'max_nodes'
+    positions, it calls the first fit it finds. Moonshots are handled
+    like MCTSBot does.
+    """
+    def __init__(self, letters: LettersGame,
+                 rng: random.Random | None = None, solve_below: int = 18,
+                 max_nodes: int | None = 200_000) -> None:
+        self.letters = letters
+        self.rng = rng if rng is not None else random.Random()
+        self.solve_below = solve_below
+        self.solver = EndgameSolver(max_nodes)
+
+    def suggest_move(self,
+                     player_idx: int | None = None
+                     ) -> list[PositionType] | None:
+        """
+        Return the fit to call, or None after shooting the moon or
+        ending the game.
+        """
+        letters = self.letters
+        player = (player_idx + 1) if player_idx is not None else 1
+        if letters.done:
+            return None
+
+        if letters.moonshot:
+            if letters.moonshot_player == player:
+                return None
+            fits = letters.find_fits()
+            return list(self.rng.choice(fits)) if fits else None
+
+        action: ActionType | None = None
+        if letters.cards_left <= self.solve_below:
+            try:
+                _, action = self.solver.solve(letters.clone(), player)
+            except SearchLimit:
+                action = None
+        if action is None:
+            action = turn_actions(letters)[0]
+
+        if not isinstance(action, str):
+            return list(action)
+        if action == MOON:
+            try:
+                letters.moonshot_start(player)
+            except ValueError:
+                pass
+        elif action == END:
+            try:
+                letters.end_game()
+            except ValueError:
+                pass
+        return None
+
 
 class BotPlayer:
     """
     General class that houses a bot instance by name.
     """
-    def __init__(self, name: str, letters: LettersGameBase) -> None:
+    def __init__(self, name: str, letters: LettersGameBase,
+                 rng: random.Random | None = None, **options: Any) -> None:
         self._name = name
-        bot_cls = {'random': RandomBot,
-                   'greedy': GreedyBot,
-                   'smart': SmartBot}[name]
-        self.bot = bot_cls(letters)
+        bot_cls = BOTS[name]
+        self.bot = bot_cls(letters, rng, **options)
+
+
+# Bot classes by name. Every class takes (letters, rng, **options) and
+# has a suggest_move(player_idx) method.
+BOTS = {'random': RandomBot,
+        'greedy': GreedyBot,
+        'smart': SmartBot,
+        'mcts': MCTSBot,
+        'perfect': PerfectBot}
 
-def simulate(num_games: int, 
-             bot1_type: str, 
-             bot2_type: str, 
-             rows: int = 3, 
-             cols: int = 4) -> tuple[int, int, int]:
+BOT_NAMES = ['random', 'greedy', 'smart', 'mcts', 'perfect']
+
+
+def register_bot(name: str, bot_cls: type) -> None:
     """
-    Run simulation of 'num_games' Letters matches between
-    bot1_type and bot2_type.
-    
+    Make a bot class available to BotPlayer (and so to simulations and
+    tournaments) under 'name'.
+    """
+    BOTS[name] = bot_cls
+
+
+def game_seed(seed: int, game_num: int) -> int:
+    """
+    Derive the seed of one game of a simulation from the master seed,
+    so that every game can be replayed on its own.
+    """
+    return random.Random(f"{seed}:{game_num}").getrandbits(64)
+
+
+def play_game(seed: int,
+              bot1_type: str,
+              bot2_type: str,
+              rows: int = 3,
+              cols: int = 4,
+              bot_options: dict | None = None) -> int:
+    """
+    Play one Letters match between bot1_type and bot2_type. The deck
+    order and every random choice of the bots only depend on 'seed'.
+
     Args:
-        num_games: Number of games to simulate
+        seed: Seed for the game
         bot1_type: Strategy for player 1
         bot2_type: Strategy for player 2
         rows: Number of rows in the tableau
         cols: Number of columns in the tableau
-    
+        bot_options: Extra constructor arguments for each strategy
+
     Returns:
-        Tuple of (player1_wins, player2_wins, ties)
+        The winning player (1 or 2), or 0 for a tie
     """
-    p1_wins, p2_wins, ties = 0, 0, 0
+    return play_game_record(seed, bot1_type, bot2_type, rows, cols,
+                            bot_options)["winner"]
+
+def play_game_record(seed: int,
+                     bot1_type: str,
+                     bot2_type: str,
+                     rows: int = 3,
+                     cols: int = 4,
+                     bot_options: dict | None = None) -> dict:
+    """
+    Play one Letters match like play_game and describe how it went.
+
+    Args:
+        seed: Seed for the game
+        bot1_type: Strategy for player 1
+        bot2_type: Strategy for player 2
+        rows: Number of rows in the tableau
+        cols: Number of columns in the tableau
+        bot_options: Extra constructor arguments for each strategy
+
+    Returns:
+        A dict with the game seed, the bots, the tableau size, the final
+        scores, the winner (1, 2, or 0 for a tie), the number of turns,
+        and the valid fits and moonshots called by each player
+    """
+    rng = random.Random(seed)
+    deck = standard_deck().shuffled(rng)
+
+    letters = LettersGame(deck, 3, (rows, cols), 2)
+    bot_options = bot_options or {}
+    bot1 = BotPlayer(bot1_type, letters, random.Random(rng.getrandbits(64)),
+                     **bot_options.get(bot1_type, {}))
+    bot2 = BotPlayer(bot2_type, letters, random.Random(rng.getrandbits(64)),
+                     **bot_options.get(bot2_type, {}))
+    bots = [bot1, bot2]
     both_random = (bot1_type == 'random' and bot2_type == 'random')
+    turns = 0
+    fits = [0, 0]
+    moonshots = [0, 0]
 
-    for game_num in range(num_games):
-        deck = make_deck(
-            POSSIBLE_COLORS, POSSIBLE_FONTS,
-            POSSIBLE_LETTERS, POSSIBLE_NUMBERS
-        )
-        random.shuffle(deck)
-
-        letters = LettersGame(deck, 3, (rows, cols), 2)
-        bot1 = BotPlayer(bot1_type, letters)
-        bot2 = BotPlayer(bot2_type, letters)
-        bots = [bot1, bot2]
-
-        if both_random:
-            fit_count = [0, 0]
-
-            while (fit_count[0] < 15 and fit_count[1] < 15
-                   and not letters.done
-                   and len(letters.non_empty_positions) >= 3):
-                for player_idx in [0, 1]:
-                    if letters.done:
-                        break
-                    if fit_count[player_idx] >= 15:
-                        continue
-                    if len(letters.non_empty_positions) < 3:
-                        break
+    if both_random:
+        fit_count = [0, 0]
 
-                    move = bots[player_idx].bot.suggest_move(player_idx)
-                    if move and len(move) == 3:
-                        try:
-                            letters.call_fit(player_idx + 1, move)
-                            fit_count[player_idx] += 1
-                        except ValueError:
-                            try:
-                                if not letters.done:
-                                    letters.end_game()
-                            except ValueError:
-                                pass
-                    else:
+        while (fit_count[0] < 15 and fit_count[1] < 15
+               and not letters.done
+               and letters.occupied_count >= 3):
+            for player_idx in [0, 1]:
+                if letters.done:
+                    break
+                if fit_count[player_idx] >= 15:
+                    continue
+                if letters.occupied_count < 3:
+                    break
+
+                move = bots[player_idx].bot.suggest_move(player_idx)
+                turns += 1
+                if move and len(move) == 3:
+                    try:
+                        fits[player_idx] += letters.call_fit(player_idx + 1,
+                                                             move)
+                        fit_count[player_idx] += 1
+                    except ValueError:
                         try:
                             if not letters.done:
                                 letters.end_game()
                         except ValueError:
                             pass
-                        break
+                else:
+                    try:
+                        if not letters.done:
+                            letters.end_game()
+                    except ValueError:
+                        pass
+                    break
 
-        else:
-            moonshot_turns = 0
-            max_turns = float('inf')
-            turn_count = 0
-            
-            while not letters.done and len(letters.non_empty_positions) >= 3 and turn_count < max_turns:
-                for player_idx, bot_obj in enumerate(bots):
-                    if letters.done:
-                        break
-
-                    if letters._moonshot:
-                        moonshot_turns += 1
-                        if moonshot_turns >= len(bots) * 2:
-                            try:
-                                letters.moonshot_end()
-                                moonshot_turns = 0
-                            except ValueError:
-                                pass
-                    else:
-                        moonshot_turns = 0
-                    
-                    move = bot_obj.bot.suggest_move(player_idx)
-                    
-                    if move:
+    else:
+        moonshot_turns = 0
+        max_turns = float('inf')
+        turn_count = 0
+
+        while not letters.done and letters.occupied_count >= 3 and turn_count < max_turns:
+            for player_idx, bot_obj in enumerate(bots):
+                if letters.done:
+                    break
+
+                if letters._moonshot:
+                    moonshot_turns += 1
+                    if moonshot_turns >= len(bots) * 2:
                         try:
-                            letters.call_fit(player_idx + 1, move)
+                            letters.moonshot_end()
+                            moonshot_turns = 0
                         except ValueError:
-                            continue
-                
-                turn_count += 1
+                            pass
+                else:
+                    moonshot_turns = 0
 
-            if turn_count >= max_turns and not letters.done:
-                try:
-                    letters.end_game()
-                except ValueError:
-                    pass
+                in_moonshot = letters._moonshot
+                move = bot_obj.bot.suggest_move(player_idx)
+                turns += 1
+                if letters._moonshot and not in_moonshot:
+                    moonshots[player_idx] += 1
 
-        if not letters.done:
+                if move:
+                    try:
+                        fits[player_idx] += letters.call_fit(player_idx + 1,
+                                                             move)
+                    except ValueError:
+                        continue
+
+            turn_count += 1
+
+        if turn_count >= max_turns and not letters.done:
             try:
                 letters.end_game()
             except ValueError:
                 pass
 
-        scores = letters.scores
-        max_score = max(scores.values())
-        winners = [p for p, val in scores.items() if val == max_score]
+    if not letters.done:
+        try:
+            letters.end_game()
+        except ValueError:
+            pass
+
+    scores = letters.scores
+    max_score = max(scores.values())
+    winners = [p for p, val in scores.items() if val == max_score]
 
-        if len(winners) == 1:
-            if winners[0] == 1:
-                p1_wins += 1
+    return {
+        "seed": seed,
+        "bot1": bot1_type,
+        "bot2": bot2_type,
+        "rows": rows,
+        "cols": cols,
+        "score1": scores[1],
+        "score2": scores[2],
+        "winner": winners[0] if len(winners) == 1 else 0,
+        "turns": turns,
+        "fits1": fits[0],
+        "fits2": fits[1],
+        "moonshots1": moonshots[0],
+        "moonshots2": moonshots[1],
+    }
+
+
+def simulate_seeds(seeds: list[int],
+                   bot1_type: str,
+                   bot2_type: str,
+                   rows: int = 3,
+                   cols: int = 4,
+                   bot_options: dict | None = None) -> tuple[int, int, int]:
+    """
+    Play one game per seed and count the results (see simulate).
+    """
+    counts = [0, 0, 0]
+    for seed in seeds:
+        counts[play_game(seed, bot1_type, bot2_type, rows, cols,
+                         bot_options)] += 1
+    ties, p1_wins, p2_wins = counts
+    return p1_wins, p2_wins, ties
+
+
+def simulate(num_games: int,
+             bot1_type: str,
+             bot2_type: str,
+             rows: int = 3,
+             cols: int = 4,
+             bot_options: dict | None = None,
+             seed: int | None = None,
+             workers: int = 1) -> tuple[int, int, int]:
+    """
+    Run simulation of 'num_games' Letters matches between
+    bot1_type and bot2_type.
+
+    Every game gets its own seed derived from 'seed' (see game_seed),
+    so the results for a given seed are the same no matter how many
+    worker processes the games are spread over.
+
+    Args:
+        num_games: Number of games to simulate
+        bot1_type: Strategy for player 1
+        bot2_type: Strategy for player 2
+        rows: Number of rows in the tableau
+        cols: Number of columns in the tableau
+        bot_options: Extra constructor arguments for each strategy
+            (e.g. {'mcts': {'rollouts': 500}})
+        seed: Master seed (drawn from the random module if None)
+        workers: Number of worker processes
+
+    Returns:
+        Tuple of (player1_wins, player2_wins, ties)
+    """
+    if seed is None:
+        seed = random.getrandbits(64)
+    seeds = [game_seed(seed, game_num) for game_num in range(num_games)]
+
+    if workers <= 1 or num_games <= 1:
+        return simulate_seeds(seeds, bot1_type, bot2_type, rows, cols,
+                              bot_options)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return _simulate_on_pool(pool, workers, seeds, bot1_type, bot2_type,
+                                 rows, cols, bot_options)
+
+
+def _simulate_on_pool(pool: ProcessPoolExecutor,
+                      workers: int,
+                      seeds: list[int],
+                      bot1_type: str,
+                      bot2_type: str,
+                      rows: int,
+                      cols: int,
+                      bot_options: dict | None) -> tuple[int, int, int]:
+    """
+    Play one game per seed on the worker pool, in a few shards per worker,
+    and add up the results (see simulate). If timing is on (see
+    instrument.py) the workers time their games too.
+    """
+    chunk = -(-len(seeds) // (workers * 4))
+    shards = [seeds[i:i + chunk] for i in range(0, len(seeds), chunk)]
+    futures = [
+        pool.submit(instrument.run_timed, instrument.worker_bots(BOTS),
+                    simulate_seeds, shard, bot1_type, bot2_type, rows, cols,
+                    bot_options)
+        for shard in shards
+    ]
+    p1_wins, p2_wins, ties = 0, 0, 0
+    for future in futures:
+        (w1, w2, t), timings = future.result()
+        instrument.merge(timings)
+        p1_wins += w1
+        p2_wins += w2
+        ties += t
+    return p1_wins, p2_wins, ties
+
+
+def win_rate_interval(wins: int, games: int,
+                      confidence: float = 0.95) -> tuple[float, float]:
+    """
+    Wilson score interval for a win rate.
+
+    Args:
+        wins: Number of games won
+        games: Number of games played
+        confidence: Confidence level of the interval
+
+    Returns:
+        The (low, high) bounds of the interval, as fractions
+    """
+    if games == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    rate = wins / games
+    center = (rate + z * z / (2 * games)) / (1 + z * z / games)
+    spread = (z / (1 + z * z / games)) * math.sqrt(
+        rate * (1 - rate) / games + z * z / (4 * games * games)
+    )
+    return max(0.0, center - spread), min(1.0, center + spread)
+
+
+def difference_interval(p1_wins: int, p2_wins: int, games: int,
+                        confidence: float = 0.95) -> tuple[float, float]:
+    """
+    Normal-approximation interval for the difference between the win
+    rates of player 1 and player 2 (each game scores +1, -1 or 0).
+
+    Returns:
+        The (low, high) bounds of the interval, as fractions
+    """
+    if games == 0:
+        return -1.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    diff = (p1_wins - p2_wins) / games
+    variance = (p1_wins + p2_wins) / games - diff * diff
+    spread = z * math.sqrt(max(variance, 0.0) / games)
+    return diff - spread, diff + spread
+
+
+def simulate_sequential(max_games: int,
+                        bot1_type: str,
+                        bot2_type: str,
+                        rows: int = 3,
+                        cols: int = 4,
+                        bot_options: dict | None = None,
+                        seed: int | None = None,
+                        workers: int = 1,
+                        confidence: float = 0.95,
+                        tolerance: float = 0.02,
+                        check_every: int = 50) -> tuple[int, int, int]:
+    """
+    Like simulate, but stop early once the results are conclusive.
+
+    Every check_every games the interval for the difference of the win
+    rates (see difference_interval) is checked. The matchup stops when the
+    interval excludes 0 (one bot is better) or lies within +/- tolerance
+    (the bots are as good as each other). So that looking at the results
+    many times does not inflate the error rate, each check uses a
+    Bonferroni-corrected confidence over all the checks that could happen.
+
+    Games get the same seeds as in simulate, so a run that stops after
+    n games has the results simulate would give for n games.
+
+    Args:
+        max_games: Maximum number of games to simulate
+        bot1_type: Strategy for player 1
+        bot2_type: Strategy for player 2
+        rows: Number of rows in the tableau
+        cols: Number of columns in the tableau
+        bot_options: Extra constructor arguments for each strategy
+        seed: Master seed (drawn from the random module if None)
+        workers: Number of worker processes
+        confidence: Overall confidence of the stopping decision
+        tolerance: Largest win-rate difference counted as equivalent
+        check_every: Number of games between checks
+
+    Returns:
+        Tuple of (player1_wins, player2_wins, ties)
+    """
+    if seed is None:
+        seed = random.getrandbits(64)
+    checks = max(1, -(-max_games // check_every))
+    check_confidence = 1 - (1 - confidence) / checks
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    p1_wins, p2_wins, ties = 0, 0, 0
+    played = 0
+    try:
+        while played < max_games:
+            count = min(check_every, max_games - played)
+            seeds = [game_seed(seed, game_num)
+                     for game_num in range(played, played + count)]
+            if pool is None:
+                w1, w2, t = simulate_seeds(seeds, bot1_type, bot2_type,
+                                           rows, cols, bot_options)
             else:
-                p2_wins += 1
-        else:
-            ties += 1
+                w1, w2, t = _simulate_on_pool(pool, workers, seeds,
+                                              bot1_type, bot2_type, rows,
+                                              cols, bot_options)
+            p1_wins += w1
+            p2_wins += w2
+            ties += t
+            played += count
+
+            low, high = difference_interval(p1_wins, p2_wins, played,
+                                            check_confidence)
+            if low > 0 or high < 0:
+                break
+            if -tolerance <= low and high <= tolerance:
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown()
 
     return p1_wins, p2_wins, ties
 
-def cmd(num_games: int, player1: str, player2: str, rows: int = 3, cols: int = 4) -> None:
+
+def cmd(num_games: int, player1: str, player2: str, rows: int = 3,
+        cols: int = 4, bot_options: dict | None = None,
+        seed: int | None = None, workers: int = 1, batch: bool = False,
+        adaptive: bool = False,
+        confidence: float = 0.95, tolerance: float = 0.02,
+        check_every: int = 50, profile: bool = False,
+        profile_json: str | None = None, output: str | None = None,
+        resume: bool = False) -> None:
     """
-    Run 'num_games' simulations printing the results as percentages.
+    Run 'num_games' simulations printing the results as percentages,
+    with confidence intervals.
     
     Args:
         num_games: number of games to simulate
-        player1: strategy for player 1 ('random', 'greedy', or 'smart')
-        player2: strategy for player 2 ('random', 'greedy', or 'smart')
+        player1: strategy for player 1 ('random', 'greedy', 'smart' or 'mcts')
+        player2: strategy for player 2 ('random', 'greedy', 'smart' or 'mcts')
         rows: number of rows in the tableau (default: 3)
         cols: number of columns in the tableau (default: 4)
+        bot_options: extra constructor arguments for each strategy
+        seed: master seed of the simulation (random if None)
+        workers: number of worker processes
+        batch: play the games in lockstep with NumPy (see batch.py; only
+            for the 'random' and 'greedy' strategies)
+        adaptive: stop before 'num_games' once the results are conclusive
+            (see simulate_sequential)
+        confidence: confidence level of the intervals (and of stopping)
+        tolerance: win-rate difference counted as a draw when adaptive
+        check_every: games between checks when adaptive
+        profile: time the engine and bot methods and print a summary
+            (see instrument.py)
+        profile_json: file to write the timings to as JSON
+        output: file to stream a record of every game to, the results
+            are then read back from it (see records.py)
+        resume: only play the games missing from 'output' (the master
+            seed is then read from it if 'seed' is None)
+    """
+    if profile or profile_json:
+        instrument.reset()
+        instrument.enable(BOTS)
+    try:
+        if output:
+            from records import read_records, simulate_to_file, summarize
+            simulate_to_file(output, num_games, player1, player2, rows, cols,
+                             bot_options, seed, workers, resume)
+            summary = summarize(read_records(output))
+            p1_wins = summary["p1_wins"]
+            p2_wins = summary["p2_wins"]
+            ties = summary["ties"]
+        else:
+            p1_wins, p2_wins, ties = _run_simulation(
+                num_games, player1, player2, rows, cols, bot_options, seed,
+                workers, batch, adaptive, confidence, tolerance, check_every
+            )
+    finally:
+        instrument.disable()
+
+    played = p1_wins + p2_wins + ties
+    if played < num_games:
+        print(f"Stopped after {played} of {num_games} games")
+
+    def percent(count: int) -> str:
+        low, high = win_rate_interval(count, played, confidence)
+        return (f"{100 * count / played:.2f}% ({100 * confidence:g}% CI "
+                f"{100 * low:.2f}-{100 * high:.2f}%)")
+
+    print(f"Player 1 ({player1}) wins: {percent(p1_wins)}")
+    print(f"Player 2 ({player2}) wins: {percent(p2_wins)}")
+    print(f"Ties: {percent(ties)}")
+    low, high = difference_interval(p1_wins, p2_wins, played, confidence)
+    print(f"Difference: {100 * (p1_wins - p2_wins) / played:+.2f}% "
+          f"({100 * confidence:g}% CI {100 * low:+.2f} to {100 * high:+.2f}%)")
+    if output:
+        print(f"Mean scores: {summary['mean_score1']:.2f} - "
+              f"{summary['mean_score2']:.2f}, "
+              f"mean turns: {summary['mean_turns']:.1f}")
+
+    if profile:
+        print()
+        print(instrument.summary())
+    if profile_json:
+        instrument.export_json(profile_json)
+
+def _run_simulation(num_games: int, player1: str, player2: str, rows: int,
+                    cols: int, bot_options: dict | None, seed: int | None,
+                    workers: int, batch: bool, adaptive: bool,
+                    confidence: float, tolerance: float,
+                    check_every: int) -> tuple[int, int, int]:
+    """
+    Run the simulation cmd() asked for and return its results.
     """
-    p1_wins, p2_wins, ties = simulate(num_games, player1, player2, rows, cols)
-    print(f"Player 1 ({player1}) wins: {100 * p1_wins / num_games:.2f}%")
-    print(f"Player 2 ({player2}) wins: {100 * p2_wins / num_games:.2f}%")
-    print(f"Ties: {100 * ties / num_games:.2f}%")
+    if batch:
+        from batch import simulate_batch
+        return simulate_batch(num_games, player1, player2, rows, cols, seed)
+    if adaptive:
+        return simulate_sequential(num_games, player1, player2, rows, cols,
+                                   bot_options, seed, workers, confidence,
+                                   tolerance, check_every)
+    return simulate(num_games, player1, player2, rows, cols, bot_options,
+                    seed, workers)
 
 @click.command()
 @click.option('-n', '--num-games', type=int, default=1000)
 @click.option('-r', '--rows', type=int, default=3)
 @click.option('-c', '--cols', type=int, default=4)
-@click.option('-1', '--player1', type=click.Choice(['random', 'greedy', 'smart']), default='random')
-@click.option('-2', '--player2', type=click.Choice(['random', 'greedy', 'smart']), default='random')
-def main(num_games, rows, cols, player1, player2):
+@click.option('-1', '--player1', type=click.Choice(BOT_NAMES),
+              default='random')
+@click.option('-2', '--player2', type=click.Choice(BOT_NAMES),
+              default='random')
+@click.option('-s', '--seed', type=int, default=None,
+              help='Master seed (games are reproducible for a given seed)')
+@click.option('-w', '--workers', type=int, default=1,
+              help='Worker processes to spread the games over')
+@click.option('--batch', is_flag=True,
+              help='Simulate the games in lockstep with NumPy '
+                   '(random and greedy bots only)')
+@click.option('--adaptive', is_flag=True,
+              help='Stop once one bot is better or both are equivalent '
+                   '(--num-games is then the maximum)')
+@click.option('--confidence', type=float, default=0.95,
+              help='Confidence level of the intervals')
+@click.option('--tolerance', type=float, default=0.02,
+              help='Win-rate difference counted as equivalent (adaptive)')
+@click.option('--check-every', type=int, default=50,
+              help='Games between checks (adaptive)')
+@click.option('--profile', is_flag=True,
+              help='Time the bot and engine methods and print a summary')
+@click.option('--profile-json', type=click.Path(dir_okay=False),
+              default=None, help='Write the timings to this JSON file')
+@click.option('-o', '--output', type=click.Path(dir_okay=False),
+              default=None,
+              help='Stream a record of every game to this JSONL/CSV file')
+@click.option('--resume', is_flag=True,
+              help='Only play the games missing from --output (with the '
+                   'master seed found in it unless --seed is given)')
+@click.option('--mcts-rollouts', type=click.IntRange(min=0), default=200,
+              help='Rollouts per MCTS move (0 for no limit, which needs '
+                   '--mcts-time)')
+@click.option('--mcts-time', type=float, default=None,
+              help='Seconds of search per MCTS move')
+@click.option('--mcts-workers', type=int, default=1,
+              help='Worker processes for root-parallel MCTS')
+def main(num_games: int, rows: int, cols: int, player1: str, player2: str,
+         seed: int | None, workers: int, batch: bool, adaptive: bool,
+         confidence: float, tolerance: float, check_every: int,
+         profile: bool, profile_json: str | None, output: str | None,
+         resume: bool, mcts_rollouts: int, mcts_time: float | None,
+         mcts_workers: int) -> None:
     """Run Letters game simulations with bot players"""
-    cmd(num_games, player1, player2, rows, cols)
+    if batch and not {player1, player2} <= {'random', 'greedy'}:
+        raise click.UsageError("--batch only supports the random and "
+                               "greedy bots.")
+    if batch and adaptive:
+        raise click.UsageError("--batch cannot be combined with --adaptive.")
+    if output and (batch or adaptive):
+        raise click.UsageError("--output cannot be combined with --batch "
+                               "or --adaptive.")
+    if resume and not output:
+        raise click.UsageError("--resume needs --output.")
+    if not 0 < confidence < 1:
+        raise click.BadParameter("must be between 0 and 1",
+                                 param_hint='--confidence')
+    if not mcts_rollouts and mcts_time is None:
+        raise click.BadParameter("0 (no limit) needs a --mcts-time budget",
+                                 param_hint='--mcts-rollouts')
+    bot_options = {'mcts': {'rollouts': mcts_rollouts or None,
+                            'time_limit': mcts_time,
+                            'workers': mcts_workers}}
+    cmd(num_games, player1, player2, rows, cols, bot_options, seed, workers,
+        batch, adaptive, confidence, tolerance, check_every, profile,
+        profile_json, output, resume)
 
 if __name__ == "__main__":
     if len(sys.argv) == 4 and all(not arg.startswith('-') for arg in sys.argv[1:]):
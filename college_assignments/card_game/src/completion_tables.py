@@ -0,0 +1,168 @@
+"""
+Precomputed completion tables for the standard and extended decks.
+
+Which card completes a partial fit only depends on the digits of the card
+codes (see deck.CardSchema), so for the two canonical decks the answer is
+looked up in a table generated once and shipped in src/data:
+
+- completion_3x4.bin, the standard deck (4 features with 3 values): one
+  byte per pair of codes, the code of the card completing the pair, at
+  index a * 81 + b.
+- completion_4x5.bin, the extended deck (5 features with 4 values, fit
+  size 4): a table over all 1024**3 triples of codes would take a GiB, so
+  the table works on chunks of two features instead. A code of base 4 has
+  two bits per digit, so a chunk is 4 bits of the code, and the byte at
+  index (x << 8) | (y << 4) | z is the chunk completing the chunks x, y and
+  z, or NO_COMPLETION. Three lookups complete a code.
+
+The tables are read into an array on first use. Running this module
+regenerates the files.
+"""
+from array import array
+import os
+import click
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# Marks a chunk that no card can complete
+NO_COMPLETION = 0xFF
+
+# Features per chunk of the extended table, and bits per chunk
+CHUNK_FEATURES = 2
+CHUNK_BITS = 4
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+# (values per feature, number of features) of the decks with a table
+STANDARD = (3, 4)
+EXTENDED = (4, 5)
+
+_loaded: dict[tuple[int, int], array | None] = {}
+
+
+def table_path(base: int, nfeatures: int) -> str:
+    return os.path.join(DATA_DIR, f"completion_{base}x{nfeatures}.bin")
+
+
+def load_table(base: int, nfeatures: int) -> array | None:
+    """
+    Returns the completion table of the deck with 'nfeatures' features of
+    'base' values each, or None if there is no table for that deck (or
+    its file is missing).
+    """
+    key = (base, nfeatures)
+    if key not in _loaded:
+        table = None
+        path = table_path(base, nfeatures)
+        if key in (STANDARD, EXTENDED) and os.path.exists(path):
+            table = array("B")
+            with open(path, "rb") as f:
+                table.frombytes(f.read())
+        _loaded[key] = table
+    return _loaded[key]
+
+
+def pair_completion(table: array, size: int, a: int, b: int) -> int:
+    """
+    Looks up the card completing the codes a and b in the table of a deck
+    of 'size' cards with 3 values per feature.
+    """
+    return table[a * size + b]
+
+
+def chunk_completion(table: array, nfeatures: int,
+                     codes: list[int]) -> int | None:
+    """
+    Looks up the card completing three codes of a deck with 4 values per
+    feature, one chunk at a time, or None if no card completes them.
+    """
+    a, b, c = codes
+    code = 0
+    for shift in range(0, 2 * nfeatures, CHUNK_BITS):
+        chunk = table[((a >> shift) & CHUNK_MASK) << 2 * CHUNK_BITS
+                      | ((b >> shift) & CHUNK_MASK) << CHUNK_BITS
+                      | ((c >> shift) & CHUNK_MASK)]
+        if chunk == NO_COMPLETION:
+            return None
+        code |= chunk << shift
+    return code
+
+
+def _complete_digits(digits: list[int], base: int) -> int | None:
+    """
+    The digit completing the given digits (all equal or all different),
+    or None if there is none.
+    """
+    distinct = set(digits)
+    if len(distinct) == 1:
+        return digits[0]
+    if len(distinct) == base - 1:
+        return (set(range(base)) - distinct).pop()
+    return None
+
+
+def generate_pair_table(base: int, nfeatures: int) -> array:
+    """
+    Computes the pair table of a deck with 3 values per feature.
+    """
+    size = base ** nfeatures
+    powers = [base ** i for i in range(nfeatures)]
+    table = array("B", bytes(size * size))
+    for a in range(size):
+        for b in range(size):
+            table[a * size + b] = sum(
+                _complete_digits([a // p % base, b // p % base], base) * p
+                for p in powers
+            )
+    return table
+
+
+def generate_chunk_table(base: int) -> array:
+    """
+    Computes the chunk table of a deck with 4 values per feature.
+    """
+    chunks = 1 << CHUNK_BITS
+    table = array("B", bytes(chunks ** 3))
+    for x in range(chunks):
+        for y in range(chunks):
+            for z in range(chunks):
+                chunk = 0
+                for i in range(CHUNK_FEATURES):
+                    digit = _complete_digits(
+                        [x // base ** i % base, y // base ** i % base,
+                         z // base ** i % base], base)
+                    if digit is None:
+                        chunk = NO_COMPLETION
+                        break
+                    chunk += digit * base ** i
+                table[(x << 2 * CHUNK_BITS) | (y << CHUNK_BITS) | z] = chunk
+    return table
+
+
+def generate(base: int, nfeatures: int) -> array:
+    """
+    Computes the table of one of the canonical decks.
+
+    Raises:
+        ValueError: If the deck has no table
+    """
+    if (base, nfeatures) == STANDARD:
+        return generate_pair_table(base, nfeatures)
+    if (base, nfeatures) == EXTENDED:
+        return generate_chunk_table(base)
+    raise ValueError(f"No completion table for {nfeatures} features "
+                     f"with {base} values.")
+
+
+@click.command()
+def main() -> None:
+    """Regenerate the completion tables in src/data"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    for base, nfeatures in (STANDARD, EXTENDED):
+        path = table_path(base, nfeatures)
+        with open(path, "wb") as f:
+            generate(base, nfeatures).tofile(f)
+        print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
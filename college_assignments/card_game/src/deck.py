@@ -0,0 +1,663 @@
+"""
+Decks of Letters cards
+"""
+
+from collections.abc import Iterator
+import copy
+import random
+from typing import Generic, Protocol, TypeVar
+
+from base import CardType
+import completion_tables
+
+
+class Card:
+    """
+    Represents a single card in the game
+
+    Cards are immutable and hashable, and two cards are equal when they
+    have the same features. The cards of a deck are interned by its
+    CardSchema (see CardSchema.card): each distinct card exists once, as
+    its code and the value index of every feature, and its feature
+    dictionary is only built from the schema when it is first asked for.
+    Card(features) still makes a stand-alone card from a dictionary.
+    """
+    __slots__ = ("code", "values", "schema", "_features", "_hash")
+
+    code: int | None
+    values: tuple[int, ...] | None
+    schema: "CardSchema | None"
+    _features: CardType | None
+    _hash: int | None
+
+    def __init__(self, features: CardType, code: int | None = None) -> None:
+        """
+        Initializes a card.
+
+        Args:
+            features (CardType): The feature dictionary of the card
+            code (int | None): The integer code of the card (see CardSchema),
+            or None if the card has not been interned
+        """
+        init = object.__setattr__
+        init(self, "code", code)
+        init(self, "values", None)
+        init(self, "schema", None)
+        init(self, "_features", features)
+        init(self, "_hash", None)
+
+    @classmethod
+    def interned(cls, schema: "CardSchema", code: int,
+                 features: CardType | None = None) -> "Card":
+        """
+        Makes the card with the given code in a schema. Use
+        CardSchema.card, which keeps one card per code, instead.
+        """
+        card = cls.__new__(cls)
+        init = object.__setattr__
+        init(card, "code", code)
+        init(card, "values", tuple(schema.digits(code)))
+        init(card, "schema", schema)
+        init(card, "_features", features)
+        init(card, "_hash", None)
+        return card
+
+    @property
+    def features(self) -> CardType:
+        """
+        The feature dictionary of the card
+        """
+        features = self._features
+        if features is None:
+            assert self.schema is not None and self.code is not None
+            features = self.schema.decode(self.code)
+            object.__setattr__(self, "_features", features)
+        return features
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError("Cards are immutable.")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("Cards are immutable.")
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Card):
+            return NotImplemented
+        if self.schema is not None and self.schema is other.schema:
+            return self.code == other.code
+        return self.features == other.features
+
+    def __hash__(self) -> int:
+        value = self._hash
+        if value is None:
+            value = hash(frozenset(self.features.items()))
+            object.__setattr__(self, "_hash", value)
+        return value
+
+    def __reduce__(self) -> tuple:
+        return (Card, (self.features, self.code))
+
+    def __repr__(self) -> str:
+        return f"Card({self.features})"
+
+
+class CardSchema:
+    """
+    Interns cards into compact integer codes.
+
+    Every feature gets one digit in base `fit_size`, and each digit holds
+    the index of the card's value for that feature (values are numbered
+    in order of first appearance in the deck, and the first feature is the
+    most significant digit). With this encoding, fit checks only need
+    integer arithmetic on the codes.
+    """
+    def __init__(self, cards: list[CardType], base: int) -> None:
+        """
+        Builds the schema from a list of cards.
+
+        Args:
+            cards (list[CardType]): The cards of the deck
+            base (int): Number of values per feature (the fit size)
+        """
+        self.base = base
+        self.features = list(cards[0].keys()) if cards else []
+        self.values: list[list[str]] = [[] for _ in self.features]
+        self._index: list[dict[str, int]] = [{} for _ in self.features]
+        for card in cards:
+            for i, feature in enumerate(self.features):
+                value = card[feature]
+                if value not in self._index[i]:
+                    self._index[i][value] = len(self.values[i])
+                    self.values[i].append(value)
+
+        nfeatures = len(self.features)
+        self.powers = [base ** (nfeatures - 1 - i) for i in range(nfeatures)]
+        self._table = completion_tables.load_table(base, nfeatures)
+        # The interned cards, by code (see card)
+        self._cards: dict[int, Card] = {}
+
+    @classmethod
+    def from_values(cls, features: dict[str, list[str]]) -> "CardSchema":
+        """
+        Builds the schema of the full deck with the given feature values,
+        without materializing its cards.
+
+        Args:
+            features (dict[str, list[str]]): The values of each feature
+            (every feature must have the same number of values)
+        """
+        values = list(features.values())
+        schema = cls([], len(values[0]) if values else 0)
+        schema.features = list(features)
+        schema.values = [list(vals) for vals in values]
+        schema._index = [
+            {value: i for i, value in enumerate(vals)} for vals in values
+        ]
+        nfeatures = len(schema.features)
+        schema.powers = [
+            schema.base ** (nfeatures - 1 - i) for i in range(nfeatures)
+        ]
+        schema._table = completion_tables.load_table(schema.base, nfeatures)
+        schema._cards = {}
+        return schema
+
+    def card(self, code: int, features: CardType | None = None) -> Card:
+        """
+        Returns the Card with the given code, which is made the first time
+        it is asked for and shared from then on.
+
+        Args:
+            code (int): The code of the card
+            features (CardType | None): The card's feature dictionary, if
+            it is already at hand (otherwise it is decoded when needed)
+        """
+        card = self._cards.get(code)
+        if card is None:
+            card = self._cards[code] = Card.interned(self, code, features)
+        return card
+
+    def encode(self, card: CardType) -> int | None:
+        """
+        Returns the integer code of a card dictionary, or None if the
+        card uses a feature value that is not part of the schema.
+        """
+        code = 0
+        for i, feature in enumerate(self.features):
+            value = card.get(feature)
+            digit = None if value is None else self._index[i].get(value)
+            if digit is None:
+                return None
+            code = code * self.base + digit
+        return code
+
+    def decode(self, code: int) -> CardType:
+        """
+        Returns the card dictionary for an integer code.
+        """
+        digits = self.digits(code)
+        return {
+            feature: self.values[i][digits[i]]
+            for i, feature in enumerate(self.features)
+        }
+
+    def digits(self, code: int) -> list[int]:
+        """
+        Returns the value index of every feature of a card code (in the
+        order of the schema's features).
+        """
+        digits = []
+        for _ in self.features:
+            code, digit = divmod(code, self.base)
+            digits.append(digit)
+        digits.reverse()
+        return digits
+
+    def is_fit(self, codes: list[int]) -> bool:
+        """
+        Checks whether `base` cards (given by their codes) form a fit,
+        that is, whether every digit is either all the same or all
+        different across the codes.
+
+        Args:
+            codes (list[int]): The codes of the cards
+
+        Returns:
+            bool: True if the cards form a fit, False otherwise
+        """
+        base = self.base
+        nfeatures = len(self.features)
+
+        if base == 3 and len(codes) == 3:
+            # With three values, three digits are all the same or all
+            # different exactly when their sum is a multiple of 3
+            a, b, c = codes
+            for _ in range(nfeatures):
+                if (a % 3 + b % 3 + c % 3) % 3:
+                    return False
+                a //= 3
+                b //= 3
+                c //= 3
+            return True
+
+        ncards = len(codes)
+        rest = list(codes)
+        for _ in range(nfeatures):
+            mask = 0
+            for i in range(ncards):
+                rest[i], digit = divmod(rest[i], base)
+                mask |= 1 << digit
+            distinct = mask.bit_count()
+            if distinct != 1 and distinct != ncards:
+                return False
+        return True
+
+    def completion(self, codes: list[int]) -> int | None:
+        """
+        Returns the code of the only card that completes a fit together
+        with `base - 1` given cards, or None if no card can complete it.
+
+        For each digit, the missing card must repeat the value if the given
+        cards all share it, or take the one unused value if they are all
+        different. Any other combination of digits cannot be completed.
+        For the standard and extended decks the answer is looked up in a
+        precomputed table (see completion_tables).
+
+        Args:
+            codes (list[int]): The codes of the `base - 1` given cards
+
+        Returns:
+            int | None: The code of the completing card, if any
+        """
+        base = self.base
+        table = self._table
+
+        if table is not None and len(codes) == base - 1:
+            if base == 3:
+                return completion_tables.pair_completion(
+                    table, base ** len(self.powers), codes[0], codes[1]
+                )
+            return completion_tables.chunk_completion(
+                table, len(self.powers), codes
+            )
+
+        if base == 3 and len(codes) == 2:
+            a, b = codes
+            code = 0
+            for power in reversed(self.powers):
+                code += ((-(a % 3) - (b % 3)) % 3) * power
+                a //= 3
+                b //= 3
+            return code
+
+        full = (1 << base) - 1
+        rest = list(codes)
+        code = 0
+        for power in reversed(self.powers):
+            mask = 0
+            for i in range(len(rest)):
+                rest[i], digit = divmod(rest[i], base)
+                mask |= 1 << digit
+            distinct = mask.bit_count()
+            if distinct == 1:
+                digit = mask.bit_length() - 1
+            elif distinct == base - 1:
+                digit = (full ^ mask).bit_length() - 1
+            else:
+                return None
+            code += digit * power
+        return code
+
+
+class Deck:
+    """
+    A validated deck of cards, interned through a CardSchema.
+
+    Validating a list of cards (see LettersGameBase.__init__) and interning
+    it is done once, when the Deck is created. Shuffled copies of the deck
+    share the schema and the Card objects, and LettersGame accepts a Deck
+    in place of a list of cards without validating it again.
+    """
+    def __init__(self, cards: list[CardType], fit_size: int) -> None:
+        """
+        Validates and interns a list of cards.
+
+        Args:
+            cards (list[CardType]): The cards, in dealing order
+            fit_size (int): Fit size of the games the deck is used in
+
+        Raises:
+            ValueError: If the cards do not all have the same features, if
+            any feature does not have exactly `fit_size` distinct values, or
+            if there are duplicate cards
+        """
+        if not cards:
+            raise ValueError("The deck has no cards.")
+
+        all_keys = cards[0].keys()
+        for card in cards[1:]:
+            if card.keys() != all_keys:
+                raise ValueError("Not all cards share the same feature keys.")
+
+        for key in all_keys:
+            distinct_vals = {card[key] for card in cards}
+            if len(distinct_vals) != fit_size:
+                raise ValueError(
+                    f"For feature '{key}', must have exactly {fit_size} "
+                    f"distinct values across the deck."
+                )
+
+        seen_cards = set()
+        for cd in cards:
+            tup = tuple(sorted(cd.items()))
+            if tup in seen_cards:
+                raise ValueError("Duplicate card found in the deck.")
+            seen_cards.add(tup)
+
+        self.fit_size = fit_size
+        self.schema = CardSchema(cards, fit_size)
+        self._cards = []
+        for cd in cards:
+            # Every card encodes, since the schema was built from them
+            code = self.schema.encode(cd)
+            assert code is not None
+            self._cards.append(self.schema.card(code, cd))
+
+    @classmethod
+    def _from_cards(cls, schema: CardSchema, cards: list[Card]) -> "Deck":
+        """
+        Builds a deck from already interned cards (no validation).
+        """
+        deck = cls.__new__(cls)
+        deck.fit_size = schema.base
+        deck.schema = schema
+        deck._cards = cards
+        return deck
+
+    @property
+    def cards(self) -> list[Card]:
+        """
+        Returns the cards of the deck, in order.
+        """
+        return self._cards
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    def __getitem__(self, idx: int) -> Card:
+        return self._cards[idx]
+
+    def __iter__(self) -> Iterator[Card]:
+        return iter(self._cards)
+
+    def shuffled(self, rng: random.Random | None = None) -> "Deck":
+        """
+        Returns a shuffled copy of the deck.
+
+        Args:
+            rng (random.Random | None): Random number generator to shuffle
+            with (the random module if None)
+
+        Returns:
+            Deck: The same cards in a random order
+        """
+        cards = self._cards[:]
+        (rng or random).shuffle(cards)
+        return Deck._from_cards(self.schema, cards)
+
+    def reordered(self, order: list[int]) -> "Deck":
+        """
+        Returns a copy of the deck with the cards in the given order.
+
+        Args:
+            order (list[int]): A permutation of the card indices
+
+        Returns:
+            Deck: The deck where card i is card order[i] of this deck
+        """
+        return Deck._from_cards(self.schema, [self._cards[i] for i in order])
+
+    def dicts(self) -> list[CardType]:
+        """
+        Returns the feature dictionaries of the cards, in order.
+        """
+        return [card.features for card in self]
+
+    def codes(self) -> list[int]:
+        """
+        Returns the codes of the cards (see CardSchema), in order.
+        """
+        codes = []
+        for card in self._cards:
+            # The cards of a deck are interned by its schema
+            assert card.code is not None
+            codes.append(card.code)
+        return codes
+
+
+class LazyDeck(Deck):
+    """
+    The deck made of every combination of feature values, generated on
+    demand.
+
+    Card i of the unshuffled deck is the card whose code (see CardSchema)
+    is i, so no card is built until it is drawn. Shuffling does not move
+    any cards either: a shuffled LazyDeck maps positions to codes. Up to
+    _SHUFFLE_LIMIT cards the codes are shuffled as a list of integers;
+    past that the map is a keyed permutation (a Feistel network over the
+    code space), so the memory used by the deck does not depend on how
+    many cards it has.
+    """
+    def __init__(self, features: dict[str, list[str]]) -> None:
+        """
+        Validates the feature values.
+
+        Args:
+            features (dict[str, list[str]]): The values of each feature
+
+        Raises:
+            ValueError: If there are no features, if some feature does not
+            have the same number of values as the others, or if a feature
+            has a repeated value
+        """
+        if not features:
+            raise ValueError("The deck has no features.")
+
+        fit_size = len(next(iter(features.values())))
+        for key, values in features.items():
+            if len(values) != fit_size or len(set(values)) != fit_size:
+                raise ValueError(
+                    f"For feature '{key}', must have exactly {fit_size} "
+                    f"distinct values across the deck."
+                )
+
+        self.fit_size = fit_size
+        self.schema = CardSchema.from_values(features)
+        self._size = fit_size ** len(features)
+        self._order: list[int] | None = None
+        self._keys: tuple[int, ...] = ()
+
+    @property
+    def cards(self) -> list[Card]:
+        """
+        Returns every card of the deck, in order (this builds the whole
+        deck, so it should be avoided for large feature spaces).
+        """
+        return list(self)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, idx: int) -> Card:
+        if not 0 <= idx < self._size:
+            raise IndexError("deck index out of range")
+        return self.schema.card(self._permute(idx))
+
+    def __iter__(self) -> Iterator[Card]:
+        return (self[i] for i in range(self._size))
+
+    def shuffled(self, rng: random.Random | None = None) -> "LazyDeck":
+        """
+        Returns a shuffled copy of the deck.
+
+        Args:
+            rng (random.Random | None): Random number generator used to seed
+            the permutation (the random module if None)
+
+        Returns:
+            LazyDeck: The same cards in a random order
+        """
+        source = rng or random
+        deck = copy.copy(self)
+        if self._size <= _SHUFFLE_LIMIT:
+            deck._order = list(range(self._size))
+            source.shuffle(deck._order)
+            deck._keys = ()
+        else:
+            deck._order = None
+            deck._keys = tuple(source.getrandbits(64)
+                               for _ in range(_ROUNDS))
+        return deck
+
+    def reordered(self, order: list[int]) -> Deck:
+        """
+        Returns a copy of the deck with the cards in the given order (as a
+        regular Deck, since the order has to be stored).
+        """
+        return Deck._from_cards(self.schema, [self[i] for i in order])
+
+    def codes(self) -> list[int]:
+        """
+        Returns the codes of the cards, in order, without building them.
+        """
+        if self._order is not None:
+            return list(self._order)
+        return [self._permute(i) for i in range(self._size)]
+
+    def _permute(self, idx: int) -> int:
+        """
+        Maps a position in the deck to the code of the card at that
+        position.
+        """
+        if self._order is not None:
+            return self._order[idx]
+        if not self._keys:
+            return idx
+
+        half = max(1, ((self._size - 1).bit_length() + 1) // 2)
+        mask = (1 << half) - 1
+        value = idx
+        while True:
+            left, right = value >> half, value & mask
+            for key in self._keys:
+                # Round function: the SplitMix64 finalizer of the keyed half
+                mixed = right ^ key
+                mixed = ((mixed ^ (mixed >> 30)) * _MIX1) & _WORD
+                mixed = ((mixed ^ (mixed >> 27)) * _MIX2) & _WORD
+                mixed ^= mixed >> 31
+                left, right = right, left ^ (mixed & mask)
+            value = (left << half) | right
+            # Cycle walking: the network permutes [0, 4^half), so keep
+            # going until we land back inside the deck
+            if value < self._size:
+                return value
+
+
+CardT = TypeVar("CardT")
+CardT_co = TypeVar("CardT_co", covariant=True)
+
+
+class CardSequence(Protocol[CardT_co]):
+    """
+    What DrawPile needs from its cards: a length and indexing (lists,
+    Decks and LazyDecks all have both).
+    """
+    def __len__(self) -> int: ...
+
+    def __getitem__(self, idx: int, /) -> CardT_co: ...
+
+
+class DrawPile(Generic[CardT]):
+    """
+    The cards left to draw from a deck.
+
+    The underlying sequence of cards (a list, a Deck or a LazyDeck) is never
+    modified: the pile is a cursor into it, so drawing, peeking at the next
+    card and counting the cards left all take constant time, and the whole
+    state of the pile is one integer that can be saved with snapshot() and
+    brought back with restore() (for replays, clones and undo).
+    """
+    def __init__(self, cards: CardSequence[CardT], start: int = 0) -> None:
+        """
+        Initializes the pile.
+
+        Args:
+            cards (CardSequence): The cards, in drawing order
+            start (int): Index of the first card to draw
+        """
+        self._cards = cards
+        self._size = len(cards)
+        self._pos = min(start, self._size)
+
+    def __len__(self) -> int:
+        return self._size - self._pos
+
+    def __bool__(self) -> bool:
+        return self._pos < self._size
+
+    @property
+    def position(self) -> int:
+        """
+        Returns the index (in the underlying sequence) of the next card.
+        """
+        return self._pos
+
+    def draw(self) -> CardT:
+        """
+        Draws the next card.
+
+        Raises:
+            IndexError: If the pile is empty
+        """
+        if self._pos >= self._size:
+            raise IndexError("draw from an empty pile")
+        card = self._cards[self._pos]
+        self._pos += 1
+        return card
+
+    def peek(self, n: int = 1) -> list[CardT]:
+        """
+        Returns the next n cards (or fewer, if the pile runs out) without
+        drawing them.
+        """
+        return [
+            self._cards[i]
+            for i in range(self._pos, min(self._pos + n, self._size))
+        ]
+
+    def snapshot(self) -> int:
+        """
+        Returns the state of the pile (see restore).
+        """
+        return self._pos
+
+    def restore(self, snapshot: int) -> None:
+        """
+        Puts the pile back in the state returned by snapshot().
+        """
+        self._pos = snapshot
+
+    def copy(self) -> "DrawPile[CardT]":
+        """
+        Returns an independent pile over the same cards.
+        """
+        return DrawPile(self._cards, self._pos)
+
+
+# Parameters of the permutation used by LazyDeck: decks up to
+# _SHUFFLE_LIMIT cards are shuffled as a list of codes, larger ones
+# through a Feistel network of _ROUNDS rounds
+_SHUFFLE_LIMIT = 1 << 16
+_ROUNDS = 8
+_MIX1 = 0xBF58476D1CE4E5B9
+_MIX2 = 0x94D049BB133111EB
+_WORD = (1 << 64) - 1
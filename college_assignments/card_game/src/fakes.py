@@ -7,10 +7,38 @@ implement a LettersGameFake implementation.
 
 import copy
 
-from base import LettersGameBase, CardType, PositionType, TableauType
+from base import (LettersGameBase, CardType, PositionType, TableauType,
+                  TableauView, mask_positions)
+from deck import Deck, DrawPile
 
 
-class LettersGameStub(LettersGameBase):
+class _Occupancy:
+    """
+    Tableau cards kept in a flat list, with the occupied positions as a
+    bitmask and their count
+    """
+
+    _cards: list[CardType | None]
+    _occupancy: int
+    _occupied: int
+    _non_empty: frozenset[PositionType] | None
+
+    def _place(self, i: int, card: CardType | None) -> None:
+        """
+        Puts a card (or None) at index i of the tableau, updating the
+        occupied positions
+        """
+        if self._cards[i] is not None:
+            self._occupancy &= ~(1 << i)
+            self._occupied -= 1
+        if card is not None:
+            self._occupancy |= 1 << i
+            self._occupied += 1
+        self._cards[i] = card
+        self._non_empty = None
+
+
+class LettersGameStub(_Occupancy, LettersGameBase):
     """
     Stub implementation of LettersGameBase.
 
@@ -60,6 +88,12 @@ class LettersGameStub(LettersGameBase):
             self._cards.append(c.copy())
         self._done = False
 
+        # Occupied positions as a bitmask and their count, kept up to date
+        # by _place
+        self._occupancy = (1 << len(self._cards)) - 1
+        self._occupied = len(self._cards)
+        self._non_empty = None
+
     @property
     def active_players(self) -> set[int]:
         """
@@ -78,17 +112,22 @@ class LettersGameStub(LettersGameBase):
         return tableau
 
     @property
-    def non_empty_positions(self) -> set[PositionType]:
+    def non_empty_positions(self) -> frozenset[PositionType]:
         """
         Returns a list of non-empty positions on the tableau
         """
-        positions = set()
-        for r in range(self.nrows):
-            for c in range(self.ncols):
-                i = r * self.ncols + c
-                if self._cards[i] is not None:
-                    positions.add((r, c))
-        return positions
+        if self._non_empty is None:
+            self._non_empty = frozenset(
+                mask_positions(self._occupancy, self.ncols)
+            )
+        return self._non_empty
+
+    @property
+    def occupied_count(self) -> int:
+        """
+        See LettersGameBase.occupied_count
+        """
+        return self._occupied
 
     @property
     def done(self) -> bool:
@@ -145,7 +184,7 @@ class LettersGameStub(LettersGameBase):
 
         for pos in positions:
             r, c = pos
-            self._cards[r * self.ncols + c] = None
+            self._place(r * self.ncols + c, None)
 
         return True
 
@@ -172,11 +211,11 @@ class LettersGameStub(LettersGameBase):
 # Your LettersGameFake implementation goes here
 #
 
-class LettersGameFake(LettersGameBase):
+class LettersGameFake(_Occupancy, LettersGameBase):
 
 
     def __init__(self, 
-                 cards: list[CardType], 
+                 cards: list[CardType] | Deck, 
                  fit_size: int, 
                  tableau_size: tuple[int,int], 
                  num_players: int, 
@@ -188,28 +227,37 @@ class LettersGameFake(LettersGameBase):
         if tableau_size[0] * tableau_size[1] < fit_size:
             raise ValueError
         
-        for i in range(len(cards)-1):
-            if cards[i].keys() != cards[i+1].keys():
-                raise ValueError('keys are not same')
-
-        for key in cards[0].keys():
-            uniques = set()
-            for i in range(len(cards)):
-                uniques.add(cards[i][key])
-            if len(uniques) != fit_size:
+        #A Deck was already validated when it was built
+        if isinstance(cards, Deck):
+            if cards.fit_size != fit_size:
                 raise ValueError('Fit size is wack')
-        
-        seen_card = set()
-        for card in cards:
-            card_tuple = tuple(sorted(card.items()))
-            if card_tuple in seen_card:
-                raise ValueError('Cards are same')
-            
-            seen_card.add(card_tuple)
-        
+            cards = cards.dicts()
+        else:
+            for i in range(len(cards)-1):
+                if cards[i].keys() != cards[i+1].keys():
+                    raise ValueError('keys are not same')
+
+            for key in cards[0].keys():
+                uniques = set()
+                for i in range(len(cards)):
+                    uniques.add(cards[i][key])
+                if len(uniques) != fit_size:
+                    raise ValueError('Fit size is wack')
+
+            seen_card = set()
+            for card in cards:
+                card_tuple = tuple(sorted(card.items()))
+                if card_tuple in seen_card:
+                    raise ValueError('Cards are same')
+
+                seen_card.add(card_tuple)
+
         super().__init__(cards, fit_size, tableau_size, num_players, lightning)
-        self.deck = cards[tableau_size[0] * tableau_size[1]:]
-        self._cards = cards[:tableau_size[0] * tableau_size[1]]
+        self.deck = DrawPile(cards, tableau_size[0] * tableau_size[1])
+        self._cards = list(cards[:tableau_size[0] * tableau_size[1]])
+        self._occupancy = (1 << len(self._cards)) - 1
+        self._occupied = len(self._cards)
+        self._non_empty = None
         
         self._scores = {p: 0 for p in range(1, self.num_players + 1)}
         self._done = False
@@ -264,29 +312,31 @@ class LettersGameFake(LettersGameBase):
         return set(range(1, self._num_players + 1))
 
     @property
-    def tableau(self) -> TableauType:
+    def tableau(self) -> TableauView:
         """
         See LettersGameBase.call_fit
         """
         
-        tableau: TableauType = []
-        for r in range(self.nrows):
-            tableau.append(self._cards[r * self.ncols : (r + 1) * self.ncols])
-        return tableau
+        return TableauView(self._cards.__getitem__, self.nrows, self.ncols)
 
     @property
-    def non_empty_positions(self) -> set[PositionType]:
+    def non_empty_positions(self) -> frozenset[PositionType]:
         """
         See LettersGameBase.call_fit
         """
     
-        positions = set()
-        for r in range(self.nrows):
-            for c in range(self.ncols):
-                i = r * self.ncols + c
-                if self._cards[i] is not None:
-                    positions.add((r, c))
-        return positions
+        if self._non_empty is None:
+            self._non_empty = frozenset(
+                mask_positions(self._occupancy, self.ncols)
+            )
+        return self._non_empty
+
+    @property
+    def occupied_count(self) -> int:
+        """
+        See LettersGameBase.occupied_count
+        """
+        return self._occupied
 
     @property
     def done(self) -> bool:
@@ -333,9 +383,7 @@ class LettersGameFake(LettersGameBase):
         if not(0 <= i < self.nrows and 0 <= j < self.ncols):
             raise ValueError
         
-        tableau = self.tableau
-        
-        return tableau[i][j]
+        return self._cards[i * self.ncols + j]
 
     def call_fit(self, player: int, positions: list[PositionType]) -> bool:
         """
@@ -374,15 +422,15 @@ class LettersGameFake(LettersGameBase):
 
                 for pos in positions:
                     i, j = pos
-                    self._cards[i * self.ncols + j] = None
+                    self._place(i * self.ncols + j, None)
 
                 for pos in positions:
                     if len(self.deck) == 0:
                         continue 
 
                     i, j = pos
-                    new_card = self.deck.pop(0)
-                    self._cards[i * self.ncols + j] = new_card
+                    new_card = self.deck.draw()
+                    self._place(i * self.ncols + j, new_card)
                 
                 return True
 
@@ -397,10 +445,8 @@ class LettersGameFake(LettersGameBase):
         if self.moonshot:
             raise ValueError("Error Here Bro")
         
-        for i, row in enumerate(self.tableau):
-            for j, val in enumerate(row):
-                if self.tableau[i][j] == None:
-                    raise ValueError("Called Moonshot here")
+        if not self.is_full:
+            raise ValueError("Called Moonshot here")
                 
         if self.lightning:
             if player not in self.active_players:
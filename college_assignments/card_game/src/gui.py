@@ -2,9 +2,10 @@
 GUI for Milestone #3
 """
 import sys
-import random
 import pygame
+from base import PositionType, Recorder
 from letters import LettersGame
+from deck import LazyDeck
 
 #some constants
 WINDOW_WIDTH, WINDOW_HEIGHT = 800, 600
@@ -18,24 +19,16 @@ BUTTON_TEXT_COLOR = (0, 0, 0)
 HIGHLIGHT_COLOR = (255, 255, 0)
 MESSAGE_COLOR = (255, 255, 255)
 
-def standard_deck() -> list[dict[str, str]]:
+def standard_deck() -> LazyDeck:
     """
-    Return a standard deck of Letters cards.
+    Return a standard deck of Letters cards (generated when dealt).
     """
-    letters = ["A", "B", "C"]
-    numbers = ["1", "2", "3"]
-    colors = ["red", "green", "blue"]
-    fonts = FONTS
-
-    all_cards = [
-        {"letter": letter, "number": number, "color": color, "font": font}
-        for letter in letters
-        for number in numbers
-        for color in colors
-        for font in fonts
-    ]
-
-    return all_cards
+    return LazyDeck({
+        "letter": ["A", "B", "C"],
+        "number": ["1", "2", "3"],
+        "color": ["red", "green", "blue"],
+        "font": FONTS,
+    })
 
 class Button:
     def __init__(self, x, y, width, height, text, font_size=24):
@@ -63,7 +56,8 @@ class Button:
         return self.rect.collidepoint(pos)
 
 class LettersGUI:
-    def __init__(self, rows: int, cols: int, num_players: int) -> None:
+    def __init__(self, rows: int, cols: int, num_players: int,
+                 recorder: Recorder | None = None) -> None:
         pygame.init()
         pygame.font.init()
         self.rows, self.cols = rows, cols
@@ -73,9 +67,10 @@ class LettersGUI:
         pygame.display.set_caption("Letters Game")
         self.start_button = Button(WINDOW_WIDTH // 2 - 100, WINDOW_HEIGHT // 
                                    2 + 50, 200, 60, "Start Game")
-        deck = standard_deck()
-        random.shuffle(deck)
+        deck = standard_deck().shuffled()
         self.game = LettersGame(deck, 3, (rows, cols), num_players)
+        if recorder is not None:
+            self.game.record(recorder)
         self.running = True
         self.selected_player = None
         self.selected_cards = []
@@ -97,6 +92,10 @@ class LettersGUI:
         moon_x = 10 + num_players * (button_width + 10)
         self.moon_button = Button(moon_x, WINDOW_HEIGHT - 90, button_width, 
                                   40, "Moon")
+        # Version of the game shown on screen (None to redraw everything)
+        # and the cards whose selection changed since
+        self.drawn_version: int | None = None
+        self.dirty_cards: set[PositionType] = set()
     
     def draw_title_screen(self):
         """
@@ -122,44 +121,96 @@ class LettersGUI:
         Draws the game screen
         """
         self.window.fill(BG_COLOR)
-        box_width, box_height = WINDOW_WIDTH // self.cols, (WINDOW_HEIGHT - 
-                                                            100) // self.rows
         for i in range(self.rows):
             for j in range(self.cols):
-                card = self.game.card_at((i, j))
-                card_rect = pygame.Rect(j * box_width + 5, i * box_height + 5, 
-                                        box_width - 10, box_height - 10)
-                if (i, j) in self.selected_cards:
-                    pygame.draw.rect(self.window, HIGHLIGHT_COLOR, card_rect)
-                else:
-                    pygame.draw.rect(self.window, (200, 200, 200), card_rect)
-                if card:
-                    color = LETTER_COLORS.get(card["color"], (0, 0, 0))
-                    try:
-                        font = pygame.font.Font(card["font"], 36)
-                    except:
-                        font = pygame.font.SysFont('Arial', 36)
-                    letters_to_display = card["letter"] * int(card["number"])
-                    text_surface = font.render(letters_to_display, True, color)
-                    text_rect = text_surface.get_rect(center=card_rect.center)
-                    self.window.blit(text_surface, text_rect)
+                self.draw_card(i, j)
+        self.draw_buttons()
+        pygame.display.flip()
+        self.drawn_version = self.game.track_changes()
+        self.dirty_cards.clear()
+
+    def refresh_screen(self) -> None:
+        """
+        Redraws only what changed since the screen was last drawn: the
+        cards the game changed (see LettersGame.changes_since) or whose
+        selection changed, and the scores if any of them changed
+        """
+        if self.drawn_version is None:
+            self.draw_screen()
+            return
+        changes = self.game.changes_since(self.drawn_version)
+        if changes["reset"]:
+            self.draw_screen()
+            return
+        rects = [self.draw_card(i, j)
+                 for i, j in changes["positions"] | self.dirty_cards]
+        if changes["scores"]:
+            rects.extend(self.draw_buttons())
+        self.drawn_version = changes["version"]
+        self.dirty_cards.clear()
+        if rects:
+            pygame.display.update(rects)
+
+    def draw_card(self, i: int, j: int) -> pygame.Rect:
+        """
+        Draws the card (or empty slot) at row i, column j, and returns the
+        area it covers
+        """
+        box_width, box_height = WINDOW_WIDTH // self.cols, (WINDOW_HEIGHT - 
+                                                            100) // self.rows
+        card = self.game.card_at((i, j))
+        box_rect = pygame.Rect(j * box_width, i * box_height, box_width,
+                               box_height)
+        pygame.draw.rect(self.window, BG_COLOR, box_rect)
+        card_rect = pygame.Rect(j * box_width + 5, i * box_height + 5, 
+                                box_width - 10, box_height - 10)
+        if (i, j) in self.selected_cards:
+            pygame.draw.rect(self.window, HIGHLIGHT_COLOR, card_rect)
+        else:
+            pygame.draw.rect(self.window, (200, 200, 200), card_rect)
+        if card:
+            color = LETTER_COLORS.get(card["color"], (0, 0, 0))
+            try:
+                font = pygame.font.Font(card["font"], 36)
+            except:
+                font = pygame.font.SysFont('Arial', 36)
+            letters_to_display = card["letter"] * int(card["number"])
+            text_surface = font.render(letters_to_display, True, color)
+            text_rect = text_surface.get_rect(center=card_rect.center)
+            self.window.blit(text_surface, text_rect)
+        return box_rect
+
+    def draw_buttons(self) -> list[pygame.Rect]:
+        """
+        Draws the player buttons with their scores and the moon button, and
+        returns the areas they cover
+        """
+        scores = self.game.scores
+        score_font = pygame.font.SysFont('Arial', 20)
+        rects = []
         for button in self.player_buttons:
             button.draw(self.window)
             player_number = int(button.text.split()[-1])
-            score = self.game.scores.get(player_number, 0)
-            score_font = pygame.font.SysFont('Arial', 20)
+            score = scores.get(player_number, 0)
+            score_area = pygame.Rect(button.rect.x, button.rect.bottom,
+                                     button.rect.width, 40)
+            pygame.draw.rect(self.window, BG_COLOR, score_area)
             score_text = score_font.render(f"Score: {score}", True, 
                                            (255, 255, 255))
             score_rect = score_text.get_rect(center=(button.rect.centerx, 
                                                      button.rect.bottom + 20))
             self.window.blit(score_text, score_rect)
+            rects.extend([button.rect, score_area])
         self.moon_button.draw(self.window)
-        pygame.display.flip()
+        rects.append(self.moon_button.rect)
+        return rects
 
     def draw_message_box(self, message):
         """
         Draws the message box for game announcements
         """
+        # The box covers the game, which has to be redrawn afterwards
+        self.drawn_version = None
         overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
         overlay.fill((0, 0, 0, 180))
         self.window.blit(overlay, (0, 0))
@@ -249,6 +300,7 @@ class LettersGUI:
         card_pos = (row, col)
         if card_pos not in self.selected_cards:
             self.selected_cards.append(card_pos)
+            self.dirty_cards.add(card_pos)
         if len(self.selected_cards) == 3:
             try:
                 success = self.game.call_fit(self.selected_player, 
@@ -285,7 +337,9 @@ class LettersGUI:
                     b.is_selected = False
                 button.is_selected = True
                 self.selected_player = i + 1
+                self.dirty_cards.update(self.selected_cards)
                 self.selected_cards = []
+                self.drawn_version = None
                 return
         if self.moon_button.is_over(pos):
             if self.selected_player is not None:
@@ -298,6 +352,7 @@ class LettersGUI:
                     self.draw_message_box("Moonshot mode started!")
                     pygame.display.flip()
                     pygame.time.delay(1000)
+                self.dirty_cards.update(self.selected_cards)
                 self.selected_cards = []
                 return
         if self.selected_player is not None:
@@ -321,8 +376,7 @@ class LettersGUI:
             if self.show_title_screen:
                 self.draw_title_screen()
             else:
-                self.draw_screen()
-            pygame.display.flip()
+                self.refresh_screen()
         pygame.quit()
 
 import click
@@ -335,10 +389,16 @@ import click
 @click.option("-n", "--players", default=4, show_default=True, 
               type=click.IntRange(2, 4), 
               help="Number of players (between 2 and 4).")
-
-def main(rows, cols, players):
-    gui = LettersGUI(rows, cols, players)
-    gui.run()
+@click.option("--record", default=None,
+              help="Record the game to this file (see replay.py).")
+def main(rows: int, cols: int, players: int, record: str | None) -> None:
+    if record:
+        from replay import GameRecorder
+        with GameRecorder(record) as recorder:
+            LettersGUI(rows, cols, players, recorder).run()
+    else:
+        gui = LettersGUI(rows, cols, players)
+        gui.run()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,285 @@
+"""
+Opt-in timing of the hot methods of the game engine and the bots.
+
+enable() wraps the methods listed in ENGINE_METHODS and the suggest_move
+method of every bot class with timers that record call counts and latency
+histograms. disable() puts the original methods back, so when timing is
+off no wrapper is left in the call path.
+
+Engine calls are broken down by the bot that made them: calls made from
+inside a bot's suggest_move are recorded under that bot's name, the rest
+under "game".
+
+Timing is per process. Work sent to worker processes (simulations,
+record runs, root-parallel MCTS) goes through run_timed, which times it in
+the worker while timing is on in the parent and sends the statistics back
+to be merged, so the summary covers every process.
+"""
+from collections.abc import Callable
+import functools
+import json
+import time
+from typing import Any, ParamSpec, TypeVar
+from deck import DrawPile
+from letters import LettersGame
+
+# The engine methods (and properties) that get timed
+ENGINE_METHODS = {
+    LettersGame: ["call_fit", "moonshot_start", "moonshot_end", "end_game",
+                  "card_at", "find_fits", "has_fit", "non_empty_positions"],
+    DrawPile: ["draw"],
+}
+
+GAME = "game"
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+class MethodStats:
+    """
+    Call count, total time and a latency histogram of one method. Bucket
+    b of the histogram counts the calls that took between 2**(b-1) and
+    2**b - 1 nanoseconds.
+    """
+    def __init__(self) -> None:
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets: dict[int, int] = {}
+
+    def record(self, elapsed_ns: int) -> None:
+        self.calls += 1
+        self.total_ns += elapsed_ns
+        self.max_ns = max(self.max_ns, elapsed_ns)
+        bucket = elapsed_ns.bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def merge(self, other: "MethodStats") -> None:
+        self.calls += other.calls
+        self.total_ns += other.total_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+
+    def percentile(self, fraction: float) -> int:
+        """
+        Upper bound (in nanoseconds) of the histogram bucket holding the
+        given fraction of the calls.
+        """
+        target = fraction * self.calls
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= target:
+                return min((1 << bucket) - 1, self.max_ns)
+        return self.max_ns
+
+    def to_dict(self) -> dict:
+        return {"calls": self.calls, "total_ns": self.total_ns,
+                "max_ns": self.max_ns,
+                "buckets": {str(b): n
+                            for b, n in sorted(self.buckets.items())}}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MethodStats":
+        stats = cls()
+        stats.calls = data["calls"]
+        stats.total_ns = data["total_ns"]
+        stats.max_ns = data["max_ns"]
+        stats.buckets = {int(b): n for b, n in data["buckets"].items()}
+        return stats
+
+
+_stats: dict[tuple[str, str], MethodStats] = {}
+# (class, attribute, original value or None if it was inherited)
+_patched: list[tuple[type, str, object]] = []
+_context = [GAME]
+
+
+def is_enabled() -> bool:
+    return bool(_patched)
+
+
+def enable(bots: dict[str, type]) -> None:
+    """
+    Start timing the engine methods and the suggest_move of every bot
+    class in 'bots' (a name -> class mapping like bot.BOTS).
+    """
+    if _patched:
+        return
+    for cls, names in ENGINE_METHODS.items():
+        for name in names:
+            _wrap(cls, name, _timed(f"{cls.__name__}.{name}"))
+    for bot_name, bot_cls in bots.items():
+        _wrap(bot_cls, "suggest_move", _timed_bot(bot_name))
+
+
+def disable() -> None:
+    """
+    Stop timing and restore the original methods (the statistics are
+    kept until reset()).
+    """
+    while _patched:
+        cls, name, original = _patched.pop()
+        if original is None:
+            delattr(cls, name)
+        else:
+            setattr(cls, name, original)
+
+
+def reset() -> None:
+    _stats.clear()
+
+
+def stats() -> dict[tuple[str, str], MethodStats]:
+    """
+    The statistics recorded so far, by (bot name or "game", method).
+    """
+    return _stats
+
+
+def snapshot() -> dict[str, dict]:
+    """
+    The statistics as plain data, e.g. to send them between processes
+    or to write them as JSON.
+    """
+    return {f"{label}|{method}": entry.to_dict()
+            for (label, method), entry in sorted(_stats.items())}
+
+
+def merge(data: dict[str, dict], label: str = GAME) -> None:
+    """
+    Add statistics taken with snapshot() (e.g. in a worker process). The
+    engine calls recorded under "game" are credited to 'label', for work a
+    bot sent to workers.
+    """
+    for key, entry in data.items():
+        owner, method = key.split("|", 1)
+        if owner == GAME:
+            owner = label
+        _stats.setdefault((owner, method), MethodStats()).merge(
+            MethodStats.from_dict(entry)
+        )
+
+
+def caller() -> str:
+    """
+    The name under which engine calls are recorded right now (the bot
+    whose suggest_move is running, or "game").
+    """
+    return _context[-1]
+
+
+def worker_bots(bots: dict[str, type]) -> dict[str, type] | None:
+    """
+    The 'bots' argument of run_timed for work sent to a worker process:
+    'bots' while timing is on, None otherwise.
+    """
+    return bots if _patched else None
+
+
+def run_timed(bots: dict[str, type] | None, func: Callable[P, R],
+              *args: P.args, **kwargs: P.kwargs) -> tuple[R, dict[str, dict]]:
+    """
+    Run func(*args, **kwargs) in a worker process and return its result
+    together with the snapshot of the statistics it produced. Timing is
+    on in the worker if 'bots' is given (see worker_bots) and off
+    otherwise, in which case the snapshot is empty.
+    """
+    if bots is None:
+        disable()
+        return func(*args, **kwargs), {}
+    enable(bots)
+    reset()
+    result = func(*args, **kwargs)
+    return result, snapshot()
+
+
+def export_json(path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, indent=1)
+
+
+def summary() -> str:
+    """
+    A table with the call count, total time and latency percentiles of
+    every timed method, slowest in total first.
+    """
+    lines = [f"{'Caller':<10} {'Method':<32} {'Calls':>9} {'Total ms':>10} "
+             f"{'Mean us':>9} {'p50 us':>9} {'p99 us':>9} {'Max us':>9}"]
+    entries = sorted(_stats.items(), key=lambda item: -item[1].total_ns)
+    for (label, method), entry in entries:
+        lines.append(
+            f"{label:<10} {method:<32} {entry.calls:>9} "
+            f"{entry.total_ns / 1e6:>10.1f} "
+            f"{entry.total_ns / entry.calls / 1e3:>9.1f} "
+            f"{entry.percentile(0.5) / 1e3:>9.1f} "
+            f"{entry.percentile(0.99) / 1e3:>9.1f} "
+            f"{entry.max_ns / 1e3:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def _record(label: str, method: str, elapsed_ns: int) -> None:
+    entry = _stats.get((label, method))
+    if entry is None:
+        entry = _stats[(label, method)] = MethodStats()
+    entry.record(elapsed_ns)
+
+
+def _timed(method: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """
+    Make a wrapper that times a function under the current caller.
+    """
+    def wrap(func: Callable[P, R]) -> Callable[P, R]:
+        @functools.wraps(func)
+        def timed(*args: P.args, **kwargs: P.kwargs) -> R:
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(_context[-1], method,
+                        time.perf_counter_ns() - start)
+        return timed
+    return wrap
+
+
+def _timed_bot(bot_name: str
+               ) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """
+    Make a wrapper that times suggest_move and records the engine calls
+    made during it under 'bot_name'.
+    """
+    def wrap(func: Callable[P, R]) -> Callable[P, R]:
+        @functools.wraps(func)
+        def timed(*args: P.args, **kwargs: P.kwargs) -> R:
+            _context.append(bot_name)
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter_ns() - start
+                _context.pop()
+                _record(bot_name, "suggest_move", elapsed)
+        return timed
+    return wrap
+
+
+def _wrap(cls: type, name: str,
+          wrap: Callable[[Callable[..., Any]], Callable[..., Any]]) -> None:
+    """
+    Replace cls.name (a method or a property) with its wrapped version.
+    """
+    original = cls.__dict__.get(name)
+    current = getattr(cls, name) if original is None else original
+    # An inherited method may already be wrapped through its base class
+    current = getattr(current, "_untimed", current)
+    replacement: object
+    if isinstance(current, property) and current.fget is not None:
+        replacement = property(wrap(current.fget))
+    else:
+        replacement = wrap(current)
+        setattr(replacement, "_untimed", current)
+    _patched.append((cls, name, original))
+    setattr(cls, name, replacement)
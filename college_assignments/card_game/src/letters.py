@@ -1,39 +1,80 @@
 from abc import ABC
+from collections import deque
+from collections.abc import Callable, Iterator, Sequence
+import copy
 import itertools
-from base import LettersGameBase, TableauType, PositionType, CardType
+from base import (LettersGameBase, TableauView, PositionType, CardType,
+                  Recorder, mask_positions)
+from deck import Card, CardSchema, Deck, DrawPile
 
-class Card:
+# A move, as accepted by LettersGame.apply, is one of:
+#
+#     ("fit", player, positions)
+#     ("moonshot_start", player)
+#     ("moonshot_end",)
+#     ("end_game",)
+#
+# mirroring the call_fit, moonshot_start, moonshot_end and end_game methods.
+MoveType = tuple
+
+# A change, as kept in the change log of LettersGame, is a tuple
+#
+#     (version, positions, score_deltas, modes)
+#
+# with the state version the change led to, the positions whose card
+# changed, (player, delta) pairs for the scores that changed, and the mode
+# transitions as ("moonshot", bool) or ("done", bool) pairs.
+ChangeType = tuple
+
+# Number of changes kept for LettersGame.changes_since
+CHANGE_LOG_SIZE = 1024
+
+_MASK64 = (1 << 64) - 1
+
+def zobrist_key(index: int, code: int) -> int:
     """
-    Represents a single card in the game
+    Returns the 64-bit Zobrist key of the card with the given code at the
+    given position index (r * cols + c). The keys are a fixed function of
+    the pair (splitmix64), so tableau hashes can be compared between games
+    and processes.
     """
-    def __init__(self, features: CardType) -> None:
-        self.features = features
-
-    def __repr__(self) -> str:
-        return f"Card({self.features})"
+    z = (((index << 32) + code + 1) * 0x9E3779B97F4A7C15) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
 
 class Tableau:
     """
     Represents the tableau (grid) of cards
+
+    Besides the grid, the tableau keeps the occupied positions as a
+    bitmask (bit r * cols + c) and their count, updated as cards are placed
+    and removed, so the non-empty positions are not found by scanning.
     """
-    def __init__(self, cards: list[CardType], rows: int, cols: int) -> None:
+    def __init__(self, cards: list[Card], rows: int, cols: int) -> None:
         """
         Initializes the tableau with a grid of given rows and cols.
 
         Args:
-            cards(list[CardType]): A list of cards to initialize the tableau
+            cards(list[Card]): A list of cards to initialize the tableau
             rows (int): Number of rows in the tableau
             cols (int): Number of columns in the tableau
         """
-        self.grid = [[None for _ in range(cols)] for _ in range(rows)]
+        self.cols = cols
+        self.grid: list[list[Card | None]] = [
+            [None for _ in range(cols)] for _ in range(rows)
+        ]
+        self.occupancy = 0
+        self.filled = 0
+        self._non_empty: frozenset[PositionType] | None = None
         self.fill_tableau(cards, rows, cols)
 
-    def fill_tableau(self, cards: list[CardType], rows: int, cols: int) -> None:
+    def fill_tableau(self, cards: list[Card], rows: int, cols: int) -> None:
         """
         Fills the tableau grid with Card objects from the list of cards.
 
         Args:
-            cards (list[CardType]): A list of cards to populate the grid
+            cards (list[Card]): A list of cards to populate the grid
             rows (int): Number of rows in the tableau
             cols (int): Number of columns in the tableau
         """
@@ -41,9 +82,21 @@ class Tableau:
         for r in range(rows):
             for c in range(cols):
                 if idx < len(cards):
-                    self.grid[r][c] = Card(cards[idx])
+                    self.place_card((r, c), cards[idx])
                     idx += 1
 
+    def copy(self) -> "Tableau":
+        """
+        Returns a copy of the tableau (the Card objects are shared).
+        """
+        other = Tableau.__new__(Tableau)
+        other.cols = self.cols
+        other.grid = [row[:] for row in self.grid]
+        other.occupancy = self.occupancy
+        other.filled = self.filled
+        other._non_empty = self._non_empty
+        return other
+
     def get_card(self, position: PositionType) -> Card | None:
         """
         Returns the Card object at the specified position, or None if empty.
@@ -59,6 +112,26 @@ class Tableau:
         r, c = position
         return self.grid[r][c]
 
+    def place_card(self, position: PositionType, card: Card | None) -> None:
+        """
+        Puts a card at the specified position, replacing whatever was there.
+
+        Args:
+            position (PositionType): A tuple (row, column) representing the
+            position in the tableau
+            card (Card | None): The card to place, or None to empty the slot
+        """
+        r, c = position
+        bit = 1 << (r * self.cols + c)
+        if self.grid[r][c] is not None:
+            self.occupancy &= ~bit
+            self.filled -= 1
+        if card is not None:
+            self.occupancy |= bit
+            self.filled += 1
+        self.grid[r][c] = card
+        self._non_empty = None
+
     def remove_cards(self, positions: list[PositionType]) -> None:
         """
         Removes cards from the tableau at the positions by setting them to None.
@@ -67,24 +140,255 @@ class Tableau:
             positions (list[PositionType]): A list of (row, column) tuples 
             indicating positions to clear
         """
-        for (r, c) in positions:
-            self.grid[r][c] = None
+        for pos in positions:
+            self.place_card(pos, None)
 
-    def get_non_empty(self) -> set[PositionType]:
+    def get_non_empty(self) -> frozenset[PositionType]:
         """
         Returns a set of all positions in the tableau that contain a Card.
+        The set is built from the occupancy mask in row-major order, and
+        kept until the tableau changes.
+
+        Returns:
+            frozenset[PositionType]: A set of (row, column) tuples for the
+            positions.
+        """
+        if self._non_empty is None:
+            self._non_empty = frozenset(
+                mask_positions(self.occupancy, self.cols)
+            )
+        return self._non_empty
+
+
+class BitboardTableau:
+    """
+    Represents the tableau (grid) of cards as bitboards.
+
+    Position (r, c) is bit r * cols + c. Besides an occupancy mask, the
+    tableau keeps one mask per (feature, value) pair of the schema with the
+    positions of the cards that have that value, so questions such as
+    "where is this card" or "which cards share this feature" are answered
+    with bitwise operations instead of walking the grid.
+    """
+    def __init__(self, cards: list[Card], rows: int, cols: int,
+                 schema: CardSchema) -> None:
+        """
+        Initializes the tableau with a grid of given rows and cols.
+
+        Args:
+            cards (list[Card]): A list of cards to initialize the tableau
+            rows (int): Number of rows in the tableau
+            cols (int): Number of columns in the tableau
+            schema (CardSchema): The schema used to encode the cards
+        """
+        self.rows = rows
+        self.cols = cols
+        self.schema = schema
+        self.cells: list[Card | None] = [None] * (rows * cols)
+        self.occupancy = 0
+        self.filled = 0
+        self._non_empty: frozenset[PositionType] | None = None
+        self.bitsets = [[0] * len(values) for values in schema.values]
+        self._digits: list[Sequence[int] | None] = [None] * (rows * cols)
+        self.fill_tableau(cards, rows, cols)
+
+    def fill_tableau(self, cards: list[Card], rows: int, cols: int) -> None:
+        """
+        Fills the tableau with Card objects from the list of cards.
+
+        Args:
+            cards (list[Card]): A list of cards to populate the grid
+            rows (int): Number of rows in the tableau
+            cols (int): Number of columns in the tableau
+        """
+        for idx, card in enumerate(cards[: rows * cols]):
+            self.place_card(divmod(idx, cols), card)
+
+    def copy(self) -> "BitboardTableau":
+        """
+        Returns a copy of the tableau (the Card objects are shared).
+        """
+        other = copy.copy(self)
+        other.cells = self.cells[:]
+        other.bitsets = [masks[:] for masks in self.bitsets]
+        other._digits = self._digits[:]
+        return other
+
+    @property
+    def grid(self) -> "_BitboardGrid":
+        """
+        Row-by-row access to the cards, mirroring Tableau.grid
+        """
+        return _BitboardGrid(self)
+
+    def get_card(self, position: PositionType) -> Card | None:
+        """
+        Returns the Card object at the specified position, or None if empty.
+
+        Args:
+            position (PositionType): A tuple (row, column) representing the
+            position in the tableau
+
+        Returns:
+            Card | None: The Card at the given position, or None if the slot is
+            empty
+        """
+        r, c = position
+        return self.cells[r * self.cols + c]
+
+    def place_card(self, position: PositionType, card: Card | None) -> None:
+        """
+        Puts a card at the specified position, replacing whatever was there.
+
+        Args:
+            position (PositionType): A tuple (row, column) representing the
+            position in the tableau
+            card (Card | None): The card to place, or None to empty the slot
+        """
+        r, c = position
+        idx = r * self.cols + c
+        bit = 1 << idx
+
+        digits = self._digits[idx]
+        if digits is not None:
+            for i, digit in enumerate(digits):
+                self.bitsets[i][digit] &= ~bit
+        if self.cells[idx] is not None:
+            self.occupancy &= ~bit
+            self.filled -= 1
+        self._digits[idx] = None
+        self.cells[idx] = card
+        self._non_empty = None
+
+        if card is None:
+            return
+        self.occupancy |= bit
+        self.filled += 1
+        if getattr(card, "schema", None) is self.schema:
+            # Cards interned by the schema already know their digits
+            digits = card.values
+        else:
+            code = getattr(card, "code", None)
+            if code is None:
+                code = self.schema.encode(card.features)
+            digits = None if code is None else self.schema.digits(code)
+        if digits is not None:
+            for i, digit in enumerate(digits):
+                self.bitsets[i][digit] |= bit
+            self._digits[idx] = digits
+
+    def remove_cards(self, positions: list[PositionType]) -> None:
+        """
+        Removes cards from the tableau at the positions.
+
+        Args:
+            positions (list[PositionType]): A list of (row, column) tuples
+            indicating positions to clear
+        """
+        for pos in positions:
+            self.place_card(pos, None)
+
+    def get_non_empty(self) -> frozenset[PositionType]:
+        """
+        Returns a set of all positions in the tableau that contain a Card,
+        kept until the tableau changes.
+
+        Returns:
+            frozenset[PositionType]: A set of (row, column) tuples for the
+            positions.
+        """
+        if self._non_empty is None:
+            self._non_empty = frozenset(
+                mask_positions(self.occupancy, self.cols)
+            )
+        return self._non_empty
+
+    def positions(self, mask: int) -> set[PositionType]:
+        """
+        Returns the positions of the bits set in a mask.
+
+        Args:
+            mask (int): A bitmask over the tableau positions
 
         Returns:
             set[PositionType]: A set of (row, column) tuples for the positions.
         """
-        nrows = len(self.grid)
-        ncols = len(self.grid[0]) if nrows else 0
-        return {
-            (r, c)
-            for r in range(nrows)
-            for c in range(ncols)
-            if self.grid[r][c] is not None
-        }
+        return set(mask_positions(mask, self.cols))
+
+    def matching(self, feature: int, value: int) -> int:
+        """
+        Returns the mask of positions whose card has the given value
+        (by index in the schema) for the given feature (by index in the
+        schema).
+        """
+        return self.bitsets[feature][value]
+
+    def sharing(self, position: PositionType, feature: int) -> int:
+        """
+        Returns the mask of the other positions whose card has the same
+        value for the given feature (by index in the schema) as the card
+        at the specified position.
+        """
+        r, c = position
+        idx = r * self.cols + c
+        digits = self._digits[idx]
+        if digits is None:
+            return 0
+        return self.bitsets[feature][digits[feature]] & ~(1 << idx)
+
+    def locate(self, code: int) -> PositionType | None:
+        """
+        Returns the position of the card with the given code, or None if
+        that card is not on the tableau.
+        """
+        mask = self.occupancy
+        for i, digit in enumerate(self.schema.digits(code)):
+            mask &= self.bitsets[i][digit]
+            if not mask:
+                return None
+        return divmod((mask & -mask).bit_length() - 1, self.cols)
+
+
+class _BitboardGrid:
+    """
+    List-of-rows view of a BitboardTableau (reading and assigning
+    grid[r][c] goes straight to the bitboards)
+    """
+    def __init__(self, tableau: BitboardTableau) -> None:
+        self._tableau = tableau
+
+    def __len__(self) -> int:
+        return self._tableau.rows
+
+    def __getitem__(self, r: int) -> "_BitboardRow":
+        if not 0 <= r < self._tableau.rows:
+            raise IndexError("row index out of range")
+        return _BitboardRow(self._tableau, r)
+
+
+class _BitboardRow:
+    """
+    One row of a _BitboardGrid
+    """
+    def __init__(self, tableau: BitboardTableau, r: int) -> None:
+        self._tableau = tableau
+        self._r = r
+
+    def __len__(self) -> int:
+        return self._tableau.cols
+
+    def __getitem__(self, c: int) -> Card | None:
+        if not 0 <= c < self._tableau.cols:
+            raise IndexError("column index out of range")
+        return self._tableau.get_card((self._r, c))
+
+    def __setitem__(self, c: int, card: Card | None) -> None:
+        if not 0 <= c < self._tableau.cols:
+            raise IndexError("column index out of range")
+        self._tableau.place_card((self._r, c), card)
+
+
+TABLEAU_BACKENDS = ("grid", "bitboard")
 
 
 class LettersGame(LettersGameBase):
@@ -93,17 +397,33 @@ class LettersGame(LettersGameBase):
       - For each feature dimension, the 3 cards are either all the same or all different.
       - If correct => +fit_size points, remove/replace cards
       - If incorrect => -fit_size points, do not remove cards
+
+    The tableau can be stored either as a grid of Card objects ("grid") or
+    as bitboards ("bitboard", see BitboardTableau), chosen with the
+    `backend` parameter. When it is not given, `default_backend` is used.
+
+    The cards can be given as a list of dictionaries, which is validated,
+    or as a Deck (or LazyDeck), which was validated when it was built.
+    Cards are only taken from the deck when they are dealt.
     """
 
+    default_backend = "grid"
+
     def __init__(
         self,
-        cards: list[CardType],
+        cards: list[CardType] | Deck,
         fit_size: int,
         tableau_size: tuple[int, int],
         num_players: int,
-        lightning: bool = False
+        lightning: bool = False,
+        backend: str | None = None
     ) -> None:
         
+        if backend is None:
+            backend = self.default_backend
+        if backend not in TABLEAU_BACKENDS:
+            raise ValueError(f"Unknown tableau backend '{backend}'.")
+
         rows, cols = tableau_size
         if rows * cols > len(cards):
             raise ValueError("Not enough cards to fill the tableau.")
@@ -111,31 +431,30 @@ class LettersGame(LettersGameBase):
         if rows * cols < fit_size:
             raise ValueError("Tableau is too small to contain a single fit.")
 
-        all_keys = cards[0].keys()
-        for card in cards[1:]:
-            if card.keys() != all_keys:
-                raise ValueError("Not all cards share the same feature keys.")
-
-        for key in all_keys:
-            distinct_vals = {card[key] for card in cards}
-            if len(distinct_vals) != fit_size:
-                raise ValueError(
-                    f"For feature '{key}', must have exactly {fit_size} distinct values across the deck."
-                )
-
-        seen_cards = set()
-        for cd in cards:
-            tup = tuple(sorted(cd.items()))
-            if tup in seen_cards:
-                raise ValueError("Duplicate card found in the deck.")
-            seen_cards.add(tup)
+        if isinstance(cards, Deck):
+            if cards.fit_size != fit_size:
+                raise ValueError("The deck was built for another fit size.")
+            deck = cards
+        else:
+            deck = Deck(cards, fit_size)
 
         super().__init__(cards, fit_size, tableau_size, num_players, lightning)
 
-        self._table_cards = cards[: rows * cols]
-        self._deck = cards[rows * cols :]
+        self._schema = deck.schema
+        self._table_cards = [deck[i] for i in range(rows * cols)]
+        # Cards are drawn from a cursor into the deck, which starts right
+        # after the cards dealt to the tableau
+        self._deck = DrawPile(deck, rows * cols)
+        self._source = deck
 
-        self._tableau = Tableau(self._table_cards, rows, cols)
+        self._backend = backend
+        self._tableau: Tableau | BitboardTableau
+        if backend == "bitboard":
+            self._tableau = BitboardTableau(
+                self._table_cards, rows, cols, self._schema
+            )
+        else:
+            self._tableau = Tableau(self._table_cards, rows, cols)
 
         self._scores = {p: 0 for p in range(1, num_players + 1)}
         self._done = False
@@ -146,6 +465,32 @@ class LettersGame(LettersGameBase):
         self._moonshot_countered = False
         self._active_players = set(range(1, self.num_players + 1))
 
+        # Live index of the valid fits on the tableau (built on first use,
+        # then updated only around the positions that change)
+        self._fits: set[tuple[PositionType, ...]] | None = None
+        self._fits_at: dict[PositionType, set[tuple[PositionType, ...]]] = {}
+        self._fits_view: frozenset[tuple[PositionType, ...]] | None = None
+        self._codes: dict[PositionType, int] = {}
+        self._position_of: dict[int, PositionType] = {}
+
+        # Zobrist hash of the tableau (built on first use, then updated
+        # only at the positions that change), with the codes hashed in it
+        self._hash: int | None = None
+        self._hashed: dict[PositionType, int] = {}
+
+        # Moves applied with apply(), each with the state needed to undo it,
+        # and the moves that were undone (and can be redone)
+        self._history: list[tuple[MoveType, tuple]] = []
+        self._redo: list[MoveType] = []
+
+        # Version of the game state, bumped by every change, and the log of
+        # the last changes once a front-end turned it on (see track_changes)
+        self._version = 0
+        self._changes: deque[ChangeType] | None = None
+
+        # Where the moves are recorded, if anywhere (see record)
+        self._recorder: Recorder | None = None
+
     # ---------------------------------------------------------
     # PROPERTIES
     # ---------------------------------------------------------
@@ -158,26 +503,106 @@ class LettersGame(LettersGameBase):
         return self._active_players
 
     @property
-    def tableau(self) -> Tableau:
+    def backend(self) -> str:
         """
-        Return a 2D list of dicts (or None) for each position.
+        Return the name of the tableau storage backend.
         """
-        nrows = len(self._tableau.grid)
-        ncols = len(self._tableau.grid[0]) if nrows else 0
-        output: Tableau = []
+        return self._backend
 
-        for r in range(nrows):
-            row_data = []
-            for c in range(ncols):
-                card_obj = self._tableau.grid[r][c]
-                row_data.append(card_obj.features if card_obj else None)
-            output.append(row_data)
-        return output
+    @property
+    def tableau(self) -> TableauView:
+        """
+        Return a read-only view of the dicts (or None) at each position,
+        read straight from the tableau storage (see TableauView).
+        """
+        return TableauView(self._features_at, self.nrows, self.ncols)
 
     @property
-    def non_empty_positions(self) -> set[PositionType]:
+    def non_empty_positions(self) -> frozenset[PositionType]:
+        """
+        Return the positions that hold a card. The tableau keeps track of
+        them as cards are placed and removed.
+        """
         return self._tableau.get_non_empty()
 
+    @property
+    def occupied_count(self) -> int:
+        """
+        Return the number of cards on the tableau.
+        """
+        return self._tableau.filled
+
+    @property
+    def fits(self) -> frozenset[tuple[PositionType, ...]]:
+        """
+        Return the set of valid fits currently on the tableau, each one
+        a tuple of positions in row-major order.
+        """
+        if self._fits_view is None:
+            self._fits_view = frozenset(self._ensure_fit_index())
+        return self._fits_view
+
+    @property
+    def tableau_hash(self) -> int:
+        """
+        Return a 64-bit Zobrist hash of the cards on the tableau and
+        their positions (the XOR of zobrist_key over the cards).
+        """
+        if self._hash is None:
+            self._hash = 0
+            self._hashed = {}
+            for r, c in self.non_empty_positions:
+                code = self._code_at((r, c))
+                if code is not None:
+                    self._hashed[(r, c)] = code
+                    self._hash ^= zobrist_key(r * self.ncols + c, code)
+        return self._hash
+
+    @property
+    def cards_left(self) -> int:
+        """
+        Return the number of cards left in the deck.
+        """
+        return len(self._deck)
+
+    @property
+    def deck(self) -> Deck:
+        """
+        Return the deck the game is dealt from, in dealing order (the
+        cards of the first tableau come first). Clones share it.
+        """
+        return self._source
+
+    @property
+    def deck_position(self) -> int:
+        """
+        Return the index in the deck of the next card to draw (the number
+        of cards dealt so far).
+        """
+        return self._deck.position
+
+    @property
+    def moonshot_player(self) -> int | None:
+        """
+        Return the player who shot the moon, or None outside moonshot mode.
+        """
+        return self._moonshot_player
+
+    @property
+    def version(self) -> int:
+        """
+        Return the version of the game state, which goes up by one with
+        every change to the tableau, the scores or the game mode.
+        """
+        return self._version
+
+    @property
+    def moves(self) -> list[MoveType]:
+        """
+        Return the moves applied with apply() (and not undone), in order.
+        """
+        return [move for move, _ in self._history]
+
     @property
     def done(self) -> bool:
         return self._done
@@ -210,6 +635,15 @@ class LettersGame(LettersGameBase):
         If the positions form a valid fit => +fit_size points, remove & replace the cards.
         Else => -fit_size points, do not remove cards.
         """
+        result = self._call_fit(player, positions)
+        if self._recorder is not None:
+            self._recorder.event(("fit", player, list(positions)), result)
+        return result
+
+    def _call_fit(self, player: int, positions: list[PositionType]) -> bool:
+        """
+        Plays call_fit (without recording it).
+        """
         self._check_can_play(player)
 
         if len(positions) != self.fit_size:
@@ -227,11 +661,12 @@ class LettersGame(LettersGameBase):
                 self._moonshot_countered = True
                 for pos in positions:
                     if self._deck:
-                        new_card_dict = self._deck.pop(0)
-                        r, c = pos
-                        self._tableau.grid[r][c] = Card(new_card_dict)
-                
-                self.moonshot_end()
+                        self._tableau.place_card(pos, self._deck.draw())
+                self._update_fit_index(positions)
+                self._update_hash(positions)
+                self._log_change(positions)
+
+                self._end_moonshot()
                 return True
             else:
                 return False
@@ -240,6 +675,7 @@ class LettersGame(LettersGameBase):
             if self._is_valid_fit(positions):
                 self._outcome.add(player)
                 self._done = True
+                self._log_change(modes=[("done", True)])
                 return True
 
         if self._is_valid_fit(positions):
@@ -248,16 +684,15 @@ class LettersGame(LettersGameBase):
 
             for pos in positions:
                 if self._deck:
-                    new_card_dict = self._deck.pop(0)
-                    r, c = pos
-                    self._tableau.grid[r][c] = Card(new_card_dict)
-                else:
-                    r, c = pos
-                    self._tableau.grid[r][c] = None
+                    self._tableau.place_card(pos, self._deck.draw())
+            self._update_fit_index(positions)
+            self._update_hash(positions)
+            self._log_change(positions, [(player, self.fit_size)])
 
             return True
         else:
             self._scores[player] -= self.fit_size
+            self._log_change(scores=[(player, -self.fit_size)])
             return False
         
     def moonshot_start(self, player: int) -> None:
@@ -268,24 +703,37 @@ class LettersGame(LettersGameBase):
         if self._moonshot:
             raise ValueError("Already in moonshot mode.")
 
-        total_spots = self.nrows * self.ncols
-        if len(self.non_empty_positions) < total_spots:
+        if not self.is_full:
             raise ValueError("Cannot start moonshot with any empty positions.")
 
         self._moonshot = True
         self._moonshot_player = player
+        self._log_change(modes=[("moonshot", True)])
+        if self._recorder is not None:
+            self._recorder.event(("moonshot_start", player), None)
 
     def moonshot_end(self) -> None:
         """
         End the moonshot state and calculate results
         """
+        self._end_moonshot()
+        if self._recorder is not None:
+            self._recorder.event(("moonshot_end",), None)
+
+    def _end_moonshot(self) -> None:
+        """
+        Plays moonshot_end (without recording it), which a countering
+        fit does too.
+        """
         if not self._moonshot:
             raise ValueError("Not in moonshot mode.")
 
         player = self._moonshot_player
         if player not in self.active_players:
             raise ValueError("Moonshot player invalid or not active.")
-        
+
+        positions: list[PositionType] = []
+        scores = []
         if self._lightning:
             if not self._moonshot_countered:
                 self._outcome.add(player)
@@ -298,16 +746,24 @@ class LettersGame(LettersGameBase):
         else:
             if self._moonshot_countered:
                 self._scores[player] -= (self.nrows * self.ncols)
+                scores.append((player, -(self.nrows * self.ncols)))
                 self._moonshot_countered = False
             else:
                 self._scores[player] += (self.nrows * self.ncols)
+                scores.append((player, self.nrows * self.ncols))
                 self._redeal_tableau()
+                positions = [(r, c) for r in range(self.nrows)
+                             for c in range(self.ncols)]
                 
                 if not self._deck:
                     self._done = True
 
         self._moonshot = False
         self._moonshot_player = None
+        modes = [("moonshot", False)]
+        if self._done:
+            modes.append(("done", True))
+        self._log_change(positions, scores, modes)
 
     def end_game(self) -> None:
         """
@@ -322,6 +778,252 @@ class LettersGame(LettersGameBase):
         max_score = max(self._scores.values())
         winners = [p for p, val in self._scores.items() if val == max_score]
         self._outcome = set(winners)
+        self._log_change(modes=[("done", True)])
+        if self._recorder is not None:
+            self._recorder.event(("end_game",), None)
+
+    def record(self, recorder: Recorder) -> None:
+        """
+        Send the moves of the game, from now on, to 'recorder' (see
+        replay.GameRecorder): first its setup (see setup()), then every
+        move with the result of call_fit, and ("undo",) for undos.
+
+        Raises ValueError if the game has already changed since it was
+        created, since the setup only describes the starting deal.
+        """
+        if self._version:
+            raise ValueError("Only a new game can be recorded.")
+        self._recorder = recorder
+        recorder.start(self.setup())
+
+    def setup(self) -> dict:
+        """
+        Return what is needed to deal this game again: the feature values
+        of the deck's schema, the codes of the deck's cards in dealing
+        order, and the game parameters.
+        """
+        schema = self._schema
+        return {
+            "features": dict(zip(schema.features, schema.values)),
+            "fit_size": self.fit_size,
+            "rows": self.nrows,
+            "cols": self.ncols,
+            "players": self.num_players,
+            "lightning": self.lightning,
+            "deck": self._source.codes(),
+        }
+
+    def state_key(self) -> tuple:
+        """
+        Return a hashable summary of the game state: the cards on the
+        tableau, the deck cursor, the scores and the game flags. Games
+        created from the same deck with equal keys play out identically.
+        """
+        cells = tuple(
+            self._code_at((r, c))
+            for r in range(self.nrows)
+            for c in range(self.ncols)
+        )
+        return (cells, self._deck.snapshot(), tuple(self._scores.values()),
+                self._done, self._moonshot, self._moonshot_player,
+                tuple(sorted(self._active_players)))
+
+    def clone(self) -> "LettersGame":
+        """
+        Return an independent copy of the game.
+
+        The cards, the deck and the schema never change once the game is
+        created, so they are shared with the copy. Only the tableau, the
+        deck cursor, the scores, the game flags, the fit index and the
+        tableau hash are copied. The move log of the copy starts out empty.
+        """
+        other = copy.copy(self)
+        other._tableau = self._tableau.copy()
+        other._deck = self._deck.copy()
+        other._scores = dict(self._scores)
+        other._outcome = set(self._outcome)
+        other._active_players = set(self._active_players)
+        if self._fits is not None:
+            other._fits = set(self._fits)
+            other._fits_at = {
+                pos: set(fits) for pos, fits in self._fits_at.items()
+            }
+            other._codes = dict(self._codes)
+            other._position_of = dict(self._position_of)
+        other._hashed = dict(self._hashed)
+        other._history = []
+        other._redo = []
+        if self._changes is not None:
+            other._changes = deque(maxlen=CHANGE_LOG_SIZE)
+        other._recorder = None
+        return other
+
+    def apply(self, move: MoveType) -> bool | None:
+        """
+        Play a move (see MoveType) and record it in the move log, so that
+        it can be reverted with undo().
+
+        Raises ValueError in the same cases as the method the move stands
+        for (in which case nothing is recorded).
+
+        Returns: The result of call_fit for "fit" moves, None otherwise
+        """
+        result = self._apply(move)
+        self._redo.clear()
+        return result
+
+    def undo(self) -> MoveType | None:
+        """
+        Revert the last move played with apply(). The move can then be
+        played again with redo().
+
+        Returns: The move that was reverted, or None if there was none
+        """
+        if not self._history:
+            return None
+
+        move, saved = self._history.pop()
+        scores, moonshot, done = self._scores, self._moonshot, self._done
+        (cells, deck_state, self._scores, self._done, self._outcome,
+         self._moonshot, self._moonshot_player, self._moonshot_countered,
+         self._active_players) = saved
+        self._deck.restore(deck_state)
+
+        for pos, card in cells:
+            self._tableau.place_card(pos, card)
+        if len(cells) == self.nrows * self.ncols:
+            self._fits = None
+            self._fits_view = None
+            self._hash = None
+        else:
+            self._update_fit_index([pos for pos, _ in cells])
+            self._update_hash([pos for pos, _ in cells])
+
+        self._log_change(
+            [pos for pos, _ in cells],
+            [(p, self._scores[p] - scores[p]) for p in scores
+             if self._scores[p] != scores[p]],
+            [(name, now) for name, before, now in
+             [("moonshot", moonshot, self._moonshot),
+              ("done", done, self._done)] if before != now]
+        )
+        if self._recorder is not None:
+            self._recorder.event(("undo",), None)
+        self._redo.append(move)
+        return move
+
+    def redo(self) -> MoveType | None:
+        """
+        Play again the last move reverted with undo().
+
+        Returns: The move that was played, or None if there was none
+        """
+        if not self._redo:
+            return None
+        move = self._redo.pop()
+        self._apply(move)
+        return move
+
+    def track_changes(self) -> int:
+        """
+        Start logging the changes to the game for changes_since, unless
+        they already are, and return the current version. Games nobody
+        draws do not keep the log; a clone of a tracked game is tracked
+        from its own starting version.
+        """
+        if self._changes is None:
+            self._changes = deque(maxlen=CHANGE_LOG_SIZE)
+        return self._version
+
+    def changes_since(self, version: int) -> dict:
+        """
+        Return what changed after the given version of the game state (see
+        version), so that a front-end only has to redraw the differences.
+
+        Only the changes since track_changes() was first called are
+        logged, and only the last CHANGE_LOG_SIZE of them are kept. For an
+        older version "reset" is True and everything should be redrawn:
+        all positions are reported, but no score deltas or modes.
+
+        Raises ValueError if the changes are not tracked, or if the
+        version is newer than the current one.
+
+        Returns: A dict with the current "version", "reset", the
+        "positions" whose card changed, the "scores" delta of every player
+        whose score changed, and the "modes" transitions in order, as
+        ("moonshot", bool) or ("done", bool) pairs
+        """
+        if self._changes is None:
+            raise ValueError("Changes are not tracked (see track_changes).")
+        if version > self._version:
+            raise ValueError(f"Version {version} is newer than the game.")
+
+        changes: dict = {"version": self._version, "reset": False,
+                         "positions": set(), "scores": {}, "modes": []}
+        if version == self._version:
+            return changes
+        if not self._changes or self._changes[0][0] > version + 1:
+            changes["reset"] = True
+            changes["positions"] = {
+                (r, c) for r in range(self.nrows) for c in range(self.ncols)
+            }
+            return changes
+
+        newer = []
+        for change in reversed(self._changes):
+            if change[0] <= version:
+                break
+            newer.append(change)
+        for _, positions, scores, modes in reversed(newer):
+            changes["positions"].update(positions)
+            for player, delta in scores:
+                total = changes["scores"].get(player, 0) + delta
+                if total:
+                    changes["scores"][player] = total
+                else:
+                    changes["scores"].pop(player, None)
+            changes["modes"].extend(modes)
+        return changes
+
+    def find_fits(self) -> list[list[PositionType]]:
+        """
+        Return every valid fit on the tableau, in row-major order.
+        """
+        return [list(fit) for fit in sorted(self.fits)]
+
+    def has_fit(self) -> bool:
+        """
+        Return True if there is at least one valid fit on the tableau.
+        """
+        return bool(self._ensure_fit_index())
+
+    def cards_sharing(self, pos: PositionType, feature: str) -> set[PositionType]:
+        """
+        Return the positions of the other cards on the tableau that have the
+        same value for 'feature' as the card at 'pos'.
+        """
+        card = self.card_at(pos)
+        if card is None:
+            return set()
+
+        if isinstance(self._tableau, BitboardTableau):
+            idx = self._schema.features.index(feature)
+            return self._tableau.positions(self._tableau.sharing(pos, idx))
+
+        sharing = set()
+        for other in self.non_empty_positions:
+            other_card = self.card_at(other)
+            if (other != pos and other_card is not None
+                    and other_card[feature] == card[feature]):
+                sharing.add(other)
+        return sharing
+
+    def fits_at(self, pos: PositionType) -> set[tuple[PositionType, ...]]:
+        """
+        Return the valid fits that use the card at 'pos'.
+        """
+        self._ensure_fit_index()
+        return set(self._fits_at.get(pos, ()))
 
     # ---------------------------------------------------------
     # HELPER METHODS
@@ -335,12 +1037,25 @@ class LettersGame(LettersGameBase):
         if player not in self.active_players:
             raise ValueError(f"Player {player} is not active or invalid.")
 
+    def _features_at(self, index: int) -> CardType | None:
+        """
+        Returns the dict of features at a flat index (r * ncols + c), or
+        None if the position is empty.
+        """
+        card_obj = self._tableau.get_card(divmod(index, self.ncols))
+        return card_obj.features if card_obj else None
+
     def _is_valid_fit(self, positions: list[PositionType]) -> bool:
         """
         Real Letters logic: For each feature, all cards are either all the same or all different.
         """
-        cards = [self.card_at(pos) for pos in positions]
+        codes = [self._code_at(pos) for pos in positions]
+        known = [code for code in codes if code is not None]
+        if len(known) == len(codes):
+            return self._schema.is_fit(known)
 
+        # Some card is not part of the deck's schema: compare the dicts
+        cards = [self.card_at(pos) for pos in positions]
         for feature in cards[0].keys():
             vals = [c[feature] for c in cards]
             distinct = set(vals)
@@ -348,29 +1063,243 @@ class LettersGame(LettersGameBase):
                 return False
         return True
 
+    def _code_at(self, pos: PositionType) -> int | None:
+        """
+        Returns the integer code of the card at 'pos', interning it through
+        the schema if it was placed on the tableau without a code.
+        """
+        card_obj = self._tableau.get_card(pos)
+        if card_obj is None:
+            return None
+        code = getattr(card_obj, "code", None)
+        if code is None:
+            code = self._schema.encode(card_obj.features)
+        return code
+
     def _any_fits_left(self) -> bool:
         """
         Returns True if there's at least one valid fit on the board.
         """
-        positions = list(self.non_empty_positions)
+        return self.has_fit()
+
+    def _iter_fits(self) -> Iterator[list[PositionType]]:
+        """
+        Yields every valid fit on the tableau exactly once, as a list of
+        positions in row-major order.
+
+        The first fit_size - 1 cards of a fit determine the last one, so
+        instead of checking every fit_size-subset of the tableau we walk
+        the (fit_size - 1)-subsets and look the completing card up by its
+        code. Each fit is only reported from the subset made of its first
+        positions, which is the one whose completion comes last.
+        """
+        positions = sorted(self.non_empty_positions)
         if len(positions) < self.fit_size:
-            return False
+            return
 
-        for combo in itertools.combinations(positions, self.fit_size):
-            if self._is_valid_fit(list(combo)):
-                return True
-        return False
+        codes = {}
+        for pos in positions:
+            code = self._code_at(pos)
+            if code is not None:
+                codes[pos] = code
+        if self.fit_size < 3 or len(codes) < len(positions):
+            # Completions are not unique for fit sizes below 3 (and cards
+            # outside the schema have no code), so check every subset
+            for combo in itertools.combinations(positions, self.fit_size):
+                if self._is_valid_fit(list(combo)):
+                    yield list(combo)
+            return
+
+        locate: Callable[[int], PositionType | None]
+        if isinstance(self._tableau, BitboardTableau):
+            locate = self._tableau.locate
+        else:
+            locate = {code: pos for pos, code in codes.items()}.get
+        for combo in itertools.combinations(positions, self.fit_size - 1):
+            code = self._schema.completion([codes[pos] for pos in combo])
+            last = None if code is None else locate(code)
+            if last is not None and last > combo[-1]:
+                yield list(combo) + [last]
     
+    def _apply(self, move: MoveType) -> bool | None:
+        """
+        Plays a move, pushing it to the move log along with the part of
+        the state it can change.
+        """
+        kind = move[0]
+        if kind == "fit":
+            positions = list(move[2])
+        elif kind == "moonshot_end":
+            positions = [
+                (r, c) for r in range(self.nrows) for c in range(self.ncols)
+            ]
+        elif kind in ("moonshot_start", "end_game"):
+            positions = []
+        else:
+            raise ValueError(f"Unknown move '{kind}'.")
+
+        cells = [
+            (pos, self._tableau.get_card(pos))
+            for pos in positions
+            if 0 <= pos[0] < self.nrows and 0 <= pos[1] < self.ncols
+        ]
+        saved = (cells, self._deck.snapshot(), dict(self._scores), self._done,
+                 set(self._outcome), self._moonshot, self._moonshot_player,
+                 self._moonshot_countered, set(self._active_players))
+
+        result = None
+        if kind == "fit":
+            result = self.call_fit(move[1], positions)
+        elif kind == "moonshot_start":
+            self.moonshot_start(move[1])
+        elif kind == "moonshot_end":
+            self.moonshot_end()
+        else:
+            self.end_game()
+
+        self._history.append((move, saved))
+        return result
+
+    def _log_change(self, positions: Sequence[PositionType] = (),
+                    scores: Sequence[tuple[int, int]] = (),
+                    modes: Sequence[tuple[str, bool]] = ()) -> None:
+        """
+        Bumps the state version and logs what changed (see ChangeType).
+        """
+        self._version += 1
+        if self._changes is not None:
+            self._changes.append(
+                (self._version, tuple(positions), tuple(scores),
+                 tuple(modes))
+            )
+
+    def _ensure_fit_index(self) -> set[tuple[PositionType, ...]]:
+        """
+        Builds the fit index from a full scan of the tableau, unless it is
+        already up to date, and returns its set of fits.
+        """
+        if self._fits is not None:
+            return self._fits
+
+        fits: set[tuple[PositionType, ...]] = set()
+        self._fits = fits
+        self._fits_at = {}
+        self._codes = {}
+        self._position_of = {}
+        for pos in self.non_empty_positions:
+            code = self._code_at(pos)
+            if code is not None:
+                self._codes[pos] = code
+                self._position_of[code] = pos
+        for fit in self._iter_fits():
+            self._add_fit(fits, tuple(fit))
+        self._fits_view = None
+        return fits
+
+    def _update_fit_index(self, positions: list[PositionType]) -> None:
+        """
+        Updates the fit index after the cards at 'positions' changed,
+        dropping the fits that used the old cards and looking for the
+        fits that use the new ones.
+        """
+        fits = self._fits
+        if fits is None:
+            return
+
+        for pos in positions:
+            for fit in self._fits_at.pop(pos, set()):
+                fits.discard(fit)
+                for other in fit:
+                    if other != pos and other in self._fits_at:
+                        self._fits_at[other].discard(fit)
+            old = self._codes.pop(pos, None)
+            if old is not None and self._position_of.get(old) == pos:
+                del self._position_of[old]
+
+        for pos in positions:
+            code = self._code_at(pos)
+            if code is not None:
+                self._codes[pos] = code
+                self._position_of[code] = pos
+
+        for pos in positions:
+            if pos in self._codes:
+                for fit in self._fits_through(pos):
+                    self._add_fit(fits, fit)
+        self._fits_view = None
+
+    def _update_hash(self, positions: list[PositionType]) -> None:
+        """
+        Updates the tableau hash after the cards at 'positions' changed.
+        """
+        if self._hash is None:
+            return
+        for r, c in positions:
+            index = r * self.ncols + c
+            old = self._hashed.pop((r, c), None)
+            if old is not None:
+                self._hash ^= zobrist_key(index, old)
+            code = self._code_at((r, c))
+            if code is not None:
+                self._hashed[(r, c)] = code
+                self._hash ^= zobrist_key(index, code)
+
+    def _fits_through(self, pos: PositionType) -> Iterator[tuple[PositionType, ...]]:
+        """
+        Yields the valid fits that use the card at 'pos' (possibly more
+        than once), as tuples of positions in row-major order.
+        """
+        codes = self._codes
+        others = [other for other in codes if other != pos]
+
+        if self.fit_size < 3:
+            for combo in itertools.combinations(others, self.fit_size - 1):
+                fit = tuple(sorted((pos,) + combo))
+                if self._schema.is_fit([codes[p] for p in fit]):
+                    yield fit
+            return
+
+        for combo in itertools.combinations(others, self.fit_size - 2):
+            missing = self._schema.completion(
+                [codes[pos]] + [codes[other] for other in combo]
+            )
+            if missing is None:
+                continue
+            last = self._locate(missing)
+            if last is not None and last != pos and last not in combo:
+                yield tuple(sorted((pos, last) + combo))
+
+    def _locate(self, code: int) -> PositionType | None:
+        """
+        Returns the position of the card with the given code, or None if
+        it is not on the tableau.
+        """
+        if isinstance(self._tableau, BitboardTableau):
+            return self._tableau.locate(code)
+        return self._position_of.get(code)
+
+    def _add_fit(self, fits: set[tuple[PositionType, ...]],
+                 fit: tuple[PositionType, ...]) -> None:
+        """
+        Adds a fit to the fit index ('fits' is the index's set of fits).
+        """
+        fits.add(fit)
+        for pos in fit:
+            self._fits_at.setdefault(pos, set()).add(fit)
+
     def _redeal_tableau(self) -> None:
         """
         Redeals the tableu after someone calls a valid fit
         """
+        self._fits = None
+        self._fits_view = None
+        self._hash = None
+
         for r in range(self.nrows):
             for c in range(self.ncols):
-                self._tableau.grid[r][c] = None
+                self._tableau.place_card((r, c), None)
 
         for r in range(self.nrows):
             for c in range(self.ncols):
                 if self._deck:
-                    new_card_dict = self._deck.pop(0)
-                    self._tableau.grid[r][c] = Card(new_card_dict)
+                    self._tableau.place_card((r, c), self._deck.draw())
@@ -0,0 +1,231 @@
+"""
+Per-game simulation records streamed to a file.
+
+Every game of a simulation is written as one record (see
+bot.play_game_record) as soon as it finishes, to a JSON Lines file or,
+if the file name ends in .csv, a CSV file. Every record carries the master
+seed of its run, so a run can be resumed from the file alone: the games
+whose seeds are already in the file are skipped, so a crash only loses
+the games that were being played. The results of a run are summarized
+from the file alone.
+"""
+import csv
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import click
+from bot import BOTS, game_seed, play_game_record
+import instrument
+
+FIELDS = ["master_seed", "game", "seed", "bot1", "bot2", "rows", "cols",
+          "score1", "score2", "winner", "turns", "fits1", "fits2",
+          "moonshots1", "moonshots2"]
+INT_FIELDS = [field for field in FIELDS if field not in ("bot1", "bot2")]
+
+
+def is_csv(path: str) -> bool:
+    return path.lower().endswith(".csv")
+
+
+def read_records(path: str) -> list[dict]:
+    """
+    Read the records in a JSON Lines or CSV file. A last line cut short
+    by a crash is ignored.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8", newline="") as f:
+        text = f.read()
+    complete = text[:text.rfind("\n") + 1]
+
+    if is_csv(path):
+        rows = csv.DictReader(complete.splitlines())
+        return [{field: int(row[field]) if field in INT_FIELDS else row[field]
+                 for field in FIELDS}
+                for row in rows]
+    return [json.loads(line) for line in complete.splitlines() if line]
+
+
+def _drop_partial_line(path: str) -> None:
+    """
+    Cut the file after its last complete line.
+    """
+    with open(path, "rb+") as f:
+        data = f.read()
+        f.truncate(data.rfind(b"\n") + 1)
+
+
+class RecordWriter:
+    """
+    Appends records to a JSON Lines or CSV file, flushing the file after
+    each one.
+    """
+    def __init__(self, path: str, append: bool) -> None:
+        exists = append and os.path.exists(path)
+        if exists:
+            _drop_partial_line(path)
+        self._file = open(path, "a" if exists else "w", encoding="utf-8",
+                          newline="")
+        self._csv = None
+        if is_csv(path):
+            self._csv = csv.DictWriter(self._file, fieldnames=FIELDS)
+            if not exists or os.path.getsize(path) == 0:
+                self._csv.writeheader()
+
+    def write(self, record: dict) -> None:
+        if self._csv is not None:
+            self._csv.writerow(record)
+        else:
+            self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "RecordWriter":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def play_records(master_seed: int,
+                 games: list[tuple[int, int]],
+                 bot1_type: str,
+                 bot2_type: str,
+                 rows: int,
+                 cols: int,
+                 bot_options: dict | None) -> list[dict]:
+    """
+    Play the given (game number, seed) games of the run with the given
+    master seed and return their records.
+    """
+    records = []
+    for game_num, seed in games:
+        record = {"master_seed": master_seed, "game": game_num}
+        record.update(play_game_record(seed, bot1_type, bot2_type, rows,
+                                       cols, bot_options))
+        records.append(record)
+    return records
+
+
+def simulate_to_file(path: str,
+                     num_games: int,
+                     bot1_type: str,
+                     bot2_type: str,
+                     rows: int = 3,
+                     cols: int = 4,
+                     bot_options: dict | None = None,
+                     seed: int | None = None,
+                     workers: int = 1,
+                     resume: bool = False,
+                     shard_size: int = 50) -> int:
+    """
+    Simulate like bot.simulate, writing a record for every game to 'path'
+    as the games finish.
+
+    Args:
+        path: JSON Lines file (or CSV file if it ends in .csv)
+        num_games: Number of games the run should have in total
+        bot1_type: Strategy for player 1
+        bot2_type: Strategy for player 2
+        rows: Number of rows in the tableau
+        cols: Number of columns in the tableau
+        bot_options: Extra constructor arguments for each strategy
+        seed: Master seed (when resuming, the one in the file if None,
+            otherwise drawn from the random module if None)
+        workers: Number of worker processes
+        resume: Keep the records already in the file and only play the
+            games whose seeds are missing from it
+        shard_size: Games per task sent to a worker
+
+    Raises:
+        ValueError: If the file being resumed holds games of another
+            matchup or another master seed, or if resuming without a
+            master seed from an empty file
+
+    Returns:
+        The number of games played by this call
+    """
+    done = set()
+    if resume:
+        for record in read_records(path):
+            if seed is None:
+                seed = record["master_seed"]
+            if record["master_seed"] != seed:
+                raise ValueError(f"{path} holds games of another master "
+                                 f"seed.")
+            if (record["bot1"], record["bot2"], record["rows"],
+                    record["cols"]) != (bot1_type, bot2_type, rows, cols):
+                raise ValueError(f"{path} holds games of another matchup.")
+            done.add(record["seed"])
+        if seed is None:
+            raise ValueError("Resuming a simulation needs its master seed.")
+    if seed is None:
+        seed = random.getrandbits(64)
+
+    games = [(game_num, game_seed(seed, game_num))
+             for game_num in range(num_games)]
+    games = [game for game in games if game[1] not in done]
+
+    with RecordWriter(path, append=resume) as writer:
+        if workers <= 1:
+            for game in games:
+                for record in play_records(seed, [game], bot1_type,
+                                           bot2_type, rows, cols,
+                                           bot_options):
+                    writer.write(record)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    pool.submit(instrument.run_timed,
+                                instrument.worker_bots(BOTS), play_records,
+                                seed, games[i:i + shard_size], bot1_type,
+                                bot2_type, rows, cols, bot_options)
+                    for i in range(0, len(games), shard_size)
+                ]
+                for future in as_completed(futures):
+                    records, timings = future.result()
+                    instrument.merge(timings)
+                    for record in records:
+                        writer.write(record)
+
+    return len(games)
+
+
+def summarize(records: list[dict]) -> dict:
+    """
+    Aggregate the records of a run.
+
+    Returns:
+        A dict with the number of games, the wins of each player and the
+        ties, and the mean score, fits and moonshots of each player and
+        the mean number of turns
+    """
+    games = len(records)
+    summary = {
+        "games": games,
+        "p1_wins": sum(record["winner"] == 1 for record in records),
+        "p2_wins": sum(record["winner"] == 2 for record in records),
+        "ties": sum(record["winner"] == 0 for record in records),
+    }
+    for field in ("score1", "score2", "fits1", "fits2", "moonshots1",
+                  "moonshots2", "turns"):
+        total = sum(record[field] for record in records)
+        summary[f"mean_{field}"] = total / games if games else 0.0
+    return summary
+
+
+@click.command()
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def main(path: str) -> None:
+    """Summarize the per-game records of a simulation"""
+    summary = summarize(read_records(path))
+    for key, value in summary.items():
+        print(f"{key}: {value:.2f}" if isinstance(value, float)
+              else f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+"""
+Recording and replaying Letters games.
+
+A game recorded with LettersGame.record is written to a JSON Lines file:
+the first line is the setup of the game (see LettersGame.setup), with the
+codes of the deck's cards in dealing order, and every other line is a
+move, with the positions of a fit as flat indices (row * cols + col) and
+the result of the fit:
+
+    ["fit", 1, [0, 5, 10], true]
+    ["moonshot_start", 2]
+    ["moonshot_end"]
+    ["end_game"]
+    ["undo"]
+
+An undo takes back the last move (of those played with LettersGame.apply).
+
+The Replayer plays a recording back without validating it again: a fit
+is scored as recorded and its cards are replaced straight from the deck,
+so a replay is a few list operations per move. It keeps a checkpoint of
+the state every CHECKPOINT_INTERVAL moves, so it can seek to any move.
+"""
+import json
+import time
+import click
+from deck import LazyDeck
+from letters import LettersGame, MoveType
+from tui import card_face, display_scores
+
+# Moves between the checkpoints kept by a Replayer
+CHECKPOINT_INTERVAL = 256
+
+# Kinds of moves in a Replayer
+FIT, MOONSHOT_START, MOONSHOT_END, END_GAME = range(4)
+KINDS = {"fit": FIT, "moonshot_start": MOONSHOT_START,
+         "moonshot_end": MOONSHOT_END, "end_game": END_GAME}
+
+
+class GameRecorder:
+    """
+    Writes the moves of a game to a JSON Lines file (see the module
+    docstring), flushing the file after each one. It is given to
+    LettersGame.record.
+    """
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "w", encoding="utf-8")
+        self._cols = 0
+
+    def start(self, setup: dict) -> None:
+        self._cols = setup["cols"]
+        self._write(setup)
+
+    def event(self, move: tuple, result: bool | None) -> None:
+        """
+        Writes a move (see MoveType, or ("undo",)) and the result of
+        call_fit if it is a fit.
+        """
+        if move[0] == "fit":
+            self._write(["fit", move[1],
+                         [r * self._cols + c for r, c in move[2]], result])
+        else:
+            self._write(list(move))
+
+    def _write(self, entry: dict | list) -> None:
+        self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "GameRecorder":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def read_recording(path: str
+                   ) -> tuple[dict, list[tuple[MoveType, bool | None]]]:
+    """
+    Read a recorded game. A last line cut short by a crash is ignored.
+
+    Raises:
+        ValueError: If the file holds no setup, or an unknown move
+
+    Returns:
+        The setup of the game, and its moves (with the undone moves taken
+        out) paired with the result of each fit
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    lines = [line for line in text[:text.rfind("\n") + 1].splitlines() if line]
+    if not lines:
+        raise ValueError(f"{path} holds no recorded game.")
+
+    setup = json.loads(lines[0])
+    cols = setup["cols"]
+    moves: list[tuple[MoveType, bool | None]] = []
+    for line in lines[1:]:
+        entry = json.loads(line)
+        kind = entry[0]
+        if kind == "undo":
+            if moves:
+                moves.pop()
+        elif kind == "fit":
+            positions = [divmod(i, cols) for i in entry[2]]
+            moves.append((("fit", entry[1], positions), entry[3]))
+        elif kind == "moonshot_start":
+            moves.append(((kind, entry[1]), None))
+        elif kind in ("moonshot_end", "end_game"):
+            moves.append(((kind,), None))
+        else:
+            raise ValueError(f"Unknown move '{kind}' in {path}.")
+    return setup, moves
+
+
+class Replayer:
+    """
+    Plays back a recorded game, trusting the recorded results.
+
+    The state is kept as flat as it gets: the codes of the cards on the
+    tableau (row by row, None for an empty position), the index of the
+    next card of the deck, the scores and the game flags. The moves follow
+    the rules of LettersGame, so after any number of moves the state is
+    the one the game had (see state_key).
+    """
+    def __init__(self, setup: dict,
+                 moves: list[tuple[MoveType, bool | None]]) -> None:
+        """
+        Args:
+            setup: The setup of the game (see LettersGame.setup)
+            moves: The moves paired with their results (see read_recording)
+        """
+        self.setup = setup
+        self.nrows, self.ncols = setup["rows"], setup["cols"]
+        self.fit_size = setup["fit_size"]
+        self.num_players = setup["players"]
+        self.lightning = setup["lightning"]
+        self._deck: list[int] = setup["deck"]
+        self._schema = LazyDeck(setup["features"]).schema
+        self._moves = moves
+
+        cols = self.ncols
+        self._plays: list[tuple[int, int, tuple[int, ...], bool]] = []
+        for move, result in moves:
+            kind = KINDS[move[0]]
+            if kind == FIT:
+                self._plays.append((kind, move[1],
+                                    tuple(r * cols + c for r, c in move[2]),
+                                    bool(result)))
+            else:
+                self._plays.append((kind, move[1] if len(move) > 1 else 0,
+                                    (), False))
+
+        size = self.nrows * self.ncols
+        self._cells: list[int | None] = self._deck[:size]
+        self._cursor = size
+        self._scores = [0] * (self.num_players + 1)
+        self._done = False
+        self._outcome: set[int] = set()
+        self._moonshot = False
+        self._moonshot_player: int | None = None
+        self._countered = False
+        self._active = set(range(1, self.num_players + 1))
+        self._position = 0
+        self._checkpoints = {0: self._snapshot()}
+
+    @classmethod
+    def from_file(cls, path: str) -> "Replayer":
+        return cls(*read_recording(path))
+
+    def __len__(self) -> int:
+        return len(self._plays)
+
+    @property
+    def position(self) -> int:
+        """
+        The number of moves played so far.
+        """
+        return self._position
+
+    @property
+    def scores(self) -> dict[int, int]:
+        return {p: self._scores[p] for p in range(1, self.num_players + 1)}
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    @property
+    def outcome(self) -> set[int]:
+        return set(self._outcome)
+
+    @property
+    def moonshot_player(self) -> int | None:
+        return self._moonshot_player
+
+    @property
+    def cards_left(self) -> int:
+        return len(self._deck) - self._cursor
+
+    def codes(self) -> list[int | None]:
+        """
+        The codes of the cards on the tableau, row by row.
+        """
+        return list(self._cells)
+
+    def tableau(self) -> list[list[dict | None]]:
+        """
+        The cards on the tableau, as feature dictionaries.
+        """
+        decode = self._schema.decode
+        return [[None if code is None else decode(code)
+                 for code in self._cells[r * self.ncols:(r + 1) * self.ncols]]
+                for r in range(self.nrows)]
+
+    def state_key(self) -> tuple:
+        """
+        The state of the game, in the form of LettersGame.state_key.
+        """
+        return (tuple(self._cells), self._cursor,
+                tuple(self._scores[1:]), self._done, self._moonshot,
+                self._moonshot_player, tuple(sorted(self._active)))
+
+    def step(self) -> bool:
+        """
+        Play the next move.
+
+        Returns: False if there was no move left to play
+        """
+        if self._position >= len(self._plays):
+            return False
+        self.run(self._position + 1)
+        return True
+
+    def run(self, stop: int | None = None) -> None:
+        """
+        Play the moves up to (not including) move 'stop', or to the end.
+        """
+        plays = self._plays
+        stop = len(plays) if stop is None else min(stop, len(plays))
+        cells, deck, scores = self._cells, self._deck, self._scores
+        size = len(deck)
+        fit_size = self.fit_size
+        i, cursor = self._position, self._cursor
+        while i < stop:
+            # Play up to the next checkpoint, with the plain fits (by far
+            # the most common moves) inlined
+            end = min(stop,
+                      (i // CHECKPOINT_INTERVAL + 1) * CHECKPOINT_INTERVAL)
+            plain = not (self._moonshot or self.lightning)
+            while i < end:
+                kind, player, indices, valid = plays[i]
+                i += 1
+                if kind == FIT and plain:
+                    if valid:
+                        scores[player] += fit_size
+                        for j in indices:
+                            if cursor < size:
+                                cells[j] = deck[cursor]
+                                cursor += 1
+                            else:
+                                cells[j] = None
+                    else:
+                        scores[player] -= fit_size
+                else:
+                    self._cursor = cursor
+                    self._play(kind, player, indices, valid)
+                    cursor = self._cursor
+                    plain = not (self._moonshot or self.lightning)
+            self._cursor, self._position = cursor, i
+            if i % CHECKPOINT_INTERVAL == 0 and i not in self._checkpoints:
+                self._checkpoints[i] = self._snapshot()
+        self._cursor, self._position = cursor, i
+
+    def seek(self, index: int) -> None:
+        """
+        Bring the game to its state after 'index' moves, from the closest
+        checkpoint before it.
+
+        Raises:
+            ValueError: If there is no such move
+        """
+        if not 0 <= index <= len(self._plays):
+            raise ValueError(f"Move {index} is not in the recording.")
+        checkpoint = max(i for i in self._checkpoints if i <= index)
+        if index < self._position or checkpoint > self._position:
+            self._restore(self._checkpoints[checkpoint])
+            self._position = checkpoint
+        self.run(index)
+
+    def game(self, backend: str | None = None) -> LettersGame:
+        """
+        Deal the game again and play the moves up to the current one on a
+        LettersGame, which validates them.
+
+        Raises:
+            ValueError: If a move cannot be played, or a fit does not get
+                the recorded result
+        """
+        setup = self.setup
+        deck = LazyDeck(setup["features"]).reordered(setup["deck"])
+        game = LettersGame(deck, self.fit_size, (self.nrows, self.ncols),
+                           self.num_players, self.lightning, backend)
+        for i, (move, result) in enumerate(self._moves[:self._position]):
+            if game.apply(move) != result:
+                raise ValueError(f"Move {i} does not replay as recorded.")
+        return game
+
+    def _play(self, kind: int, player: int, indices: tuple[int, ...],
+              valid: bool) -> None:
+        """
+        Plays a move that is not a plain fit (see LettersGame for the rules).
+        """
+        cells, deck = self._cells, self._deck
+        if kind == FIT:
+            if self._moonshot:
+                if valid:
+                    self._countered = True
+                    for j in indices:
+                        if self._cursor < len(deck):
+                            cells[j] = deck[self._cursor]
+                            self._cursor += 1
+                    self._end_moonshot()
+            elif valid:
+                self._outcome.add(player)
+                self._done = True
+            else:
+                self._scores[player] -= self.fit_size
+        elif kind == MOONSHOT_START:
+            self._moonshot = True
+            self._moonshot_player = player
+        elif kind == MOONSHOT_END:
+            self._end_moonshot()
+        else:
+            self._done = True
+            best = max(self._scores[1:])
+            self._outcome = {p for p in range(1, self.num_players + 1)
+                             if self._scores[p] == best}
+
+    def _end_moonshot(self) -> None:
+        player = self._moonshot_player
+        assert player is not None
+        if self.lightning:
+            if not self._countered:
+                self._outcome.add(player)
+                self._done = True
+            else:
+                self._active.remove(player)
+                if len(self._active) == 1:
+                    self._outcome = set(self._active)
+                    self._done = True
+        else:
+            area = self.nrows * self.ncols
+            if self._countered:
+                self._scores[player] -= area
+                self._countered = False
+            else:
+                self._scores[player] += area
+                deck = self._deck
+                for j in range(area):
+                    if self._cursor < len(deck):
+                        self._cells[j] = deck[self._cursor]
+                        self._cursor += 1
+                    else:
+                        self._cells[j] = None
+                if self._cursor >= len(deck):
+                    self._done = True
+        self._moonshot = False
+        self._moonshot_player = None
+
+    def _snapshot(self) -> tuple:
+        return (list(self._cells), self._cursor, list(self._scores),
+                self._done, set(self._outcome), self._moonshot,
+                self._moonshot_player, self._countered, set(self._active))
+
+    def _restore(self, snapshot: tuple) -> None:
+        (cells, self._cursor, scores, self._done, outcome, self._moonshot,
+         self._moonshot_player, self._countered, active) = snapshot
+        self._cells[:] = cells
+        self._scores[:] = scores
+        self._outcome, self._active = set(outcome), set(active)
+
+
+@click.command()
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('-m', '--move', type=int, default=None,
+              help='Show the game after this many moves (default: the end)')
+@click.option('--bench', is_flag=True,
+              help='Time replaying the whole game')
+def main(path: str, move: int | None, bench: bool) -> None:
+    """Replay a recorded Letters game"""
+    replayer = Replayer.from_file(path)
+    try:
+        replayer.seek(len(replayer) if move is None else move)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--move')
+    for row in replayer.tableau():
+        print("".join(card_face(card) for card in row).strip())
+    print(display_scores(replayer.scores))
+    print(f"Move {replayer.position} of {len(replayer)}")
+
+    if bench:
+        replays = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < 1.0:
+            replayer.seek(0)
+            replayer.run()
+            replays += 1
+        elapsed = time.perf_counter() - start
+        print(f"{replays * len(replayer) / elapsed:,.0f} moves per second")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""
+Exact search of the end of a Letters game.
+
+The game is deterministic once the deck order is known, so when few cards
+are left the rest of the game can be searched completely. EndgameSolver
+finds the line of play that maximizes the score difference between the
+player to move and their opponent, with negamax and alpha-beta pruning.
+Positions reached in different ways are looked up in a transposition table
+keyed by a Zobrist hash of the tableau codes (LettersGame.tableau_hash),
+the deck cursor and the player to move.
+
+The turn model (what a player can do on their turn) is shared with the
+Monte Carlo Tree Search bot in bot.py.
+"""
+import random
+import click
+from base import PositionType
+from letters import LettersGame
+
+# Turn actions besides calling a fit
+MOON = 'moon'
+END = 'end'
+
+# A turn action: a fit (as a tuple of positions), MOON or END
+ActionType = tuple[PositionType, ...] | str
+
+# Kinds of transposition table entries
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Bound on the value of a position, larger than any score difference
+INFINITY = 1 << 30
+
+
+def turn_actions(letters: LettersGame) -> list[ActionType]:
+    """
+    Return the actions available to the player whose turn it is: every
+    valid fit (as a tuple of positions), or if there are none, shooting
+    the moon (when the tableau is full) or ending the game.
+    """
+    if letters.done:
+        return []
+    fits = letters.find_fits()
+    if fits:
+        actions: list[ActionType] = [tuple(fit) for fit in fits]
+        return actions
+    if letters.is_full:
+        return [MOON]
+    return [END]
+
+
+def play_turn(letters: LettersGame, player: int, action: ActionType) -> int:
+    """
+    Play a turn action through the game's move log, and return the number
+    of moves that were applied (so they can be undone).
+
+    Shooting the moon with no fits on the tableau cannot be countered, so
+    it is played as a moonshot that immediately succeeds.
+    """
+    if action == MOON:
+        letters.apply(('moonshot_start', player))
+        letters.apply(('moonshot_end',))
+        return 2
+    if action == END:
+        letters.apply(('end_game',))
+        return 1
+    letters.apply(('fit', player, action))
+    return 1
+
+
+def next_player(letters: LettersGame, player: int) -> int:
+    """
+    Return the player who plays after 'player'.
+    """
+    return player % letters.num_players + 1
+
+
+def previous_player(letters: LettersGame, player: int) -> int:
+    """
+    Return the player who plays before 'player'.
+    """
+    return (player - 2) % letters.num_players + 1
+
+
+class SearchLimit(Exception):
+    """
+    Raised when a search visits more positions than it is allowed to.
+    """
+
+
+class ZobristKeys:
+    """
+    Random 64-bit keys for every deck cursor, every player and the end of
+    the game. The hash of a state is the XOR of the tableau hash and the
+    keys of the other parts.
+    """
+    def __init__(self, deck_size: int, num_players: int,
+                 seed: int = 0) -> None:
+        rng = random.Random(seed)
+        self.cursor = [rng.getrandbits(64) for _ in range(deck_size + 1)]
+        self.player = [rng.getrandbits(64) for _ in range(num_players + 1)]
+        self.done = rng.getrandbits(64)
+
+    def hash(self, letters: LettersGame, player: int) -> int:
+        """
+        Return the hash of the state of 'letters' with 'player' to move.
+        """
+        key = (letters.tableau_hash ^ self.cursor[letters.deck_position]
+               ^ self.player[player])
+        if letters.done:
+            key ^= self.done
+        return key
+
+
+class EndgameSolver:
+    """
+    Solves two-player Letters positions exactly: the value of a position
+    is the most the player to move can gain over their opponent (in score
+    points) from there on, if both play perfectly.
+
+    The transposition table is kept between searches, so solving the
+    positions of one game turn after turn reuses the earlier work.
+    """
+    def __init__(self, max_nodes: int | None = None,
+                 max_table: int = 1_000_000) -> None:
+        """
+        Args:
+            max_nodes: Most positions a single search may visit (None
+                for no limit), after which it raises SearchLimit
+            max_table: Most transposition table entries kept (the table
+                is cleared when it grows past this)
+        """
+        self.max_nodes = max_nodes
+        self.max_table = max_table
+        self.table: dict[int, tuple[int, int, ActionType | None]] = {}
+        # Positions visited by the last search, and table hits overall
+        self.nodes = 0
+        self.hits = 0
+        # The game whose deck the table and the keys were made for (see
+        # _prepare)
+        self._keys = ZobristKeys(0, 0)
+        self._game: LettersGame | None = None
+
+    def solve(self, letters: LettersGame,
+              player: int) -> tuple[int, ActionType | None]:
+        """
+        Solve the position of 'letters' with 'player' to move.
+
+        The game is searched in place with apply/undo and left as it was
+        found (pass a clone if it is shared).
+
+        Raises:
+            ValueError: If the game does not have two players
+            SearchLimit: If the search needs more than max_nodes positions
+
+        Returns:
+            The value of the position and the best action (a fit as a
+            tuple of positions, MOON or END; None if the game is over)
+        """
+        if letters.num_players != 2:
+            raise ValueError("The endgame solver needs a two-player game.")
+        self._prepare(letters)
+        self.nodes = 0
+        if len(self.table) > self.max_table:
+            self.table.clear()
+
+        value = self._negamax(letters, player, -INFINITY, INFINITY)
+        entry = self.table.get(self._keys.hash(letters, player))
+        return value, entry[2] if entry else None
+
+    def best_line(self, letters: LettersGame,
+                  player: int) -> tuple[int, list[tuple[int, ActionType]]]:
+        """
+        Solve the position and return its value together with the whole
+        line of perfect play from it, as (player, action) pairs.
+        """
+        value, _ = self.solve(letters, player)
+        searched = self.nodes
+        line: list[tuple[int, ActionType]] = []
+        applied = 0
+        while not letters.done:
+            _, action = self.solve(letters, player)
+            if action is None:
+                break
+            line.append((player, action))
+            applied += play_turn(letters, player, action)
+            player = next_player(letters, player)
+        for _ in range(applied):
+            letters.undo()
+        self.nodes = searched
+        return value, line
+
+    def _prepare(self, letters: LettersGame) -> None:
+        """
+        Make the Zobrist keys for the game's tableau and deck (the table
+        only holds positions of games dealt from the same deck).
+        """
+        if self._game is not None and self._game.deck is letters.deck and \
+                (self._game.nrows, self._game.ncols) == \
+                (letters.nrows, letters.ncols):
+            return
+        self._game = letters
+        self._keys = ZobristKeys(len(letters.deck), letters.num_players)
+        self.table.clear()
+
+    def _negamax(self, letters: LettersGame, player: int,
+                 alpha: int, beta: int) -> int:
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise SearchLimit(f"more than {self.max_nodes} positions")
+        if letters.done:
+            return 0
+
+        key = self._keys.hash(letters, player)
+        entry = self.table.get(key)
+        best_action = None
+        if entry is not None:
+            self.hits += 1
+            value, kind, best_action = entry
+            if kind == EXACT:
+                return value
+            if kind == LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+
+        actions = turn_actions(letters)
+        if best_action in actions:
+            actions.remove(best_action)
+            actions.insert(0, best_action)
+
+        opponent = next_player(letters, player)
+        original_alpha = alpha
+        best = -INFINITY
+        for action in actions:
+            scores = letters.scores
+            before = scores[player] - scores[opponent]
+            applied = play_turn(letters, player, action)
+            scores = letters.scores
+            gain = scores[player] - scores[opponent] - before
+            value = gain - self._negamax(letters, opponent, gain - beta,
+                                         gain - alpha)
+            for _ in range(applied):
+                letters.undo()
+
+            if value > best:
+                best, best_action = value, action
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        if best <= original_alpha:
+            kind = UPPER
+        elif best >= beta:
+            kind = LOWER
+        else:
+            kind = EXACT
+        self.table[key] = (best, kind, best_action)
+        return best
+
+
+def line_value(letters: LettersGame, player: int,
+               line: list[tuple[int, ActionType]]) -> int:
+    """
+    Return how much 'player' gains over their opponent by the end of
+    'line' (a list of (player, action) pairs played from 'letters').
+    """
+    opponent = next_player(letters, player)
+    scores = letters.scores
+    before = scores[player] - scores[opponent]
+    applied = 0
+    for mover, action in line:
+        applied += play_turn(letters, mover, action)
+    scores = letters.scores
+    gain = scores[player] - scores[opponent] - before
+    for _ in range(applied):
+        letters.undo()
+    return gain
+
+
+def first_fit_line(letters: LettersGame,
+                   player: int) -> list[tuple[int, ActionType]]:
+    """
+    The line played from 'letters' when both players always take the
+    first action available (what GreedyBot would do).
+    """
+    line: list[tuple[int, ActionType]] = []
+    applied = 0
+    while not letters.done:
+        action = turn_actions(letters)[0]
+        line.append((player, action))
+        applied += play_turn(letters, player, action)
+        player = next_player(letters, player)
+    for _ in range(applied):
+        letters.undo()
+    return line
+
+
+@click.command()
+@click.option('-s', '--seed', type=int, default=0, help='Seed of the deal')
+@click.option('-l', '--cards-left', type=int, default=15,
+              help='Cards left in the deck when the analysis starts')
+@click.option('-r', '--rows', type=int, default=3)
+@click.option('-c', '--cols', type=int, default=4)
+def main(seed: int, cards_left: int, rows: int, cols: int) -> None:
+    """
+    Play a game taking the first fit until few cards are left, then show
+    the perfect line from there and how much first-fit play loses.
+    """
+    from bot import standard_deck
+
+    rng = random.Random(seed)
+    letters = LettersGame(standard_deck().shuffled(rng), 3, (rows, cols), 2)
+    player = 1
+    while not letters.done and letters.cards_left > cards_left:
+        play_turn(letters, player, turn_actions(letters)[0])
+        player = next_player(letters, player)
+
+    solver = EndgameSolver()
+    value, line = solver.best_line(letters, player)
+    print(f"Scores {letters.scores}, {letters.cards_left} cards left, "
+          f"player {player} to move")
+    for mover, action in line:
+        print(f"  player {mover}: {action}")
+    print(f"Perfect play: player {player} gains {value:+d} "
+          f"({solver.nodes} positions searched)")
+    print(f"First-fit play: player {player} gains "
+          f"{line_value(letters, player, first_fit_line(letters, player)):+d}")
+
+
+if __name__ == "__main__":
+    main()
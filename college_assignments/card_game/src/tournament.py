@@ -0,0 +1,424 @@
+"""
+Round-robin tournaments between Letters bots.
+
+Every pair of bots plays in both seat orders on every tableau size. The
+games are spread over a worker pool, the bots get Bradley-Terry ratings
+on the Elo scale, and the result of each matchup is stored in a cache
+file. A matchup is keyed by the versions of its two bots (a hash of the
+source code of each bot class and of the helpers it calls), the version
+of the engine (the game modules and the code that plays the games), the
+tableau size and the range of game seeds. A re-run only plays the
+matchups of the bots whose code changed, or every matchup once the game
+itself changed.
+"""
+import hashlib
+import importlib
+import inspect
+import json
+import math
+import os
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+import types
+from typing import TypeGuard
+import click
+from bot import BOTS, game_seed, register_bot, simulate_seeds
+
+DEFAULT_CACHE = "tournament_cache.json"
+
+# Virtual drawn games added between every pair of bots, so that a bot that
+# never wins still gets a finite rating
+PRIOR_GAMES = 1.0
+
+# Modules with the rules of the game, whose code decides how a game
+# between any two bots goes
+ENGINE_MODULES = ["base", "deck", "letters", "completion_tables"]
+
+# Code whose source goes into a version: a module, a class or a function
+SourceType = types.ModuleType | type | Callable[..., object]
+
+# Values of module constants that are hashed along with the code using them
+CONSTANT_TYPES = (bool, int, float, str, bytes, tuple, frozenset)
+
+
+def _functions(obj: type | Callable[..., object]
+               ) -> Iterator[types.FunctionType]:
+    """
+    Yields a function, or the methods (and property accessors) of a class.
+    """
+    if isinstance(obj, types.FunctionType):
+        yield obj
+        return
+    for value in vars(obj).values():
+        if isinstance(value, (staticmethod, classmethod)):
+            value = value.__func__
+        if isinstance(value, property):
+            yield from (accessor for accessor in
+                        (value.fget, value.fset, value.fdel)
+                        if isinstance(accessor, types.FunctionType))
+        elif isinstance(value, types.FunctionType):
+            yield value
+
+
+def _code_names(code: types.CodeType) -> list[str]:
+    """
+    The global names used by a code object and the code nested in it.
+    """
+    names = list(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names += _code_names(const)
+    return names
+
+
+def _is_helper(obj: object, folders: set[str]) -> TypeGuard[SourceType]:
+    """
+    Whether obj is a function, class or module of our own code (from one
+    of the folders) outside the engine modules.
+    """
+    if not (inspect.isfunction(obj) or inspect.isclass(obj)
+            or inspect.ismodule(obj)):
+        return False
+    module = inspect.getmodule(obj)
+    path = getattr(module, "__file__", None)
+    return (module is not None and path is not None
+            and module.__name__ not in ENGINE_MODULES
+            and os.path.dirname(os.path.abspath(path)) in folders)
+
+
+def source_closure(roots: Sequence[SourceType]) -> str:
+    """
+    The source code of the given functions and classes and of every
+    helper they call, directly or through other helpers: the functions,
+    classes and modules of our own code (the folder of this module and of
+    the roots) outside the engine modules, and the values of the module
+    constants they read.
+    """
+    folders = {os.path.dirname(os.path.abspath(__file__))}
+    for root in roots:
+        path = getattr(inspect.getmodule(root), "__file__", None)
+        if path is not None:
+            folders.add(os.path.dirname(os.path.abspath(path)))
+
+    parts = []
+    seen: set[int] = set()
+    pending = list(reversed(roots))
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        parts.append(inspect.getsource(obj))
+        if isinstance(obj, types.ModuleType):
+            continue
+        helpers: list[SourceType] = []
+        for function in _functions(obj):
+            for name in sorted(set(_code_names(function.__code__))):
+                value = function.__globals__.get(name)
+                if _is_helper(value, folders):
+                    helpers.append(value)
+                elif isinstance(value, CONSTANT_TYPES):
+                    parts.append(f"{name} = {value!r}\n")
+        pending.extend(reversed(helpers))
+    return "".join(parts)
+
+
+def bot_version(name: str) -> str:
+    """
+    A short hash of the source code of the bot class called 'name', of
+    the classes it inherits from and of the helpers they call (see
+    source_closure), so that a change to one bot only changes its own
+    version.
+    """
+    bases = [cls for cls in BOTS[name].__mro__ if cls is not object]
+    source = source_closure(bases)
+    return hashlib.sha1(source.encode()).hexdigest()[:12]
+
+
+def engine_version() -> str:
+    """
+    A short hash of the source code of the engine modules (see
+    ENGINE_MODULES) and of the code that plays the games of a matchup.
+    """
+    digest = hashlib.sha1()
+    for name in ENGINE_MODULES:
+        module = importlib.import_module(name)
+        digest.update(inspect.getsource(module).encode())
+    digest.update(source_closure([simulate_seeds]).encode())
+    return digest.hexdigest()[:12]
+
+
+def matchup_key(bot1: str, bot2: str, rows: int, cols: int, seed: int,
+                num_games: int, bot_options: dict, engine: str) -> str:
+    """
+    The cache key of one matchup: both bots with their versions and
+    options, the engine version, the tableau size and the seed range of
+    the games.
+    """
+    options = json.dumps([bot_options.get(bot1, {}),
+                          bot_options.get(bot2, {})], sort_keys=True)
+    return (f"{bot1}@{bot_version(bot1)}|{bot2}@{bot_version(bot2)}|"
+            f"engine@{engine}|{rows}x{cols}|seed={seed}:0-{num_games}|"
+            f"options={options}")
+
+
+def load_cache(path: str) -> dict[str, list[int]]:
+    """
+    Read the cached matchup results (empty if there is no cache yet).
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_cache(path: str, cache: dict[str, list[int]]) -> None:
+    """
+    Write the matchup results, replacing the file in one step so that an
+    interrupted run does not leave a broken cache.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def schedule(bots: list[str],
+             sizes: list[tuple[int, int]]) -> list[tuple[str, str, int, int]]:
+    """
+    Every pairing of different bots in both seat orders on every
+    tableau size, as (bot1, bot2, rows, cols).
+    """
+    return [(bot1, bot2, rows, cols)
+            for rows, cols in sizes
+            for bot1 in bots
+            for bot2 in bots
+            if bot1 != bot2]
+
+
+def _init_worker(extra_bots: dict[str, str]) -> None:
+    """
+    Register the bots loaded from other modules in a worker process.
+    """
+    for name, spec in extra_bots.items():
+        register_bot(name, load_bot(spec))
+
+
+def load_bot(spec: str) -> type:
+    """
+    Import a bot class given as 'module:ClassName'.
+
+    Raises:
+        ValueError: If the spec is not of that form
+    """
+    module_name, sep, class_name = spec.partition(":")
+    if not sep or not module_name or not class_name:
+        raise ValueError(f"Bot must be given as module:ClassName, not {spec}")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def run_tournament(bots: list[str],
+                   sizes: list[tuple[int, int]],
+                   num_games: int,
+                   seed: int,
+                   workers: int = 1,
+                   bot_options: dict | None = None,
+                   cache_path: str | None = DEFAULT_CACHE,
+                   extra_bots: dict[str, str] | None = None,
+                   shard_size: int = 100
+                   ) -> dict[tuple[str, str, int, int], tuple[int, int, int]]:
+    """
+    Play a round-robin tournament, reusing the cached matchups.
+
+    Args:
+        bots: Names of the bots (see bot.BOTS)
+        sizes: Tableau sizes as (rows, cols)
+        num_games: Games per matchup (each seat order is a matchup)
+        seed: Master seed of the games; every matchup plays the same
+            deck orders (see bot.game_seed)
+        workers: Number of worker processes
+        bot_options: Extra constructor arguments for each strategy
+        cache_path: File with the matchup results (None for no cache)
+        extra_bots: Bots loaded from other modules, as name -> spec
+            (see load_bot), which the workers have to register too
+        shard_size: Games per task sent to a worker
+
+    Returns:
+        The (player1_wins, player2_wins, ties) of every
+        (bot1, bot2, rows, cols) matchup
+    """
+    bot_options = bot_options or {}
+    cache = load_cache(cache_path) if cache_path else {}
+    seeds = [game_seed(seed, game_num) for game_num in range(num_games)]
+    engine = engine_version()
+
+    results: dict[tuple[str, str, int, int], tuple[int, int, int]] = {}
+    pending = {}
+    for matchup in schedule(bots, sizes):
+        bot1, bot2, rows, cols = matchup
+        key = matchup_key(bot1, bot2, rows, cols, seed, num_games,
+                          bot_options, engine)
+        if key in cache:
+            w1, w2, ties = cache[key]
+            results[matchup] = (w1, w2, ties)
+        else:
+            pending[matchup] = key
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(extra_bots or {},)) as pool:
+            futures = {
+                matchup: [
+                    pool.submit(simulate_seeds, seeds[i:i + shard_size],
+                                matchup[0], matchup[1], matchup[2],
+                                matchup[3], bot_options)
+                    for i in range(0, num_games, shard_size)
+                ]
+                for matchup in pending
+            }
+            for matchup, shards in futures.items():
+                totals = [0, 0, 0]
+                for shard in shards:
+                    for i, count in enumerate(shard.result()):
+                        totals[i] += count
+                results[matchup] = (totals[0], totals[1], totals[2])
+                cache[pending[matchup]] = totals
+                if cache_path:
+                    save_cache(cache_path, cache)
+
+    return results
+
+
+def bradley_terry(results: dict[tuple[str, str, int, int],
+                                tuple[int, int, int]],
+                  iterations: int = 1000,
+                  tolerance: float = 1e-9) -> dict[str, float]:
+    """
+    Fit Bradley-Terry strengths to the tournament results (a tie counts as
+    half a win for each bot) with the MM algorithm, and put them on the
+    Elo scale: a 400 point gap means 10 to 1 odds, and the ratings
+    average 1500.
+
+    Args:
+        results: Matchup results, as returned by run_tournament
+        iterations: Maximum number of MM iterations
+        tolerance: Stop once no strength changes by more than this
+
+    Returns:
+        The rating of every bot
+    """
+    wins: dict[str, float] = {}
+    games: dict[tuple[str, str], float] = {}
+    for (bot1, bot2, _, _), (w1, w2, ties) in results.items():
+        for name in (bot1, bot2):
+            wins.setdefault(name, 0.0)
+        a, b = sorted((bot1, bot2))
+        pair = (a, b)
+        games[pair] = games.get(pair, 0.0) + w1 + w2 + ties
+        wins[bot1] += w1 + ties / 2
+        wins[bot2] += w2 + ties / 2
+
+    for pair in games:
+        games[pair] += PRIOR_GAMES
+        for name in pair:
+            wins[name] += PRIOR_GAMES / 2
+
+    strength = {name: 1.0 for name in wins}
+    for _ in range(iterations):
+        updated = {}
+        for name in strength:
+            denominator = sum(
+                count / (strength[a] + strength[b])
+                for (a, b), count in games.items()
+                if name in (a, b)
+            )
+            updated[name] = wins[name] / denominator if denominator else 1.0
+        scale = math.exp(
+            sum(math.log(value) for value in updated.values()) / len(updated)
+        )
+        updated = {name: value / scale for name, value in updated.items()}
+        change = max(abs(updated[name] - strength[name]) for name in strength)
+        strength = updated
+        if change < tolerance:
+            break
+
+    return {name: 1500 + 400 * math.log10(value)
+            for name, value in strength.items()}
+
+
+def parse_size(size: str) -> tuple[int, int]:
+    """
+    Parse a tableau size written as ROWSxCOLS.
+    """
+    rows, sep, cols = size.lower().partition("x")
+    if not sep or not rows.isdigit() or not cols.isdigit():
+        raise click.BadParameter(f"expected ROWSxCOLS, got {size}",
+                                 param_hint="--size")
+    return int(rows), int(cols)
+
+
+@click.command()
+@click.option('-b', '--bots', default='random,greedy,smart',
+              help='Comma-separated names of the bots to play')
+@click.option('--extra-bot', 'extra', multiple=True,
+              help='Another bot, as NAME=module:ClassName')
+@click.option('--size', 'sizes', multiple=True, default=['3x4'],
+              help='Tableau size as ROWSxCOLS (repeatable)')
+@click.option('-n', '--num-games', type=int, default=200,
+              help='Games per matchup and seat order')
+@click.option('-s', '--seed', type=int, default=0,
+              help='Master seed (the same seed range is reused from cache)')
+@click.option('-w', '--workers', type=int, default=os.cpu_count() or 1,
+              help='Worker processes')
+@click.option('--cache', 'cache_path', default=DEFAULT_CACHE,
+              help='File with the cached matchup results')
+@click.option('--no-cache', is_flag=True, help='Ignore and keep no cache')
+@click.option('--mcts-rollouts', type=click.IntRange(min=1), default=200,
+              help='Rollouts per MCTS move')
+def main(bots: str, extra: tuple[str, ...], sizes: tuple[str, ...],
+         num_games: int, seed: int, workers: int, cache_path: str,
+         no_cache: bool, mcts_rollouts: int) -> None:
+    """Play a round-robin tournament between Letters bots"""
+    names = [name.strip() for name in bots.split(',') if name.strip()]
+    extra_bots = {}
+    for entry in extra:
+        name, sep, spec = entry.partition('=')
+        if not sep:
+            raise click.BadParameter(f"expected NAME=module:ClassName, "
+                                     f"got {entry}", param_hint='--extra-bot')
+        try:
+            register_bot(name, load_bot(spec))
+        except (ValueError, ImportError, AttributeError) as e:
+            raise click.BadParameter(str(e), param_hint='--extra-bot')
+        extra_bots[name] = spec
+        if name not in names:
+            names.append(name)
+
+    unknown = [name for name in names if name not in BOTS]
+    if unknown:
+        raise click.BadParameter(f"unknown bots: {', '.join(unknown)}",
+                                 param_hint='--bots')
+    if len(names) < 2:
+        raise click.UsageError("A tournament needs at least two bots.")
+
+    bot_options = {'mcts': {'rollouts': mcts_rollouts}}
+    results = run_tournament(names, [parse_size(size) for size in sizes],
+                             num_games, seed, workers, bot_options,
+                             None if no_cache else cache_path, extra_bots)
+
+    print(f"{'Player 1':>10} {'Player 2':>10} {'Size':>6} "
+          f"{'P1 wins':>8} {'P2 wins':>8} {'Ties':>6}")
+    for (bot1, bot2, rows, cols), (w1, w2, ties) in sorted(results.items()):
+        print(f"{bot1:>10} {bot2:>10} {f'{rows}x{cols}':>6} "
+              f"{w1:>8} {w2:>8} {ties:>6}")
+
+    print()
+    print(f"{'Bot':>10} {'Rating':>8}")
+    ratings = bradley_terry(results)
+    for name, rating in sorted(ratings.items(), key=lambda item: -item[1]):
+        print(f"{name:>10} {rating:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,28 @@
 """
 TUI for Milestone #3
 """
-import random
 import click
 from colorama import Fore
 from letters import LettersGame
-from base import CardType, PositionType
+from deck import LazyDeck
+from base import CardType, PositionType, Recorder
 
-def standard_deck() -> list[CardType]:
+def standard_deck() -> LazyDeck:
     """
-    Fixture that return a standard deck of Letters cards.
-    Note: when laid out in a 3x4 tableau, all cards will
-    have the letter "A" in them, so any three cards
-    will be a fit (according to the fake rules, not according
-    to the actual rules of Letters)
+    Returns a standard deck of Letters cards. The cards are generated
+    when they are dealt, not up front.
     """
-    letters = ["A", "B", "C"]
-    numbers = ["1", "2", "3"]
-    colors = ["red", "green", "blue"]
-    fonts = ["serif", "sans-serif", "monospace"]
+    return LazyDeck({
+        "letter": ["A", "B", "C"],
+        "number": ["1", "2", "3"],
+        "color": ["red", "green", "blue"],
+        "font": ["serif", "sans-serif", "monospace"],
+    })
 
-    all_cards = [
-        {"letter": letter, "number": number, "color": color, "font": font}
-        for letter in letters
-        for number in numbers
-        for color in colors
-        for font in fonts
-    ]
-
-    return all_cards
-
-def extended_deck() -> list[CardType]:
+def extended_deck() -> LazyDeck:
     """
-    Fixture that returns an extended deck of Letters cards.
+    Returns an extended deck of Letters cards (generated when they are
+    dealt, not up front).
     The extended deck includes new features:
     - Letter: A, B, C, D
     - Number: 1, 2, 3, 4
@@ -40,23 +30,13 @@ def extended_deck() -> list[CardType]:
     - Font: 4 different fonts
     - Border Color: Same options as Color
     """
-    letters = ["A", "B", "C", "D"]
-    numbers = ["1", "2", "3", "4"]
-    colors = ["red", "green", "blue", "orange"]
-    fonts = ["serif", "sans-serif", "monospace", "cursive"]
-    border_colors = ["red", "green", "blue", "orange"]
-
-    all_cards = [
-        {"letter": letter, "number": number, "color": color, "font": font,
-         "border_color": border_color}
-        for letter in letters
-        for number in numbers
-        for color in colors
-        for font in fonts
-        for border_color in border_colors
-    ]
-
-    return all_cards
+    return LazyDeck({
+        "letter": ["A", "B", "C", "D"],
+        "number": ["1", "2", "3", "4"],
+        "color": ["red", "green", "blue", "orange"],
+        "font": ["serif", "sans-serif", "monospace", "cursive"],
+        "border_color": ["red", "green", "blue", "orange"],
+    })
 
 def card_face(card: CardType | None) -> str:
     """
@@ -113,27 +93,49 @@ def card_face(card: CardType | None) -> str:
     return new_letter
 
 
-def tableau_board(game: LettersGame) -> None:
+class BoardView:
+    """
+    The TUI display of a tableau, kept between turns so that only the cards
+    that changed since the last display are rendered again (see
+    LettersGame.changes_since).
+    """
+    def __init__(self, game: LettersGame) -> None:
+        self.game = game
+        self.version = game.track_changes()
+        self.faces = [[card_face(game.card_at((r, c)))
+                       for c in range(game.ncols)]
+                      for r in range(game.nrows)]
+        self.rows = ["".join(faces).strip() for faces in self.faces]
+
+    def render(self) -> list[str]:
+        """
+        Returns the rows of the board, re-rendering the changed cards.
+        """
+        changes = self.game.changes_since(self.version)
+        changed_rows = set()
+        for r, c in changes["positions"]:
+            self.faces[r][c] = card_face(self.game.card_at((r, c)))
+            changed_rows.add(r)
+        for r in changed_rows:
+            self.rows[r] = "".join(self.faces[r]).strip()
+        self.version = changes["version"]
+        return self.rows
+
+def tableau_board(game: LettersGame, view: BoardView | None = None) -> None:
     """
     Creates a TUI visualization of the tableau board.
 
     Args:
         game: LettersGame
+        view: BoardView of the game from the previous display, if any
     
     Returns:
         prints the tableau board
     """
-    board = game.tableau
-    nrows = game.nrows
-    ncol = game.ncols
-    for r in range(nrows):
-        row_str = ""
-        for c in range(ncol):
-            element = board[r][c]
-            card_text = card_face(element)
-            card_format = f"{card_text}"
-            row_str += card_format
-        print(row_str.strip())
+    if view is None:
+        view = BoardView(game)
+    for row_str in view.render():
+        print(row_str)
 
 def three_locations(locations: str) -> list[PositionType]:
     """
@@ -184,7 +186,9 @@ def display_scores(scores: dict[int, int]) -> str:
         final_str += f"P{player}: {score} "
     return final_str
 
-def main_game(row: int, col: int, players: int, ext: bool, fit_s: int) -> None:
+
+def main_game(row: int, col: int, players: int, ext: bool, fit_s: int,
+              recorder: Recorder | None = None) -> None:
     """
     The main TUI game implementation.
 
@@ -193,14 +197,18 @@ def main_game(row: int, col: int, players: int, ext: bool, fit_s: int) -> None:
         col [int]: number of columns
         players [int]: number of players
         extended [bool]: whether to use the extended deck
+        recorder: where to record the moves (see replay.GameRecorder), if
+                  anywhere
     """
-    deck = extended_deck() if ext else standard_deck()
-    random.shuffle(deck)
+    deck = (extended_deck() if ext else standard_deck()).shuffled()
     tableau = LettersGame(deck, fit_s, (row, col), players)
+    if recorder is not None:
+        tableau.record(recorder)
+    view = BoardView(tableau)
     while not tableau.done:
-        tableau_board(tableau)
+        tableau_board(tableau, view)
         print(display_scores(tableau.scores))
-        if len(tableau.non_empty_positions) < row * col:
+        if not tableau.is_full:
             print("Next player, enter 'no fits left' if all players agree that "
             "there are no more fits.")
         current_player = int(input("Player Number:  "))
@@ -223,7 +231,7 @@ def main_game(row: int, col: int, players: int, ext: bool, fit_s: int) -> None:
                         else:
                             print("This is not a fit.")
                             print("Still in moonshot mode.")
-                            tableau_board(tableau)
+                            tableau_board(tableau, view)
                             print(display_scores(tableau.scores))
                     else:
                         print("Invalid action, try again.")
@@ -253,7 +261,10 @@ def main_game(row: int, col: int, players: int, ext: bool, fit_s: int) -> None:
 @click.option("-n", "--players", default = 4, help = "Number of players.")
 @click.option("--extended", is_flag = True, default = False, help = "Use the "
 "extended deck.")
-def play_game(rows, cols, players, extended):
+@click.option("--record", default=None,
+              help="Record the game to this file (see replay.py).")
+def play_game(rows: int, cols: int, players: int, extended: bool,
+              record: str | None) -> None:
     """Sets up the game based on click inputs (if available).
 
      Args:
@@ -261,6 +272,7 @@ def play_game(rows, cols, players, extended):
         cols [int]: number of columns
         players [int]: number of players
         extended [bool]: whether the game is in extended mode
+        record [str]: file to record the game to, if any
 
     Returns:
         Plays the main TUI game
@@ -268,7 +280,12 @@ def play_game(rows, cols, players, extended):
     fit_size = 3
     if extended:
         fit_size = 4
-    main_game(rows, cols, players, extended, fit_size)
+    if record:
+        from replay import GameRecorder
+        with GameRecorder(record) as recorder:
+            main_game(rows, cols, players, extended, fit_size, recorder)
+    else:
+        main_game(rows, cols, players, extended, fit_size)
 
 if __name__ == "__main__":
     play_game()
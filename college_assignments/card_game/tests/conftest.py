@@ -1,5 +1,30 @@
 import pytest
 from src.base import CardType
+import src.letters
+import letters
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    """
+    Adds a --backend option to run the suite against a given tableau
+    storage backend of LettersGame
+    """
+    parser.addoption("--backend", default="grid",
+                     choices=["grid", "bitboard"],
+                     help="Tableau backend used by LettersGame")
+
+
+@pytest.fixture(autouse=True)
+def tableau_backend(request: pytest.FixtureRequest,
+                    monkeypatch: pytest.MonkeyPatch) -> str:
+    """
+    Fixture that makes every LettersGame use the backend given with
+    --backend (unless a test asks for a specific one)
+    """
+    backend = request.config.getoption("--backend")
+    monkeypatch.setattr(src.letters.LettersGame, "default_backend", backend)
+    monkeypatch.setattr(letters.LettersGame, "default_backend", backend)
+    return backend
 
 
 @pytest.fixture()
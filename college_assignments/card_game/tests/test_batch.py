@@ -0,0 +1,56 @@
+import numpy as np
+
+from batch import LettersBatch, play_batch, simulate_batch
+from bot import simulate, standard_deck
+
+
+def played_batch(bot1_type: str, bot2_type: str,
+                 num_games: int = 300) -> LettersBatch:
+    """
+    Plays a seeded batch of standard 3x4 games to the end
+    """
+    batch = LettersBatch(standard_deck(), num_games, 3, 4,
+                         np.random.default_rng(13))
+    play_batch(batch, bot1_type, bot2_type)
+    return batch
+
+
+def test_greedy_scores_are_cards_taken() -> None:
+    """
+    Test that between greedy bots (which never miscall a fit or counter a
+    moonshot) the scores of a game add up to the cards taken off the
+    tableau, and that every game ends without a fit on the tableau unless
+    the deck ran out
+    """
+    batch = played_batch("greedy", "greedy")
+    assert batch.done.all()
+    taken = batch.cursor - batch.cards_on_table
+    assert (batch.scores.sum(axis=1) == taken).all()
+    assert (batch.scores >= 0).all()
+    assert (~batch.has_fit() | (batch.cursor >= batch.num_cards)).all()
+
+
+def test_greedy_against_random_ends_without_fits() -> None:
+    """
+    Test that games with a greedy bot only end once there is no fit left
+    (or the deck ran out), and that every game gets a result
+    """
+    for bots in [("greedy", "random"), ("random", "greedy")]:
+        batch = played_batch(*bots)
+        assert batch.done.all()
+        assert (~batch.has_fit() | (batch.cursor >= batch.num_cards)).all()
+        assert sum(batch.results()) == batch.num_games
+
+
+def test_simulate_batch_agrees_with_simulate() -> None:
+    """
+    Test that the lockstep simulation gives the same win, loss and tie
+    rates as playing the games one by one, up to sampling noise
+    """
+    for bots in [("greedy", "greedy"), ("random", "random"),
+                 ("random", "greedy")]:
+        batched = simulate_batch(4000, *bots, seed=13, batch_size=1500)
+        played = simulate(400, *bots, seed=13)
+        assert sum(batched) == 4000
+        for batched_count, played_count in zip(batched, played):
+            assert abs(batched_count / 4000 - played_count / 400) < 0.08
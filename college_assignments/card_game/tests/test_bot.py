@@ -0,0 +1,213 @@
+import itertools
+import random
+
+import click
+import pytest
+from click.testing import CliRunner
+
+from base import CardType, PositionType
+from bot import (LRUCache, MCTSBot, difference_interval, first_fit_of_three,
+                 is_fit, main, overlap_counts, simulate, simulate_sequential,
+                 standard_deck)
+from letters import LettersGame
+
+
+def random_tableau(rng: random.Random, nfeatures: int, nvalues: int,
+                   size: int) -> list[CardType | None]:
+    """
+    Returns 'size' distinct random cards with 'nfeatures' features of
+    'nvalues' values each, in a random order, with about one slot in six
+    left empty
+    """
+    deck = [dict(zip([f"f{i}" for i in range(nfeatures)], values))
+            for values in itertools.product("abcd"[:nvalues],
+                                            repeat=nfeatures)]
+    return [card if rng.random() > 1 / 6 else None
+            for card in rng.sample(deck, size)]
+
+
+def brute_force_fits(cards: list[CardType | None],
+                     fit_size: int) -> list[tuple[PositionType, ...]]:
+    """
+    Returns every fit among the cards, as tuples of (0, index) positions
+    """
+    return [tuple((0, idx) for idx in combo)
+            for combo in itertools.combinations(range(len(cards)), fit_size)
+            if is_fit([cards[idx] for idx in combo])]
+
+
+def play_mcts(seed: int, **options: object) -> None:
+    """
+    Plays a game between two MCTS bots with the given options, checking
+    that every fit they suggest is on the tableau
+    """
+    letters = LettersGame(standard_deck().shuffled(random.Random(seed)), 3,
+                          (3, 4), 2)
+    bots = [MCTSBot(letters, random.Random(seed + turn), **options)
+            for turn in range(2)]
+    turn = 0
+    while not letters.done and turn < 8:
+        fits = [tuple(fit) for fit in letters.find_fits()]
+        move = bots[turn % 2].suggest_move(turn % 2)
+        if move is not None:
+            assert tuple(sorted(move)) in fits
+            assert letters.call_fit(turn % 2 + 1, move)
+        elif letters.moonshot:
+            letters.moonshot_end()
+        turn += 1
+    assert turn > 0
+
+
+def test_mcts_legal_moves_with_rollouts() -> None:
+    """
+    Test that MCTSBot suggests legal fits under a rollout budget
+    """
+    play_mcts(0, rollouts=20)
+
+
+def test_mcts_legal_moves_with_time_limit() -> None:
+    """
+    Test that MCTSBot suggests legal fits under a time budget only
+    """
+    play_mcts(1, rollouts=None, time_limit=0.02)
+
+
+def test_mcts_legal_moves_with_workers() -> None:
+    """
+    Test that root-parallel MCTSBot suggests legal fits
+    """
+    play_mcts(2, rollouts=10, workers=2)
+
+
+def test_mcts_needs_a_budget() -> None:
+    """
+    Test that MCTSBot refuses to search without any budget, and that the
+    command line rejects unlimited rollouts without a time budget
+    """
+    letters = LettersGame(standard_deck(), 3, (3, 4), 2)
+    with pytest.raises(ValueError):
+        MCTSBot(letters, rollouts=None)
+
+    result = CliRunner().invoke(main, ["-1", "mcts", "--mcts-rollouts", "0"],
+                                standalone_mode=False)
+    assert isinstance(result.exception, click.BadParameter)
+
+
+def test_simulate_same_results_for_any_workers() -> None:
+    """
+    Test that a seeded simulation gives the same results whether the
+    games are played in this process or spread over worker processes
+    """
+    for bots in [("random", "greedy"), ("smart", "random")]:
+        serial = simulate(24, *bots, seed=7, workers=1)
+        assert sum(serial) == 24
+        assert simulate(24, *bots, seed=7, workers=3) == serial
+
+
+def test_overlap_counts_match_brute_force() -> None:
+    """
+    Test that the overlap count of every fit is the number of other fits
+    sharing a position with it, for fits of two, three and four cards
+    """
+    pairs = [((0, 0), (0, 1)), ((0, 0), (0, 2)), ((0, 1), (0, 2))]
+    assert overlap_counts(pairs, 2) == [2, 2, 2]
+
+    rng = random.Random(11)
+    for fit_size, nfeatures, size in [(2, 4, 8), (3, 4, 12), (3, 4, 18),
+                                      (4, 3, 16)]:
+        for _ in range(20):
+            cards = random_tableau(rng, nfeatures, fit_size, size)
+            fits = brute_force_fits(cards, fit_size)
+            expected = [sum(1 for other in fits
+                            if other is not fit and set(fit) & set(other))
+                        for fit in fits]
+            assert overlap_counts(fits, fit_size) == expected
+
+
+def test_first_fit_of_three_matches_brute_force() -> None:
+    """
+    Test that first_fit_of_three finds the fit a scan over every first,
+    later second and then any third card finds first, with and without a
+    completion table and with more than three values per feature
+    """
+    rng = random.Random(12)
+    for nfeatures, nvalues in [(4, 3), (3, 3), (5, 3), (3, 4)]:
+        for _ in range(40):
+            cards = random_tableau(rng, nfeatures, nvalues, 12)
+            present = [idx for idx, card in enumerate(cards)
+                       if card is not None]
+            expected = next(
+                ((first, second, third)
+                 for i, first in enumerate(present)
+                 for second in present[i + 1:]
+                 for third in present
+                 if third not in (first, second)
+                 and is_fit([cards[first], cards[second], cards[third]])),
+                None)
+            assert first_fit_of_three(cards) == expected
+
+
+def test_difference_interval() -> None:
+    """
+    Test the interval for the difference of the win rates against values
+    worked out by hand, and its edge cases
+    """
+    low, high = difference_interval(60, 40, 100)
+    assert low == pytest.approx(0.2 - 0.19204, abs=1e-4)
+    assert high == pytest.approx(0.2 + 0.19204, abs=1e-4)
+
+    wide = difference_interval(60, 40, 100, confidence=0.99)
+    assert wide[0] < low and wide[1] > high
+    tied = difference_interval(30, 30, 100)
+    assert tied == pytest.approx((-0.1518, 0.1518), abs=1e-4)
+    assert difference_interval(50, 0, 50) == (1.0, 1.0)
+    assert difference_interval(0, 0, 0) == (-1.0, 1.0)
+
+
+def test_simulate_sequential_stopping() -> None:
+    """
+    Test that an adaptive simulation stops at the first check when one
+    bot clearly wins, stops early when the bots are equivalent within a
+    loose tolerance, and plays every game when no tolerance can be met
+    """
+    results = simulate_sequential(1000, "greedy", "random", seed=14,
+                                  check_every=50)
+    assert results == (50, 0, 0)
+    assert results == simulate(50, "greedy", "random", seed=14)
+
+    results = simulate_sequential(1000, "random", "random", seed=14,
+                                  tolerance=0.5, check_every=50)
+    assert sum(results) < 1000
+
+    results = simulate_sequential(300, "random", "random", seed=14,
+                                  tolerance=0.0, check_every=50)
+    assert sum(results) == 300
+
+
+def test_lru_cache() -> None:
+    """
+    Test that the cache counts hits and misses, and evicts the least
+    recently used entry (where reading an entry or writing it again uses
+    it) once it is over its size
+    """
+    cache = LRUCache(3)
+    for key in "abc":
+        cache.put(key, key.upper())
+    assert cache.get("a") == "A"
+    cache.put("b", "B2")
+    cache.put("d", "D")
+    assert len(cache) == 3
+    assert cache.get("c") is None
+    assert cache.get("c", "missing") == "missing"
+    assert [cache.get(key) for key in "abd"] == ["A", "B2", "D"]
+    assert (cache.hits, cache.misses) == (4, 2)
+
+    cache.put("e", "E")
+    assert cache.get("a") is None
+    assert cache.get(None, 0) == 0
+    cache.put(None, None)
+    assert cache.get(None, 0) is None
+
+    cache.clear()
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (0, 0)
@@ -4,6 +4,7 @@ import pytest
 
 from base import LettersGameBase, CardType
 from fakes import LettersGameFake
+from deck import Deck
 
 
 def test_inheritance() -> None:
@@ -18,6 +19,15 @@ def test_init(standard_deck: list[CardType]) -> None:
     LettersGameFake(standard_deck, 3, (3, 4), 2)
 
 
+def test_init_from_deck(standard_deck: list[CardType]) -> None:
+    """Test that a LettersGameFake object can be built from a Deck"""
+    game = LettersGameFake(Deck(standard_deck, 3), 3, (3, 4), 2)
+
+    for r in range(3):
+        for c in range(4):
+            assert game.card_at((r, c)) == standard_deck[r * 4 + c]
+
+
 def test_init_properties(standard_deck: list[CardType]) -> None:
     """
     Test the properties of a LettersGameFake object after it is constructed
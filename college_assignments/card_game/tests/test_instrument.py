@@ -0,0 +1,56 @@
+import random
+from collections.abc import Iterator
+
+import pytest
+
+import instrument
+from bot import BOTS, MCTSBot, simulate, standard_deck
+from letters import LettersGame
+
+
+@pytest.fixture()
+def timing() -> Iterator[None]:
+    """
+    Fixture that turns timing on for a test and off afterwards
+    """
+    instrument.reset()
+    instrument.enable(BOTS)
+    yield
+    instrument.disable()
+    instrument.reset()
+
+
+def call_counts() -> dict[tuple[str, str], int]:
+    return {key: entry.calls for key, entry in instrument.stats().items()}
+
+
+def test_worker_timings_are_merged(timing: None) -> None:
+    """
+    Test that games played in worker processes are timed and counted
+    just like games played in this process
+    """
+    simulate(12, "greedy", "random", seed=16, workers=1)
+    serial = call_counts()
+    assert serial[("greedy", "suggest_move")] > 0
+
+    instrument.reset()
+    simulate(12, "greedy", "random", seed=16, workers=2)
+    assert call_counts() == serial
+
+
+def test_mcts_worker_timings_are_credited_to_the_bot(timing: None) -> None:
+    """
+    Test that the engine calls made by root-parallel MCTS workers are
+    recorded under the MCTS bot
+    """
+    letters = LettersGame(standard_deck().shuffled(random.Random(16)), 3,
+                          (3, 4), 2)
+    bot = MCTSBot(letters, random.Random(16), rollouts=5, workers=2)
+    for _ in range(6):
+        move = bot.suggest_move(0)
+        if move is None or letters.done:
+            break
+        letters.call_fit(1, move)
+    counts = call_counts()
+    assert counts[("mcts", "suggest_move")] > 0
+    assert counts.get(("mcts", "DrawPile.draw"), 0) > 0
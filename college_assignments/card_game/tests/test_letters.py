@@ -1,7 +1,15 @@
+import itertools
+import pickle
+import random
+
 import pytest
-from src.letters import LettersGame
+from src.letters import LettersGame, CardSchema, zobrist_key
+import deck as deck_module
+from deck import Deck, DrawPile, LazyDeck
 from src.base import CardType
 from letters import Card
+import completion_tables
+from replay import GameRecorder, Replayer, read_recording
 
 
 
@@ -74,6 +82,32 @@ def test_tableau_9x9(standard_deck: list[CardType]) -> None:
             assert tableau[r][c] in standard_deck
 
 
+def test_tableau_view(standard_deck: list[CardType]) -> None:
+    """
+    Test that the tableau view reads like nested lists, gives row, column
+    and flat access, and follows the game without being rebuilt
+    """
+    game = LettersGame(standard_deck, 3, (3, 4), 2)
+    tableau = game.tableau
+    expected = [[game.card_at((r, c)) for c in range(4)] for r in range(3)]
+
+    assert tableau == expected
+    assert tableau.to_list() == expected
+    assert list(tableau.row(1)) == expected[1]
+    assert list(tableau.column(2)) == [row[2] for row in expected]
+    assert list(tableau.flat()) == [card for row in expected for card in row]
+    assert tableau[-1][-1] == expected[2][3]
+    assert tableau[0][1:3] == expected[0][1:3]
+    with pytest.raises(IndexError):
+        tableau[3]
+    with pytest.raises(TypeError):
+        tableau[0][0] = None
+
+    game.call_fit(1, game.find_fits()[0])
+    assert tableau == game.tableau.to_list()
+    assert tableau != expected
+
+
 def test_card_at_3x4(standard_deck: list[CardType]) -> None:
     game = LettersGame(standard_deck, 3, (3, 4), 2)
     
@@ -184,10 +218,7 @@ def test_lightning_mode_call_fit(standard_deck: list[CardType]) -> None:
     game = LettersGame(standard_deck, 3, (3,4), 2, lightning=True)
 
                 
-    # valid fit tableau
-    game.tableau[0][0] = {"letter": "A", "number": "1", "color": "red", "font": "serif"}
-    game.tableau[0][1] = {"letter": "A", "number": "2", "color": "green", "font": "sans-serif"}
-    game.tableau[0][2] = {"letter": "A", "number": "3", "color": "blue", "font": "monospace"}
+    # the first three cards of the deck are a valid fit
     
     # player 1 called valid fit
     game.call_fit(1, [(0, 0), (0, 1), (0, 2)])
@@ -221,10 +252,7 @@ def test_lightning_mode_moonshot_fail(standard_deck: list[CardType]) -> None:
     
     game = LettersGame(standard_deck, 3, (3, 4), 2, lightning = True) # game with 4 players
     
-    # valid fit tableau
-    game.tableau[0][0] = {"letter": "A", "number": "1", "color": "red", "font": "serif"}
-    game.tableau[0][1] = {"letter": "A", "number": "2", "color": "green", "font": "sans-serif"}
-    game.tableau[0][2] = {"letter": "A", "number": "3", "color": "blue", "font": "monospace"}
+    # the first three cards of the deck are a valid fit
     
     game.moonshot_start(1)  # assume player 1 starts the moonshot
     game.call_fit(2, [(0, 0), (0, 1), (0, 2)])
@@ -525,9 +553,7 @@ def test_call_fit_lightning_validate_player(standard_deck: list[CardType]) -> No
 
     game = LettersGame(standard_deck, 3, (3, 4), 3, lightning=True)
     
-    game.tableau[0][0] = {"letter": "A", "number": "1", "color": "red", "font": "serif"}
-    game.tableau[0][1] = {"letter": "A", "number": "2", "color": "green", "font": "sans-serif"}
-    game.tableau[0][2] = {"letter": "A", "number": "3", "color": "blue", "font": "monospace"}
+    # the first three cards of the deck are a valid fit
 
     game.moonshot_start(1)
     game.call_fit(2, [(0, 0), (0, 1), (0, 2)])
@@ -620,10 +646,7 @@ def test_moonshot_fail_x(extended_deck: list[CardType]) -> None:
     game.moonshot_start(1)  
     assert game.moonshot
     
-    game.tableau[0][0] = {"letter": "A", "number": "1", "color": "red", "font": "serif"}
-    game.tableau[0][1] = {"letter": "B", "number": "2", "color": "green", "font": "sans-serif"}
-    game.tableau[0][2] = {"letter": "C", "number": "3", "color": "blue", "font": "monospace"}
-    game.tableau[0][3] = {"letter": "D", "number": "4", "color": "yellow", "font": "serif"}
+    # the first four cards of the deck are a valid fit
     game.call_fit(2, [(0, 0), (0, 1), (0, 2), (0, 3)])
 
     assert game.scores[1] == -63
@@ -632,3 +655,698 @@ def test_moonshot_fail_x(extended_deck: list[CardType]) -> None:
 
     assert og_cards != tableau_cards
     assert all(card is not None for row in game.tableau for card in row)
+
+
+def dict_is_fit(cards: list[CardType]) -> bool:
+    """
+    Reference fit check on card dictionaries
+    """
+    for feature in cards[0]:
+        distinct = {card[feature] for card in cards}
+        if len(distinct) != 1 and len(distinct) != len(cards):
+            return False
+    return True
+
+
+def test_schema_roundtrip(standard_deck: list[CardType]) -> None:
+    """
+    Test that every card can be encoded into a distinct code and decoded back
+    """
+    schema = CardSchema(standard_deck, 3)
+    codes = [schema.encode(card) for card in standard_deck]
+
+    assert sorted(codes) == list(range(81))
+    for card, code in zip(standard_deck, codes):
+        assert schema.decode(code) == card
+
+    assert schema.encode({"letter": "Z", "number": "1", "color": "red",
+                          "font": "serif"}) is None
+
+
+def test_schema_is_fit_matches_rules(standard_deck: list[CardType],
+                                     extended_deck: list[CardType]) -> None:
+    """
+    Test that the arithmetic fit check agrees with the dictionary rules
+    """
+    rng = random.Random(14200)
+    for deck, size in [(standard_deck, 3), (extended_deck, 4)]:
+        schema = CardSchema(deck, size)
+        for _ in range(2000):
+            cards = rng.sample(deck, size)
+            codes = [schema.encode(card) for card in cards]
+            assert schema.is_fit(codes) == dict_is_fit(cards)
+
+
+def test_completion_tables_match_rules(standard_deck: list[CardType],
+                                       extended_deck: list[CardType]) -> None:
+    """
+    Test that the shipped completion tables are up to date and complete
+    fits like the rules do
+    """
+    rng = random.Random(2024)
+    for deck, size in [(standard_deck, 3), (extended_deck, 4)]:
+        schema = CardSchema(deck, size)
+        nfeatures = len(schema.features)
+        table = completion_tables.load_table(size, nfeatures)
+        assert table == completion_tables.generate(size, nfeatures)
+        for _ in range(2000):
+            cards = rng.sample(deck, size - 1)
+            code = schema.completion([schema.encode(card) for card in cards])
+            matches = [card for card in deck
+                       if card not in cards and dict_is_fit(cards + [card])]
+            completed = [] if code is None else [schema.decode(code)]
+            assert completed == matches
+
+
+def test_find_fits_matches_brute_force(standard_deck: list[CardType],
+                                       extended_deck: list[CardType]) -> None:
+    """
+    Test that find_fits reports exactly the fits an exhaustive scan finds
+    """
+    rng = random.Random(142)
+    for deck, size, shape in [(standard_deck, 3, (4, 5)),
+                              (extended_deck, 4, (4, 4))]:
+        for _ in range(5):
+            rng.shuffle(deck)
+            game = LettersGame(deck, size, shape, 2)
+            positions = sorted(game.non_empty_positions)
+            expected = [
+                list(combo)
+                for combo in itertools.combinations(positions, size)
+                if dict_is_fit([game.card_at(pos) for pos in combo])
+            ]
+            assert sorted(game.find_fits()) == expected
+            assert game.has_fit() == bool(expected)
+
+
+def test_has_fit_no_fits(standard_deck_no_fits: list[CardType]) -> None:
+    """
+    Test that has_fit returns False on a tableau without fits
+    """
+    game = LettersGame(standard_deck_no_fits, 3, (3, 4), 2)
+    assert not game.has_fit()
+    assert game.find_fits() == []
+
+
+def test_fit_index_tracks_call_fit(standard_deck: list[CardType],
+                                   extended_deck: list[CardType]) -> None:
+    """
+    Test that the live fit index stays in sync with the tableau as fits
+    are called, moonshots are countered and the tableau is redealt
+    """
+    rng = random.Random(1)
+    for deck, size, shape in [(standard_deck, 3, (3, 4)),
+                              (extended_deck, 4, (4, 5))]:
+        rng.shuffle(deck)
+        game = LettersGame(deck, size, shape, 2)
+        assert game.fits == {tuple(fit) for fit in game._iter_fits()}
+
+        while game.has_fit() and not game.done:
+            fit = rng.choice(game.find_fits())
+            if len(game.non_empty_positions) == shape[0] * shape[1]:
+                game.moonshot_start(1)
+            game.call_fit(2, fit)
+            assert game.fits == {tuple(fit) for fit in game._iter_fits()}
+            for pos in game.non_empty_positions:
+                assert game.fits_at(pos) == {
+                    fit for fit in game.fits if pos in fit
+                }
+
+
+def test_fit_index_after_redeal(standard_deck_no_fits: list[CardType]) -> None:
+    """
+    Test that the fit index is rebuilt after a successful moonshot
+    """
+    game = LettersGame(standard_deck_no_fits, 3, (3, 4), 2)
+    assert not game.has_fit()
+
+    game.moonshot_start(1)
+    game.moonshot_end()
+    assert game.fits == {tuple(fit) for fit in game._iter_fits()}
+
+
+def test_bitboard_backend_matches_grid(standard_deck: list[CardType]) -> None:
+    """
+    Test that the bitboard backend answers the same queries as the grid one
+    """
+    random.Random(3).shuffle(standard_deck)
+    grid = LettersGame(standard_deck, 3, (4, 5), 2, backend="grid")
+    bits = LettersGame(standard_deck, 3, (4, 5), 2, backend="bitboard")
+    assert bits.backend == "bitboard"
+
+    for _ in range(4):
+        assert bits.tableau == grid.tableau
+        assert bits.non_empty_positions == grid.non_empty_positions
+        assert bits.find_fits() == grid.find_fits()
+        for pos in grid.non_empty_positions:
+            for feature in ["letter", "number", "color", "font"]:
+                assert (bits.cards_sharing(pos, feature)
+                        == grid.cards_sharing(pos, feature))
+
+        fit = grid.find_fits()[0]
+        assert grid.call_fit(1, fit) and bits.call_fit(1, fit)
+
+
+def test_unknown_backend(standard_deck: list[CardType]) -> None:
+    """
+    Test that the constructor rejects an unknown tableau backend
+    """
+    with pytest.raises(ValueError):
+        LettersGame(standard_deck, 3, (3, 4), 2, backend="sparse")
+
+
+def game_state(game: LettersGame) -> tuple:
+    """
+    Snapshot of the observable state of a game
+    """
+    return (game.tableau.to_list(), dict(game.scores), game.done,
+            set(game.outcome), game.moonshot, set(game.active_players),
+            game.fits)
+
+
+def test_clone_is_independent(standard_deck: list[CardType]) -> None:
+    """
+    Test that playing on a clone does not affect the original game
+    """
+    game = LettersGame(standard_deck, 3, (3, 4), 2)
+    before = game_state(game)
+
+    other = game.clone()
+    assert game_state(other) == before
+
+    other.call_fit(1, other.find_fits()[0])
+    other.moonshot_start(2)
+    assert game_state(game) == before
+    assert game_state(other) != before
+
+
+def test_apply_undo_redo(standard_deck: list[CardType]) -> None:
+    """
+    Test that undo reverts every kind of move, and redo plays it again
+    """
+    rng = random.Random(5)
+    rng.shuffle(standard_deck)
+    game = LettersGame(standard_deck, 3, (3, 4), 2)
+
+    states = [game_state(game)]
+    while not game.done:
+        fits = game.find_fits()
+        if fits:
+            move = ("fit", rng.choice([1, 2]), rng.choice(fits))
+        elif not game.moonshot and len(game.non_empty_positions) == 12:
+            move = ("moonshot_start", 1)
+        elif game.moonshot:
+            move = ("moonshot_end",)
+        else:
+            move = ("end_game",)
+        game.apply(move)
+        states.append(game_state(game))
+
+    moves = game.moves
+    assert len(moves) == len(states) - 1
+
+    for i in reversed(range(len(moves))):
+        assert game.undo() == moves[i]
+        assert game_state(game) == states[i]
+    assert game.undo() is None
+
+    for i in range(len(moves)):
+        assert game.redo() == moves[i]
+        assert game_state(game) == states[i + 1]
+    assert game.redo() is None
+
+
+def scanned_hash(game: LettersGame) -> int:
+    """
+    Tableau hash computed from scratch
+    """
+    value = 0
+    for r, c in game.non_empty_positions:
+        value ^= zobrist_key(r * game.ncols + c, game._code_at((r, c)))
+    return value
+
+
+def test_tableau_hash_tracks_moves(standard_deck: list[CardType]) -> None:
+    """
+    Test that the tableau hash stays equal to a full scan of the tableau
+    through fits, moonshots, redeals, undos and redos
+    """
+    rng = random.Random(3)
+    rng.shuffle(standard_deck)
+    game = LettersGame(standard_deck, 3, (3, 4), 2)
+    start = game.tableau_hash
+    assert start == scanned_hash(game)
+    hashes = [start]
+
+    while not game.done:
+        fits = game.find_fits()
+        if fits and rng.random() < 0.8:
+            move = ("fit", 1, rng.choice(fits))
+        elif fits:
+            move = ("fit", 2, rng.sample(sorted(game.non_empty_positions), 3))
+        elif len(game.non_empty_positions) == 12:
+            game.apply(("moonshot_start", 2))
+            hashes.append(game.tableau_hash)
+            move = ("moonshot_end",)
+        else:
+            move = ("end_game",)
+        game.apply(move)
+        assert game.tableau_hash == scanned_hash(game)
+        hashes.append(game.tableau_hash)
+
+    while game.moves:
+        game.undo()
+        assert game.tableau_hash == scanned_hash(game)
+    assert game.tableau_hash == start
+
+    # Replaying the moves goes back through the same tableaus
+    replayed = [game.tableau_hash]
+    while game.redo() is not None:
+        assert game.tableau_hash == scanned_hash(game)
+        replayed.append(game.tableau_hash)
+    assert replayed == hashes
+
+
+def test_occupancy_tracks_moves(standard_deck: list[CardType]) -> None:
+    """
+    Test that the tracked non-empty positions and counts match a scan of
+    the tableau as the deck runs out, and after undos
+    """
+    rng = random.Random(23)
+    rng.shuffle(standard_deck)
+    game = LettersGame(standard_deck, 3, (3, 4), 2)
+
+    def check() -> None:
+        scanned = {(r, c) for r in range(3) for c in range(4)
+                   if game.card_at((r, c)) is not None}
+        assert game.non_empty_positions == scanned
+        assert list(game.non_empty_positions) == list(scanned)
+        assert game.occupied_count == len(scanned)
+        assert game.empty_count == 12 - len(scanned)
+        assert game.is_full == (len(scanned) == 12)
+
+    check()
+    while not game.done:
+        fits = game.find_fits()
+        if fits:
+            game.apply(("fit", 1, rng.choice(fits)))
+        elif game.is_full:
+            game.apply(("moonshot_start", 2))
+            game.apply(("moonshot_end",))
+        else:
+            game.apply(("end_game",))
+        check()
+    assert game.empty_count > 0
+
+    while game.moves:
+        game.undo()
+        check()
+
+
+def test_tableau_hash_of_clone(standard_deck: list[CardType]) -> None:
+    """
+    Test that a clone has the same hash until its tableau changes
+    """
+    game = LettersGame(standard_deck, 3, (3, 4), 2)
+    other = game.clone()
+    assert other.tableau_hash == game.tableau_hash
+
+    other.call_fit(1, other.find_fits()[0])
+    assert other.tableau_hash != game.tableau_hash
+    assert game.tableau_hash == scanned_hash(game)
+
+
+def test_changes_since(standard_deck: list[CardType]) -> None:
+    """
+    Test that changes_since reports every difference between an earlier
+    version of the game and the current one, through moves and undos,
+    once the changes are tracked
+    """
+    rng = random.Random(21)
+    rng.shuffle(standard_deck)
+    game = LettersGame(standard_deck, 3, (3, 4), 2)
+    with pytest.raises(ValueError):
+        game.changes_since(0)
+    with pytest.raises(ValueError):
+        game.clone().changes_since(0)
+    assert game.track_changes() == 0
+
+    def snapshot() -> tuple:
+        return (game.version, game.tableau.to_list(), dict(game.scores),
+                game.moonshot, game.done)
+
+    def check(old: tuple) -> None:
+        version, tableau, scores, moonshot, done = old
+        changes = game.changes_since(version)
+        assert changes["version"] == game.version
+        assert not changes["reset"]
+        for r in range(3):
+            for c in range(4):
+                if game.tableau[r][c] != tableau[r][c]:
+                    assert (r, c) in changes["positions"]
+        assert changes["scores"] == {
+            p: game.scores[p] - scores[p] for p in scores
+            if game.scores[p] != scores[p]
+        }
+        modes = dict(changes["modes"])
+        assert modes.get("moonshot", moonshot) == game.moonshot
+        assert modes.get("done", done) == game.done
+
+    snapshots = [snapshot()]
+    while not game.done:
+        fits = game.find_fits()
+        if fits and rng.random() < 0.8:
+            move = ("fit", 1, rng.choice(fits))
+        elif fits:
+            move = ("fit", 2, rng.sample(sorted(game.non_empty_positions), 3))
+        elif len(game.non_empty_positions) == 12:
+            game.apply(("moonshot_start", 2))
+            snapshots.append(snapshot())
+            move = ("moonshot_end",)
+        else:
+            move = ("end_game",)
+        game.apply(move)
+        snapshots.append(snapshot())
+        for old in rng.sample(snapshots, min(5, len(snapshots))):
+            check(old)
+
+    for _ in range(10):
+        game.undo()
+        check(snapshots[0])
+        check(snapshots[-1])
+
+    assert game.changes_since(game.version)["positions"] == set()
+    with pytest.raises(ValueError):
+        game.changes_since(game.version + 1)
+    assert game.clone().changes_since(0)["reset"]
+
+
+def test_apply_invalid_move(standard_deck: list[CardType]) -> None:
+    """
+    Test that a move that raises ValueError is not recorded
+    """
+    game = LettersGame(standard_deck, 3, (3, 4), 2)
+
+    with pytest.raises(ValueError):
+        game.apply(("fit", 3, [(0, 0), (0, 1), (0, 2)]))
+    with pytest.raises(ValueError):
+        game.apply(("pass", 1))
+    assert game.moves == []
+
+
+def test_deck_validation(standard_deck: list[CardType]) -> None:
+    """
+    Test that a Deck runs the same checks as the LettersGame constructor
+    """
+    with pytest.raises(ValueError):
+        Deck(standard_deck, 4)
+
+    with pytest.raises(ValueError):
+        Deck(standard_deck + [standard_deck[0]], 3)
+
+    with pytest.raises(ValueError):
+        Deck(standard_deck[:-1] + [{"letter": "A"}], 3)
+
+
+def test_game_from_deck(standard_deck: list[CardType]) -> None:
+    """
+    Test that a shuffled Deck deals the same game as the shuffled list
+    """
+    deck = Deck(standard_deck, 3)
+    shuffled = deck.shuffled(random.Random(9))
+    random.Random(9).shuffle(standard_deck)
+
+    assert shuffled.dicts() == standard_deck
+    assert len(deck) == 81 and deck.dicts() != standard_deck
+
+    from_deck = LettersGame(shuffled, 3, (3, 4), 2)
+    from_list = LettersGame(standard_deck, 3, (3, 4), 2)
+    assert from_deck.tableau == from_list.tableau
+    assert from_deck.find_fits() == from_list.find_fits()
+
+    with pytest.raises(ValueError):
+        LettersGame(deck, 4, (3, 4), 2)
+
+
+STANDARD_FEATURES = {
+    "letter": ["A", "B", "C"],
+    "number": ["1", "2", "3"],
+    "color": ["red", "green", "blue"],
+    "font": ["serif", "sans-serif", "monospace"],
+}
+
+
+def test_lazy_deck_order(standard_deck: list[CardType]) -> None:
+    """
+    Test that an unshuffled LazyDeck generates the cards in product order
+    """
+    deck = LazyDeck(STANDARD_FEATURES)
+    assert len(deck) == 81
+    assert deck.dicts() == standard_deck
+    assert deck[80].features == standard_deck[80]
+
+    with pytest.raises(IndexError):
+        deck[81]
+
+
+def test_cards_are_interned(standard_deck: list[CardType]) -> None:
+    """
+    Test that a deck hands out one immutable, hashable Card per distinct
+    card, equal to a stand-alone Card with the same features
+    """
+    deck = LazyDeck(STANDARD_FEATURES)
+    shuffled = deck.shuffled(random.Random(1))
+    assert all(shuffled[i] is deck[shuffled[i].code] for i in range(81))
+    assert len({card for card in deck}) == 81
+
+    card = deck[5]
+    assert card.features == standard_deck[5]
+    assert card.values == tuple(deck.schema.digits(5))
+    assert card == Card(dict(standard_deck[5]))
+    assert hash(card) == hash(Card(dict(standard_deck[5])))
+    assert card != deck[6]
+    with pytest.raises(AttributeError):
+        card.code = 6
+    assert pickle.loads(pickle.dumps(card)) == card
+
+    validated = Deck(standard_deck, 3)
+    assert validated[0] is validated.schema.card(validated[0].code)
+    assert validated[0].features is standard_deck[0]
+
+
+@pytest.mark.parametrize("limit", [1 << 16, 0])
+def test_lazy_deck_shuffle_is_permutation(limit: int,
+                                          monkeypatch: pytest.MonkeyPatch
+                                          ) -> None:
+    """
+    Test that a shuffled LazyDeck holds every card exactly once, and that
+    the order only depends on the random number generator (shuffling a
+    list of codes, or through the keyed permutation with a limit of 0),
+    and that its codes are listed without building any card
+    """
+    monkeypatch.setattr(deck_module, "_SHUFFLE_LIMIT", limit)
+    features = {f"f{i}": ["w", "x", "y", "z"] for i in range(6)}
+    deck = LazyDeck(features)
+    shuffled = deck.shuffled(random.Random(4))
+    listed = shuffled.codes()
+    assert not deck.schema._cards
+
+    codes = [card.code for card in shuffled]
+    assert listed == codes
+    assert sorted(codes) == list(range(4 ** 6))
+    assert codes != list(range(4 ** 6))
+    assert codes == [card.code for card in deck.shuffled(random.Random(4))]
+
+
+@pytest.mark.parametrize("limit", [1 << 16, 0])
+def test_lazy_deck_shuffle_is_uniform(limit: int,
+                                      monkeypatch: pytest.MonkeyPatch
+                                      ) -> None:
+    """
+    Test that every card is equally likely to come first in a shuffled
+    LazyDeck, and that shuffles leave about one card in place on average
+    (as uniformly random permutations do)
+    """
+    monkeypatch.setattr(deck_module, "_SHUFFLE_LIMIT", limit)
+    deck = LazyDeck(STANDARD_FEATURES)
+    shuffles = [deck.shuffled(random.Random(seed)) for seed in range(2000)]
+
+    firsts = [0] * 81
+    for shuffled in shuffles:
+        firsts[shuffled[0].code] += 1
+    expected = len(shuffles) / 81
+    chi_square = sum((count - expected) ** 2 / expected for count in firsts)
+    # 80 degrees of freedom: the 99.9th percentile is about 125
+    assert chi_square < 125
+
+    fixed = [sum(card.code == i for i, card in enumerate(shuffled))
+             for shuffled in shuffles[:400]]
+    assert 0.8 < sum(fixed) / len(fixed) < 1.2
+
+
+@pytest.mark.parametrize("limit", [1 << 16, 0])
+def test_lazy_deck_shuffle_follows_random_seed(
+        limit: int, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that without a random number generator a LazyDeck shuffles with
+    the random module, as a Deck does, so seeding it repeats the deal
+    """
+    monkeypatch.setattr(deck_module, "_SHUFFLE_LIMIT", limit)
+    deck = LazyDeck(STANDARD_FEATURES)
+    deals = []
+    for _ in range(2):
+        random.seed(8)
+        deals.append([card.code for card in deck.shuffled()])
+    assert deals[0] == deals[1]
+
+
+def test_game_from_lazy_deck() -> None:
+    """
+    Test a game dealt from a LazyDeck, drawing until the deck runs out
+    """
+    deck = LazyDeck(STANDARD_FEATURES).shuffled(random.Random(6))
+    game = LettersGame(deck, 3, (3, 4), 2)
+    assert game.tableau == [
+        [deck[r * 4 + c].features for c in range(4)] for r in range(3)
+    ]
+
+    while game.has_fit():
+        game.call_fit(1, game.find_fits()[0])
+    assert game.scores[1] > 0
+
+
+def test_deck_position(standard_deck: list[CardType]) -> None:
+    """
+    Test that the deck position counts the cards dealt so far, that undo
+    puts it back, and that a clone shares the deck
+    """
+    game = LettersGame(standard_deck, 3, (3, 4), 2)
+    assert game.deck_position == 12
+    assert [card.features for card in game.deck] == standard_deck
+
+    positions = []
+    while game.has_fit() and game.cards_left >= 3:
+        positions.append(game.deck_position)
+        game.apply(("fit", 1, game.find_fits()[0]))
+        assert game.deck_position == positions[-1] + 3
+        assert game.deck_position + game.cards_left == len(game.deck)
+
+    clone = game.clone()
+    assert clone.deck is game.deck
+    assert clone.deck_position == game.deck_position
+    for position in reversed(positions):
+        game.undo()
+        assert game.deck_position == position
+
+
+def test_lazy_deck_validation() -> None:
+    """
+    Test that a LazyDeck rejects features with different numbers of values
+    """
+    with pytest.raises(ValueError):
+        LazyDeck({"letter": ["A", "B", "C"], "number": ["1", "2"]})
+
+    with pytest.raises(ValueError):
+        LazyDeck({"letter": ["A", "A", "B"]})
+
+
+def test_draw_pile() -> None:
+    """
+    Test drawing, peeking, counting and restoring a DrawPile
+    """
+    cards = ["a", "b", "c", "d"]
+    pile = DrawPile(cards, 1)
+    assert len(pile) == 3
+    assert pile.peek(2) == ["b", "c"]
+
+    saved = pile.snapshot()
+    assert [pile.draw(), pile.draw(), pile.draw()] == ["b", "c", "d"]
+    assert not pile and pile.peek() == []
+    with pytest.raises(IndexError):
+        pile.draw()
+
+    other = pile.copy()
+    pile.restore(saved)
+    assert len(pile) == 3 and len(other) == 0
+    assert cards == ["a", "b", "c", "d"]
+
+
+def test_cards_left(standard_deck: list[CardType]) -> None:
+    """
+    Test that successful fits draw replacement cards from the deck
+    """
+    game = LettersGame(standard_deck, 3, (3, 4), 2)
+    assert game.cards_left == 69
+
+    game.call_fit(1, game.find_fits()[0])
+    assert game.cards_left == 66
+
+
+def test_record_and_replay(standard_deck: list[CardType], tmp_path) -> None:
+    """
+    Test that a recorded game replays to the same state after every move,
+    in order and when seeking, with the undone moves left out
+    """
+    rng = random.Random(11)
+    rng.shuffle(standard_deck)
+    game = LettersGame(standard_deck, 3, (3, 4), 2)
+    path = tmp_path / "game.jsonl"
+
+    keys = [game.state_key()]
+    undone = False
+    with GameRecorder(str(path)) as recorder:
+        game.record(recorder)
+        while not game.done:
+            fits = game.find_fits()
+            if game.moonshot:
+                move = ("moonshot_end",)
+            elif len(keys) % 7 == 3:
+                move = ("fit", 2, [(0, 0), (0, 1), (0, 2)])
+            elif fits:
+                move = ("fit", rng.choice([1, 2]), rng.choice(fits))
+            elif game.is_full:
+                move = ("moonshot_start", 1)
+            else:
+                move = ("end_game",)
+            game.apply(move)
+            keys.append(game.state_key())
+            if len(keys) == 5 and not undone:
+                game.undo()
+                keys.pop()
+                undone = True
+
+    setup, moves = read_recording(str(path))
+    assert setup["deck"] == [Deck(standard_deck, 3).schema.encode(card)
+                             for card in standard_deck]
+    assert [move for move, _ in moves] == game.moves
+
+    replayer = Replayer(setup, moves)
+    assert len(replayer) == len(keys) - 1
+    for i, key in enumerate(keys):
+        assert replayer.position == i
+        assert replayer.state_key() == key
+        replayer.step()
+    assert not replayer.step()
+    assert replayer.scores == game.scores
+    assert replayer.outcome == game.outcome
+
+    assert replayer.tableau() == game.tableau.to_list()
+
+    for i in [len(keys) // 2, 0, len(keys) - 1, 1]:
+        replayer.seek(i)
+        assert replayer.state_key() == keys[i]
+    assert replayer.game().state_key() == keys[1]
+
+    with pytest.raises(ValueError):
+        replayer.seek(len(keys))
+
+
+def test_record_only_new_game(standard_deck: list[CardType], tmp_path) -> None:
+    """
+    Test that a game can only be recorded from its first move
+    """
+    game = LettersGame(standard_deck, 3, (3, 4), 2)
+    game.call_fit(1, game.find_fits()[0])
+    with GameRecorder(str(tmp_path / "game.jsonl")) as recorder:
+        with pytest.raises(ValueError):
+            game.record(recorder)
@@ -0,0 +1,53 @@
+from pathlib import Path
+
+import pytest
+
+from records import read_records, simulate_to_file, summarize
+
+
+def sorted_records(path: str) -> list[dict]:
+    return sorted(read_records(path), key=lambda record: record["game"])
+
+
+@pytest.mark.parametrize("name", ["games.jsonl", "games.csv"])
+def test_resume_matches_uninterrupted_run(tmp_path: Path, name: str) -> None:
+    """
+    Test that a run interrupted mid-record and resumed (with the master
+    seed read back from the file) ends with one record per game, the same
+    records as a run that was never interrupted
+    """
+    full = str(tmp_path / f"full-{name}")
+    assert simulate_to_file(full, 30, "greedy", "random", seed=17,
+                            workers=2, shard_size=7) == 30
+
+    resumed = str(tmp_path / name)
+    simulate_to_file(resumed, 12, "greedy", "random", seed=17)
+    with open(resumed, "a", encoding="utf-8") as f:
+        f.write('{"master_seed": 17, "game": 1')
+    assert simulate_to_file(resumed, 30, "greedy", "random", workers=2,
+                            resume=True, shard_size=7) == 18
+    assert simulate_to_file(resumed, 30, "greedy", "random",
+                            resume=True) == 0
+
+    games = [record["game"] for record in read_records(resumed)]
+    assert sorted(games) == list(range(30))
+    assert sorted_records(resumed) == sorted_records(full)
+    assert summarize(read_records(resumed)) == summarize(read_records(full))
+
+
+def test_resume_rejects_other_runs(tmp_path: Path) -> None:
+    """
+    Test that resuming refuses a file written with another master seed or
+    for another matchup, and needs a seed when the file is empty
+    """
+    path = str(tmp_path / "games.jsonl")
+    simulate_to_file(path, 5, "greedy", "random", seed=17)
+    with pytest.raises(ValueError, match="master seed"):
+        simulate_to_file(path, 10, "greedy", "random", seed=18, resume=True)
+    with pytest.raises(ValueError, match="matchup"):
+        simulate_to_file(path, 10, "random", "greedy", seed=17, resume=True)
+    assert len(read_records(path)) == 5
+
+    with pytest.raises(ValueError, match="master seed"):
+        simulate_to_file(str(tmp_path / "empty.jsonl"), 5, "greedy",
+                         "random", resume=True)
@@ -0,0 +1,107 @@
+import random
+
+from bot import PerfectBot, standard_deck
+from letters import LettersGame
+from solver import (EndgameSolver, line_value, next_player, play_turn,
+                    turn_actions)
+
+
+def endgame(seed: int, cards_left: int) -> tuple[LettersGame, int]:
+    """
+    Plays a game by always taking the first action until 'cards_left'
+    cards are left in the deck, and returns it with the player to move
+    """
+    letters = LettersGame(standard_deck().shuffled(random.Random(seed)), 3,
+                          (3, 4), 2)
+    player = 1
+    while not letters.done and letters.cards_left > cards_left:
+        play_turn(letters, player, turn_actions(letters)[0])
+        player = next_player(letters, player)
+    return letters, player
+
+
+def minimax(letters: LettersGame, player: int) -> int:
+    """
+    Value of the position for 'player', by searching every line of play
+    (no pruning, no transposition table)
+    """
+    if letters.done:
+        return 0
+    opponent = next_player(letters, player)
+    values = []
+    for action in turn_actions(letters):
+        scores = letters.scores
+        before = scores[player] - scores[opponent]
+        applied = play_turn(letters, player, action)
+        scores = letters.scores
+        gain = scores[player] - scores[opponent] - before
+        values.append(gain - minimax(letters, opponent))
+        for _ in range(applied):
+            letters.undo()
+    return max(values)
+
+
+class NoTable(dict):
+    """
+    A transposition table that never keeps anything
+    """
+    def __setitem__(self, key: object, value: object) -> None:
+        pass
+
+
+def test_solver_matches_minimax() -> None:
+    """
+    Test that the solved value of small endgames is the minimax value, and
+    that the best line gets it
+    """
+    for seed in range(8):
+        letters, player = endgame(seed, 12)
+        state = letters.state_key()
+        expected = minimax(letters, player)
+
+        solver = EndgameSolver()
+        value, line = solver.best_line(letters, player)
+        assert value == expected
+        assert line_value(letters, player, line) == expected
+        assert letters.state_key() == state
+
+
+def test_solver_table_does_not_change_values() -> None:
+    """
+    Test that solving with a transposition table, reused between the
+    positions of a game, gives the values of a search without one
+    """
+    shared = EndgameSolver()
+    for seed in range(4):
+        letters, player = endgame(seed, 15)
+        while not letters.done:
+            plain = EndgameSolver()
+            plain.table = NoTable()
+            value, action = shared.solve(letters, player)
+            assert plain.solve(letters, player)[0] == value
+            assert EndgameSolver().solve(letters, player)[0] == value
+            assert action in turn_actions(letters)
+            play_turn(letters, player, action)
+            player = next_player(letters, player)
+    assert shared.hits > 0
+
+
+def test_perfect_bot_plays_legal_moves() -> None:
+    """
+    Test that PerfectBot only suggests fits that are on the tableau
+    """
+    for seed in range(3):
+        letters = LettersGame(standard_deck().shuffled(random.Random(seed)),
+                              3, (3, 4), 2)
+        bots = [PerfectBot(letters, random.Random(seed), solve_below=9)
+                for _ in range(2)]
+        turn = 0
+        while not letters.done:
+            fits = [tuple(fit) for fit in letters.find_fits()]
+            move = bots[turn % 2].suggest_move(turn % 2)
+            if move is not None:
+                assert tuple(sorted(move)) in fits
+                assert letters.call_fit(turn % 2 + 1, move)
+            elif letters.moonshot:
+                letters.moonshot_end()
+            turn += 1
@@ -0,0 +1,95 @@
+import json
+from pathlib import Path
+
+import pytest
+
+import bot
+import tournament
+from tournament import (bot_version, bradley_terry, engine_version,
+                        run_tournament)
+
+
+def test_bradley_terry_orders_the_bots() -> None:
+    """
+    Test that the ratings follow the order of a toy tournament in which
+    'a' beats 'b' and 'b' beats 'c' most of the time, that bots with even
+    results get the same rating, and that the ratings average 1500
+    """
+    results = {
+        ("a", "b", 3, 4): (70, 20, 10),
+        ("b", "c", 3, 4): (65, 30, 5),
+        ("a", "c", 3, 4): (85, 10, 5),
+        ("c", "a", 3, 4): (12, 80, 8),
+    }
+    ratings = bradley_terry(results)
+    assert ratings["a"] > ratings["b"] > ratings["c"]
+    assert sum(ratings.values()) / 3 == pytest.approx(1500)
+
+    even = bradley_terry({("a", "b", 3, 4): (40, 40, 20),
+                          ("b", "a", 3, 4): (45, 45, 10)})
+    assert even["a"] == pytest.approx(even["b"])
+    assert even["a"] == pytest.approx(1500)
+
+
+def test_tournament_cache(tmp_path: Path,
+                          monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that cached matchups are reused rather than played again, that
+    only the matchups of a bot are played again once its version changes,
+    and that every matchup is once the engine version changes
+    """
+    bots = ["random", "greedy", "smart"]
+    cache_path = str(tmp_path / "cache.json")
+    played = run_tournament(bots, [(3, 4)], 20, 15,
+                            cache_path=cache_path, shard_size=10)
+    assert len(played) == 6
+    assert all(sum(result) == 20 for result in played.values())
+
+    # Tamper with the cache so that a reused result can be told apart
+    with open(cache_path, encoding="utf-8") as f:
+        cache = json.load(f)
+    assert len(cache) == 6
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump({key: [1, 2, 17] for key in cache}, f)
+
+    reused = run_tournament(bots, [(3, 4)], 20, 15,
+                            cache_path=cache_path, shard_size=10)
+    assert all(result == (1, 2, 17) for result in reused.values())
+
+    version = bot_version("greedy")
+    monkeypatch.setattr(tournament, "bot_version",
+                        lambda name: version[::-1] if name == "greedy"
+                        else bot_version(name))
+    replayed = run_tournament(bots, [(3, 4)], 20, 15,
+                              cache_path=cache_path, shard_size=10)
+    for matchup, result in replayed.items():
+        if "greedy" in matchup:
+            assert result == played[matchup]
+        else:
+            assert result == (1, 2, 17)
+
+    monkeypatch.setattr(tournament, "engine_version", lambda: "changed")
+    replayed = run_tournament(bots, [(3, 4)], 20, 15,
+                              cache_path=cache_path, shard_size=10)
+    assert replayed == played
+
+
+def test_bot_version_covers_its_helpers(monkeypatch: pytest.MonkeyPatch
+                                        ) -> None:
+    """
+    Test that bots from the same module get their own versions, that a
+    version changes with a helper the bot calls but not with the helpers
+    of other bots or the engine modules, and that the engine version
+    changes with the engine modules
+    """
+    versions = {name: bot_version(name) for name in ["random", "greedy"]}
+    assert versions["random"] != versions["greedy"]
+
+    monkeypatch.setattr(bot, "first_fit_of_three", lambda cards: None)
+    assert bot_version("greedy") != versions["greedy"]
+    assert bot_version("random") == versions["random"]
+
+    engine = engine_version()
+    monkeypatch.setattr(tournament, "ENGINE_MODULES", ["base"])
+    assert engine_version() != engine
+    assert bot_version("random") == versions["random"]